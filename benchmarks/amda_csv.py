@@ -0,0 +1,81 @@
+"""Measures AMDA ASCII decoding throughput on a scaled up copy of tests/resources/amda_sample_spectro.txt.
+
+The sample data block is repeated until the file reaches the requested size, then decoded with:
+
+- legacy: former load_csv, whole response copied to a temporary file then parsed by pandas with delim_whitespace
+- current: speasy.webservices.amda.utils.load_csv, header parsed once and data block decoded straight from the stream
+
+    python benchmarks/amda_csv.py --size-mb 100
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pds
+
+from speasy.core import epoch_to_datetime64, http
+from speasy.webservices.amda.utils import load_csv
+
+_SAMPLE = os.path.normpath(f'{os.path.dirname(os.path.abspath(__file__))}/../tests/resources/amda_sample_spectro.txt')
+
+
+def legacy_load_csv(filename: str):
+    with http.urlopen(f"file://{os.path.abspath(filename)}") as csv:
+        with tempfile.TemporaryFile() as fd:
+            fd.write(csv.read())
+            fd.seek(0)
+            line = fd.readline().decode()
+            meta = {}
+            while len(line) > 0 and line[0] == '#':
+                if ':' in line:
+                    key, value = line[1:].split(':', 1)
+                    meta[key.strip()] = value.strip()
+                line = fd.readline().decode()
+            columns = [col.strip() for col in meta.get('DATA_COLUMNS', "").split(', ')[:]]
+            fd.seek(0)
+            data = pds.read_csv(fd, comment='#', sep=r'\s+', header=None, names=columns).values.transpose()
+            return epoch_to_datetime64(data[0]), data[1:].transpose()
+
+
+def make_sample(path: str, size_mb: int):
+    with open(_SAMPLE) as sample:
+        lines = sample.readlines()
+    header = "".join(filter(lambda line: line.startswith('#'), lines))
+    body = "".join(filter(lambda line: not line.startswith('#'), lines))
+    with open(path, 'w') as f:
+        f.write(header)
+        f.write(body * max(size_mb * 1024 * 1024 // len(body), 1))
+
+
+def _measure(func, path: str, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(path)
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "amda_sample.txt")
+        make_sample(path, args.size_mb)
+        file_size = os.path.getsize(path) / 1024 / 1024
+        legacy_time, (legacy_t, legacy_values) = _measure(legacy_load_csv, path, args.repeat)
+        current_time, var = _measure(load_csv, path, args.repeat)
+        assert np.array_equal(legacy_values, var.values, equal_nan=True)
+        assert np.array_equal(legacy_t, var.time)
+        print(f"file size: {file_size:.1f} MB, {len(var.time)} samples")
+        for name, elapsed in (("legacy", legacy_time), ("current", current_time)):
+            print(f"{name:<10} time: {elapsed:.3f}s  throughput: {file_size / elapsed:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
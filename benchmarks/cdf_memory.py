@@ -0,0 +1,103 @@
+"""Measures peak memory and wall time of CDAWeb CDF download-and-decode on a large synthetic CDF.
+
+A CDF holding a small requested variable and a large unrelated one is served by a local HTTP server, each loading
+strategy then runs in a fresh interpreter so its peak resident memory can be measured:
+
+- buffer: former behavior, whole response read into memory, decoded from bytes then copied
+- streamed: current behavior, response streamed to a temporary file and only the requested variable decoded
+
+    python benchmarks/cdf_memory.py --size-mb 500
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+_PEAK_RSS = """
+def peak_rss_kb():
+    # ru_maxrss survives execve on Linux, VmHWM does not
+    try:
+        with open("/proc/self/status") as status:
+            return int(next(line for line in status if line.startswith("VmHWM")).split()[1])
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+"""
+
+_SNIPPET = _PEAK_RSS + """
+import time
+t0 = time.perf_counter()
+if {strategy!r} == "buffer":
+    from speasy.core import http
+    from speasy.core.cdf import load_variable
+    with http.urlopen({url!r}) as remote_cdf:
+        var = load_variable(buffer=remote_cdf.read(), variable="B")
+    var = var.copy()
+else:
+    from speasy.webservices.cda import _read_cdf
+    var = _read_cdf({url!r}, "B")
+elapsed = time.perf_counter() - t0
+print(elapsed, peak_rss_kb(), var.values.shape[0])
+"""
+
+_BASELINE_SNIPPET = _PEAK_RSS + """
+import speasy.webservices.cda
+from speasy.core.cdf import load_variable
+print(peak_rss_kb())
+"""
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def make_cdf(path: str, size_mb: int):
+    import pycdfpp
+    length = max(size_mb * 1024 * 1024 // (8 * 64), 1)
+    cdf = pycdfpp.CDF()
+    time = np.datetime64('2020-01-01', 'ns') + np.arange(length).astype('timedelta64[s]')
+    cdf.add_variable("Epoch", values=pycdfpp.to_tt2000(time), data_type=pycdfpp.DataType.CDF_TIME_TT2000)
+    cdf["Epoch"].add_attribute("VAR_TYPE", "support_data")
+    for name, width in (("B", 3), ("Spectro", 60)):
+        cdf.add_variable(name, values=np.random.random_sample((length, width)))
+        cdf[name].add_attribute("DEPEND_0", "Epoch")
+        cdf[name].add_attribute("VAR_TYPE", "data")
+    pycdfpp.save(cdf, path)
+
+
+def _run(snippet: str):
+    out = subprocess.run([sys.executable, "-c", snippet], check=True, capture_output=True, text=True).stdout
+    return out.strip().splitlines()[-1].split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        make_cdf(os.path.join(tmp_dir, "bench.cdf"), args.size_mb)
+        file_size = os.path.getsize(os.path.join(tmp_dir, "bench.cdf")) / 1024 / 1024
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=tmp_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/bench.cdf"
+        try:
+            baseline = int(_run(_BASELINE_SNIPPET)[0]) / 1024
+            print(f"CDF size: {file_size:.1f} MB, interpreter baseline: {baseline:.1f} MB")
+            for strategy in ("buffer", "streamed"):
+                elapsed, max_rss, length = _run(_SNIPPET.format(strategy=strategy, url=url))
+                print(f"{strategy:<10} time: {float(elapsed):.2f}s  peak RSS over baseline: "
+                      f"{int(max_rss) / 1024 - baseline:.1f} MB  ({length} samples)")
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Measures `import speasy` wall time in fresh interpreters.
+
+Providers and their inventories are built on first use, so this should not depend on network or on inventory sizes.
+Pass --with-providers to also measure the time needed to build each provider on first access.
+
+    python benchmarks/import_time.py -n 10
+    python benchmarks/import_time.py -n 3 --with-providers
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+_IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import speasy
+print(time.perf_counter() - t0)
+"""
+
+_PROVIDER_SNIPPET = """
+import time
+import speasy
+t0 = time.perf_counter()
+getattr(speasy, {name!r})
+print(time.perf_counter() - t0)
+"""
+
+
+def _run(snippet: str) -> float:
+    out = subprocess.run([sys.executable, "-c", snippet], check=True, capture_output=True, text=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def _report(name: str, samples):
+    print(f"{name:<20} min: {min(samples):.3f}s  median: {statistics.median(samples):.3f}s  "
+          f"max: {max(samples):.3f}s  ({len(samples)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--with-providers", action="store_true")
+    args = parser.parse_args()
+
+    _report("import speasy", [_run(_IMPORT_SNIPPET) for _ in range(args.runs)])
+    if args.with_providers:
+        for name in ("amda", "cda", "ssc", "csa"):
+            _report(f"first speasy.{name}", [_run(_PROVIDER_SNIPPET.format(name=name)) for _ in range(args.runs)])
+
+
+if __name__ == '__main__':
+    main()
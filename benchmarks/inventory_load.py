@@ -0,0 +1,83 @@
+"""Measures how long a saved inventory tree takes to load, the tree is built from tests/resources/obsdatatree.xml and
+replicated --copies times under a common root to mimic larger inventories such as CDAWeb ones.
+
+- to_dict: former format, pickled nested dict rebuilt with from_dict
+- objects: pickled SpeasyIndex objects, former proxy inventories format
+- packed: packed inventory, only the root is created on load, "packed (all nodes)" then walks the whole tree
+
+Then times ProviderInventory.update, which fills flat inventories, and a flat parameter lookup on the loaded tree.
+
+    python benchmarks/inventory_load.py --copies 20
+"""
+import argparse
+import os
+import pickle
+import time
+
+from speasy.core.inventory import ProviderInventory
+from speasy.core.inventory.indexes import SpeasyIndex, from_dict, to_dict
+from speasy.core.inventory._packed_tree import dump_inventory, load_inventory
+from speasy.webservices.amda.inventory import AmdaXMLParser
+
+_OBS_TREE = os.path.normpath(f'{os.path.dirname(os.path.abspath(__file__))}/../tests/resources/obsdatatree.xml')
+
+
+def _walk(node):
+    for child in node.__dict__.values():
+        if isinstance(child, SpeasyIndex):
+            _walk(child)
+
+
+def _load_all(packed: bytes):
+    root = load_inventory(packed)
+    _walk(root)
+    return root
+
+
+def _flat_inventory(root):
+    flat = ProviderInventory()
+    flat.update(root)
+    return flat
+
+
+def _measure(func, value, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func(value)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    root = SpeasyIndex(name="root", provider="bench", uid="root")
+    for copy in range(args.copies):
+        with open(_OBS_TREE, 'rb') as obs_xml:
+            root.__dict__[f"copy_{copy}"] = AmdaXMLParser.parse(obs_xml)
+
+    saved = {
+        "to_dict": (pickle.dumps(to_dict(root)), lambda value: from_dict(pickle.loads(value))),
+        "objects": (pickle.dumps(root), pickle.loads),
+        "packed": (dump_inventory(root), load_inventory),
+        "packed (all nodes)": (dump_inventory(root), _load_all),
+    }
+    assert to_dict(_load_all(saved["packed"][0])) == to_dict(root)
+    for name, (value, load) in saved.items():
+        print(f"{name:<20} size: {len(value) / 1024 / 1024:.1f} MB  load time: {_measure(load, value, args.repeat):.4f}s")
+
+    packed = saved["packed"][0]
+    uid = next(iter(_flat_inventory(load_inventory(packed)).parameters))
+    for name, load in (("objects", pickle.loads), ("packed", load_inventory)):
+        value = saved[name][0]
+        update = _measure(lambda v: _flat_inventory(load(v)), value, args.repeat)
+        lookup = _measure(lambda v: _flat_inventory(load(v)).parameters[uid], value, args.repeat)
+        print(f"{name:<20} load + flat update: {update:.4f}s  load + flat update + lookup: {lookup:.4f}s")
+
+
+if __name__ == '__main__':
+    main()
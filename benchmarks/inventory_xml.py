@@ -0,0 +1,98 @@
+"""Measures inventory XML parsing time and peak memory on tests/resources/obsdatatree.xml and optionally on a CDAS
+all.xml file.
+
+- legacy: former parsers, the whole document is loaded with ElementTree.fromstring then walked recursively
+- current: AmdaXMLParser.parse and load_xml_catalog, index nodes are built while the document is streamed by iterparse
+
+Peak memory is measured with tracemalloc in a separate run, so it does not slow down timings.
+
+    python benchmarks/inventory_xml.py --cdas-xml ~/.local/share/speasy/cda_inventory/all.xml
+"""
+import argparse
+import os
+import time
+import tracemalloc
+import xml.etree.ElementTree as Et
+
+from speasy.core.inventory.indexes import SpeasyIndex, to_dict
+from speasy.webservices.amda.inventory import AmdaXMLParser
+from speasy.webservices.cda._inventory_builder._xml_catalogs_parser import load_xml_catalog, parse_dataset
+
+_OBS_TREE = os.path.normpath(f'{os.path.dirname(os.path.abspath(__file__))}/../tests/resources/obsdatatree.xml')
+
+_AMDA_HANDLERS = {
+    'instrument': AmdaXMLParser.make_instrument_node,
+    'dataset': AmdaXMLParser.make_dataset_node,
+    'parameter': AmdaXMLParser.make_parameter_node,
+    'component': AmdaXMLParser.make_component_node,
+    'timeTable': AmdaXMLParser.make_timetable_node,
+    'timetab': AmdaXMLParser.make_timetable_node,
+    'catalog': AmdaXMLParser.make_catalogue_node,
+    'param': AmdaXMLParser.make_user_parameter_node,
+}
+
+
+def legacy_amda_parse(path: str):
+    def _recursive_parser(parent, node, is_public):
+        new = _AMDA_HANDLERS.get(node.tag, AmdaXMLParser.make_path_node)(parent, node, is_public)
+        for subnode in node:
+            _recursive_parser(new, subnode, is_public)
+
+    root = SpeasyIndex("root", "amda", "amda_root_node")
+    with open(path) as xml:
+        _recursive_parser(root, Et.fromstring(xml.read()), is_public=True)
+    return root
+
+
+def current_amda_parse(path: str):
+    with open(path, 'rb') as xml:
+        return AmdaXMLParser.parse(xml, is_public=True)
+
+
+def legacy_load_xml_catalog(path: str):
+    with open(path) as xml_file:
+        tree = Et.fromstring(xml_file.read())
+        inventory_tree = SpeasyIndex(name='root', provider='cda', uid='cda_root')
+        for site in tree.iter('{cdas}datasite'):
+            if site.attrib['ID'] == 'CDAWeb_HTTPS':
+                for node in site.iter('{cdas}dataset'):
+                    parse_dataset(inventory_tree, node)
+        return inventory_tree
+
+
+def _measure(func, path: str, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(path)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def _compare(title: str, path: str, legacy, current, repeat: int):
+    legacy_time, legacy_peak, legacy_tree = _measure(legacy, path, repeat)
+    current_time, current_peak, current_tree = _measure(current, path, repeat)
+    assert to_dict(legacy_tree) == to_dict(current_tree)
+    print(f"{title}: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+    for name, elapsed, peak in (("legacy", legacy_time, legacy_peak), ("current", current_time, current_peak)):
+        print(f"  {name:<10} time: {elapsed:.3f}s  peak memory: {peak / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--obs-tree", default=_OBS_TREE)
+    parser.add_argument("--cdas-xml", default=None, help="CDAS all.xml path, skipped when not given")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    _compare("AMDA obs data tree", args.obs_tree, legacy_amda_parse, current_amda_parse, args.repeat)
+    if args.cdas_xml is not None:
+        _compare("CDAS all.xml", args.cdas_xml, legacy_load_xml_catalog, load_xml_catalog, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,13 +9,31 @@
 __author__ = """Alexis Jeandet"""
 __email__ = 'alexis.jeandet@member.fsf.org'
 __version__ = '1.0.3'
-__all__ = ['amda', 'cda', 'ssc', 'csa', 'get_data', 'SpeasyVariable', 'Catalog', 'Event', 'Dataset', 'TimeTable']
+__all__ = ['amda', 'cda', 'ssc', 'csa', 'get_data', 'aget_data', 'SpeasyVariable', 'Catalog', 'Event', 'Dataset', 'TimeTable']
 __docformat__ = "numpy"
 
 from speasy.core.inventory.indexes import SpeasyIndex
 from .products import SpeasyVariable, Catalog, Event, Dataset, TimeTable, MaybeAnyProduct
 from typing import List
-from .core.requests_scheduling.request_dispatch import get_data, list_providers, amda, cda, csa, ssc
+from .core.requests_scheduling.request_dispatch import get_data, aget_data, list_providers
+
+_LAZY_PROVIDERS = ('amda', 'cda', 'ssc', 'csa')
+
+
+def __getattr__(name):
+    # providers are only built on first access, see speasy.core.dataprovider.get_provider
+    if name in _LAZY_PROVIDERS:
+        from .core.dataprovider import get_provider
+        provider = get_provider(name)
+        # None while the calling thread builds it, caching it would hide the provider once built
+        if provider is not None:
+            globals()[name] = provider
+        return provider
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_PROVIDERS))
 
 
 # @TODO implement me, this function should be able to look inside all servers
@@ -25,6 +43,9 @@ def find_product(name: str) -> List[str]:
 
 
 def update_inventories():
-    from .core.dataprovider import PROVIDERS
-    for provider in PROVIDERS.values():
-        provider.update_inventory()
+    from .core.dataprovider import PROVIDERS, get_provider, provider_names
+    for name in provider_names(include_alt_names=False):
+        if name in PROVIDERS:
+            PROVIDERS[name].update_inventory()
+        else:
+            get_provider(name)
@@ -157,16 +157,45 @@ cache = ConfigSection("CACHE",
                       size={"default": 20e9, "description": """Sets the maximum cache capacity.""",
                             "type_ctor": lambda x: int(float(x))},
                       path={"default": str(appdirs.user_cache_dir("speasy", "LPP")),
-                            "description": """Sets Speasy cache path."""}
+                            "description": """Sets Speasy cache path."""},
+                      max_parallel_downloads={"default": 1,
+                                              "description": """Maximum number of missing or outdated cache fragments groups downloaded concurrently, 1 disables parallel downloads.""",
+                                              "type_ctor": int},
+                      memory_size={"default": 0,
+                                   "description": """Sets the maximum capacity in bytes of the in-memory cache kept in front of the disk cache, 0 disables it.""",
+                                   "type_ctor": lambda x: int(float(x))}
                       )
 
+http = ConfigSection("HTTP",
+                     pool_connections={"default": 16,
+                                       "description": "Number of hosts for which connections are kept alive.",
+                                       "type_ctor": int},
+                     pool_size={"default": 10,
+                                "description": "Maximum number of connections kept alive per host.",
+                                "type_ctor": int},
+                     pool_sizes={"default": "",
+                                 "description": """Per host maximum number of connections kept alive, overrides pool_size for listed hosts.
+Comma separated list of host=size, for example: cdaweb.gsfc.nasa.gov=16,amda.irap.omp.eu=8"""},
+                     connect_timeout={"default": 10.,
+                                      "description": "Connection timeout in seconds.",
+                                      "type_ctor": float},
+                     read_timeout={"default": 300.,
+                                   "description": "Maximum time in seconds to wait for the server to send data.",
+                                   "type_ctor": float}
+                     )
+
 index = ConfigSection("INDEX",
                       path={
                           "default": f'{appdirs.user_data_dir("speasy", "LPP")}/index'}
                       )
 cdaweb = ConfigSection("CDAWEB",
                        inventory_data_path={
-                           "default": f'{appdirs.user_data_dir("speasy", "LPP")}/cda_inventory'}
+                           "default": f'{appdirs.user_data_dir("speasy", "LPP")}/cda_inventory'},
+                       inventory_parse_workers={
+                           "default": 1,
+                           "description": """Number of processes parsing master CDFs when the inventory is rebuilt, 0 uses one per CPU and 1 parses them in the calling process.
+Except with the fork start method, using several processes requires scripts to guard their main code with if __name__ == "__main__".""",
+                           "type_ctor": int}
                        )
 
 amda = ConfigSection("AMDA",
@@ -182,13 +211,63 @@ amda = ConfigSection("AMDA",
                          "default": 10,
                          "description": "Maximum request duration in days, any request over a longer period will be split into smaller ones.",
                          "type_ctor": int},
+                     max_parallel_chunks={
+                         "default": 1,
+                         "description": "Maximum number of chunks of a split request downloaded concurrently, 1 downloads them sequentially.\nConcurrent chunks are not limited by requests_scheduling max_concurrent_requests_per_provider, each request can then send up to this number of concurrent AMDA requests.",
+                         "type_ctor": int},
+                     max_parallel_parameters={
+                         "default": 1,
+                         "description": "Maximum number of parameters of a dataset downloaded concurrently by get_dataset, 1 downloads them sequentially.\nConcurrent parameters are not limited by requests_scheduling max_concurrent_requests_per_provider and stack with max_parallel_chunks.",
+                         "type_ctor": int},
                      entry_point={
-                         "default": "http://amda.irap.omp.eu"}
+                         "default": "http://amda.irap.omp.eu"},
+                     output_format={
+                         "default": "ASCII",
+                         "description": """Format used to download parameters, either ASCII or CDF_ISTP.
+CDF_ISTP responses are smaller and faster to decode, ASCII is used as fallback if they can't be decoded.
+Formats other than ASCII are always downloaded from AMDA, bypassing the proxy server."""},
+                     token_lifetime={
+                         "default": 600.,
+                         "description": "Time in seconds an AMDA authentication token is reused before getting a new one.",
+                         "type_ctor": float},
+                     job_timeout={
+                         "default": 3600.,
+                         "description": "Maximum time in seconds to wait for a long AMDA request to complete.",
+                         "type_ctor": float},
+                     job_poll_min_delay={
+                         "default": 1.,
+                         "description": "Initial delay in seconds between two status checks of a long AMDA request.",
+                         "type_ctor": float},
+                     job_poll_max_delay={
+                         "default": 30.,
+                         "description": "Delay between two status checks of a long AMDA request grows up to this value in seconds.",
+                         "type_ctor": float}
                      )
 
+csa = ConfigSection("CSA",
+                    cache_sibling_variables={
+                        "default": False,
+                        "description": """CSA delivers whole datasets, when enabled every variable of a downloaded dataset is decoded and stored in cache so later requests for sibling variables are served from cache.""",
+                        "type_ctor": lambda x: {'true': True, 'false': False}.get(x.lower(), False)}
+                    )
+
 inventories = ConfigSection("INVENTORIES",
                             cache_retention_days={
                                 "default": 2,
                                 "description": "Maximum times in days speasy will keep inventories in cache before fetching newer version.",
                                 "type_ctor": int}
                             )
+
+requests_scheduling = ConfigSection("REQUESTS_SCHEDULING",
+                                    parallel={"default": 1,
+                                              "description": "Default number of requests get_data runs concurrently when several products or time ranges are requested, 1 disables concurrent requests.",
+                                              "type_ctor": int},
+                                    max_concurrent_requests_per_provider={
+                                        "default": 4,
+                                        "description": "Maximum number of get_data requests running at the same time on a given provider.",
+                                        "type_ctor": int},
+                                    async_parallel={
+                                        "default": 16,
+                                        "description": "Default number of requests aget_data runs concurrently in worker threads, pending requests wait without blocking the event loop.",
+                                        "type_ctor": int}
+                                    )
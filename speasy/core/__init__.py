@@ -8,9 +8,10 @@
 import os
 import warnings
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from functools import wraps
-from typing import Any, Dict, List, Sequence, Type
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Type
 
 import numpy as np
 from dateutil.parser import parse
@@ -281,3 +282,33 @@ def progress_bar(leave=True, progress=False, desc=None, **kwargs):
         return lambda x: x
     else:
         return lambda x: tqdm(x, leave=leave, desc=desc)
+
+
+def parallel_imap(func: Callable, items: Sequence, max_workers: int = 1) -> Iterator:
+    """Lazily applies func to each item using up to max_workers threads, results are yielded in items order whatever
+    the completion order is.
+
+    Parameters
+    ----------
+    func: Callable
+        function to apply, must be thread safe when max_workers > 1
+    items: Sequence
+        function inputs
+    max_workers: int
+        maximum number of concurrent calls, runs sequentially in the calling thread when <= 1 (default: 1)
+
+    Returns
+    -------
+    Iterator
+        func results in the same order than items
+
+    Examples
+    --------
+    >>> list(parallel_imap(lambda x: x * 2, [1, 2, 3], max_workers=3))
+    [2, 4, 6]
+    """
+    if max_workers <= 1 or len(items) <= 1:
+        yield from map(func, items)
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            yield from executor.map(func, items)
@@ -1,7 +1,8 @@
 from .cache import Cache, CacheItem
+from ._memory_cache import MemoryCache
 from ._function_cache import CacheCall
 from ._providers_caches import CACHE_ALLOWED_KWARGS, Cacheable, UnversionedProviderCache
-from ._instance import _cache
+from ._instance import _cache, _memory_cache
 
 
 def cache_len():
@@ -13,7 +14,17 @@ def cache_disk_size():
 
 
 def stats():
-    return _cache.stats()
+    """Returns hit and miss counters of each cache tier
+
+    Returns
+    -------
+    Dict[str, Dict[str, int]]
+        "memory" and "disk" tiers statistics
+    """
+    return {
+        "memory": _memory_cache.stats(),
+        "disk": _cache.stats()
+    }
 
 
 def entries():
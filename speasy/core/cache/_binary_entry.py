@@ -0,0 +1,127 @@
+"""Binary cache entry format, a fragment is stored as a small pickled header followed by its arrays raw buffers:
+
+    MAGIC | header length (uint64) | pickled header | padding | array buffer | padding | array buffer ...
+
+Each buffer starts on a 64 bytes boundary, loading an entry only wraps those buffers with numpy.frombuffer so getting
+a fragment back from the cache costs no more than reading it from disk.
+"""
+import pickle
+import struct
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from speasy.core.data_containers import DataContainer, VariableAxis, VariableTimeAxis
+from speasy.products.variable import SpeasyVariable
+from .cache import CacheItem
+
+MAGIC = b"SPZVAR1\0"
+_ALIGNMENT = 64
+_HEADER_LEN = struct.Struct("<Q")
+_PADDING = bytes(_ALIGNMENT)
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _container_header(container: SpeasyVariable or VariableAxis or VariableTimeAxis, is_time_dependent: bool) -> Dict:
+    return {
+        "name": container.name,
+        "meta": container.meta,
+        "is_time_dependent": is_time_dependent,
+        "dtype": container.values.dtype.str,
+        "shape": container.values.shape,
+    }
+
+
+def is_binary_entry(value) -> bool:
+    return type(value) is bytes and value[:len(MAGIC)] == MAGIC
+
+
+def dump_entry(variable: SpeasyVariable, version) -> bytes:
+    """Serializes a variable and its version into a single bytes object
+
+    Parameters
+    ----------
+    variable: SpeasyVariable
+        the variable to serialize, arrays with object dtype are not supported
+    version:
+        cache entry version, anything picklable
+
+    Returns
+    -------
+    bytes
+        the cache entry
+
+    Raises
+    ------
+    TypeError
+        if any variable array has an object dtype
+    """
+    arrays = [variable.values] + [axis.values for axis in variable.axes]
+    if any(array.dtype.hasobject for array in arrays):
+        raise TypeError("Arrays with object dtype can't be stored as raw buffers")
+    header = {
+        "version": version,
+        "columns": variable.columns,
+        # variable values always share the time axis length, hence are time dependent
+        "values": _container_header(variable, is_time_dependent=True),
+        "axes": [dict(_container_header(axis, is_time_dependent=axis.is_time_dependent), type=type(axis).__name__)
+                 for axis in variable.axes]
+    }
+    header_bytes = pickle.dumps(header, protocol=pickle.HIGHEST_PROTOCOL)
+    offset = len(MAGIC) + _HEADER_LEN.size + len(header_bytes)
+    parts: List[bytes or memoryview] = [MAGIC, _HEADER_LEN.pack(len(header_bytes)), header_bytes]
+    for array in arrays:
+        padding = _aligned(offset) - offset
+        parts.append(_PADDING[:padding])
+        # views as bytes are not copied, the join below is the only copy
+        raw = np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+        parts.append(memoryview(raw))
+        offset += padding + raw.nbytes
+    return b"".join(parts)
+
+
+def _load_array(buffer: bytes, offset: int, dtype: str, shape: Tuple[int]) -> Tuple[np.ndarray, int]:
+    offset = _aligned(offset)
+    dtype = np.dtype(dtype)
+    count = int(np.prod(shape, dtype=np.int64))
+    if count == 0:
+        return np.empty(shape, dtype=dtype), offset
+    array = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset).reshape(shape)
+    return array, offset + array.nbytes
+
+
+def _load_container(buffer: bytes, offset: int, header: Dict) -> Tuple[DataContainer, int]:
+    values, offset = _load_array(buffer, offset, header["dtype"], header["shape"])
+    return DataContainer(values=values, meta=header["meta"], name=header["name"],
+                         is_time_dependent=header["is_time_dependent"]), offset
+
+
+def load_entry(buffer: bytes) -> CacheItem:
+    """Loads a cache entry written by :func:`dump_entry`, arrays are read-only views on given buffer
+
+    Parameters
+    ----------
+    buffer: bytes
+        the cache entry
+
+    Returns
+    -------
+    CacheItem
+        cache item with the variable as data
+    """
+    header_len, = _HEADER_LEN.unpack_from(buffer, len(MAGIC))
+    offset = len(MAGIC) + _HEADER_LEN.size
+    header = pickle.loads(memoryview(buffer)[offset:offset + header_len])
+    offset += header_len
+    values, offset = _load_container(buffer, offset, header["values"])
+    axes = []
+    for axis_header in header["axes"]:
+        data, offset = _load_container(buffer, offset, axis_header)
+        if axis_header["type"] == "VariableTimeAxis":
+            axes.append(VariableTimeAxis(data=data))
+        else:
+            axes.append(VariableAxis(data=data))
+    return CacheItem(SpeasyVariable(axes=axes, values=values, columns=header["columns"]), header["version"])
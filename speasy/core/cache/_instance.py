@@ -1,4 +1,6 @@
 from .cache import Cache
+from ._memory_cache import MemoryCache
 from ...config import cache as cache_cfg
 
 _cache = Cache(cache_cfg.path())
+_memory_cache = MemoryCache(cache_cfg.memory_size())
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Dict
+
+from .cache import CacheItem
+
+
+class MemoryCache:
+    """Process local LRU cache of decoded cache entries, used as a first tier in front of the disk cache.
+    Entries are weighted by their data size in bytes and least recently used ones are evicted once max_size is
+    reached, a max_size of 0 disables it.
+    """
+    __slots__ = ['max_size', '_entries', '_size', '_lock', '_hit', '_miss', '_evictions']
+
+    def __init__(self, max_size: int = 0):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, (CacheItem, int)]" = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+        self._hit = 0
+        self._miss = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _pop(self, key):
+        _, size = self._entries.pop(key)
+        self._size -= size
+
+    def get(self, key: str) -> CacheItem or None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._miss += 1
+                return None
+            self._hit += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, item: CacheItem, size: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if size > self.max_size:
+                return
+            self._entries[key] = (item, size)
+            self._size += size
+            while self._size > self.max_size:
+                self._pop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def drop(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hit": self._hit,
+            "misses": self._miss,
+            "evictions": self._evictions,
+            "entries": len(self._entries),
+            "size": self._size,
+            "max_size": self.max_size
+        }
@@ -1,19 +1,21 @@
 from speasy import SpeasyVariable
 from .cache import CacheItem
-from typing import List, Tuple
+from ._binary_entry import dump_entry, is_binary_entry, load_entry
+from typing import Dict, List, Tuple
 from speasy.core.datetime_range import DateTimeRange
-from speasy.core import progress_bar
+from speasy.core import progress_bar, parallel_imap
+from speasy.config import cache as cache_cfg
 from speasy.products.variable import merge as merge_variables, to_dictionary, from_dictionary
 from speasy.core.inventory.indexes import ParameterIndex
 from datetime import datetime, timedelta
 from functools import wraps
 import logging
 import math
-from ._instance import _cache
+from ._instance import _cache, _memory_cache
 
 log = logging.getLogger(__name__)
 
-CACHE_ALLOWED_KWARGS = ['disable_cache']
+CACHE_ALLOWED_KWARGS = ['disable_cache', 'max_parallel_downloads']
 
 
 def lower_hour_bound(dt: datetime, factor: int):
@@ -57,6 +59,28 @@ def default_cache_entry_name(prefix: str, product: str, start_time: str, **kwarg
     return f"{prefix}/{product}/{start_time}"
 
 
+def encode_entry(item: CacheItem) -> bytes or CacheItem:
+    try:
+        return dump_entry(item.data, item.version)
+    except TypeError:
+        # object arrays can't be stored as raw buffers, fallback to pickled dictionaries
+        return CacheItem(to_dictionary(item.data), item.version)
+
+
+def decode_entry(value: bytes or CacheItem) -> CacheItem:
+    if is_binary_entry(value):
+        return load_entry(value)
+    # entries written by older speasy versions or with object arrays
+    return CacheItem(from_dictionary(value.data), value.version)
+
+
+def max_parallel_downloads(kwargs: dict) -> int:
+    value = kwargs.pop("max_parallel_downloads", None)
+    if value is None:
+        return cache_cfg.max_parallel_downloads()
+    return value
+
+
 def product_name(product: str or ParameterIndex):
     if type(product) is str:
         return product
@@ -69,7 +93,12 @@ def product_name(product: str or ParameterIndex):
 class _Cacheable:
     def __init__(self, prefix, cache_instance=_cache, start_time_arg='start_time', stop_time_arg='stop_time',
                  version=None,
-                 fragment_hours=lambda x: 1, cache_margins=1.2, leak_cache=False, entry_name=default_cache_entry_name):
+                 fragment_hours=lambda x: 1, cache_margins=1.2, leak_cache=False, entry_name=default_cache_entry_name,
+                 memory_cache_instance=None):
+        # the process wide memory tier only fronts the process wide disk cache since both share the same keys
+        if memory_cache_instance is None and cache_instance is _cache:
+            memory_cache_instance = _memory_cache
+        self.memory_cache = memory_cache_instance
         self.start_time_arg = start_time_arg
         self.stop_time_arg = stop_time_arg
         self.version = (lambda x, y: 0) if version is None else version
@@ -80,36 +109,44 @@ class _Cacheable:
         self.leak_cache = leak_cache
         self.entry_name = entry_name
 
+    def make_cache_entries(self, variable: SpeasyVariable or None, fragments, product, fragment_duration_hours,
+                           version, **kwargs) -> Dict[str, CacheItem]:
+        if variable is None:
+            return {}
+        return {
+            self.entry_name(self.prefix, product, fragment.isoformat(), **kwargs):
+                CacheItem(variable[fragment:(fragment + timedelta(hours=fragment_duration_hours))], version)
+            for fragment in fragments
+        }
+
     def add_to_cache(self, variable: SpeasyVariable or None, fragments, product, fragment_duration_hours, version,
                      **kwargs) -> SpeasyVariable or None:
-        if variable is not None:
-            for fragment in fragments:
-                self.set_cache_entry(fragment, product,
-                                     CacheItem(to_dictionary(
-                                         variable[fragment:(fragment + timedelta(hours=fragment_duration_hours))]),
-                                         version))
+        self.set_cache_entries(
+            self.make_cache_entries(variable, fragments, product, fragment_duration_hours, version, **kwargs))
         return variable
 
+    def set_cache_entries(self, entries: Dict[str, CacheItem]):
+        if len(entries):
+            log.debug(f"add {len(entries)} entries into cache")
+            self.cache.set_many({key: encode_entry(entry) for key, entry in entries.items()})
+            if self.memory_cache is not None and self.memory_cache.enabled:
+                for key, entry in entries.items():
+                    # fragments are views of the whole downloaded variable, keeping them would keep it alive
+                    data = entry.data.copy()
+                    self.memory_cache.set(key, CacheItem(data, entry.version), size=data.nbytes)
+
     def set_cache_entry(self, fragment, product: str, entry, **kwargs):
         key = self.entry_name(self.prefix, product, fragment.isoformat(), **kwargs)
-        log.debug(f"add {key} into cache")
-        self.cache[key] = entry
+        self.set_cache_entries({key: entry})
 
     def get_cache_entry(self, fragment: datetime, product, **kwargs):
-        key = self.entry_name(self.prefix, product, fragment.isoformat(), **kwargs)
-        if key in self.cache:
-            entry = self.cache[key]
-            log.debug(f"Found {key} inside cache")
-            return entry
-        else:
-            log.debug(f"{key} not found inside cache")
-        return None
+        return self.get_cache_entries([fragment], product, **kwargs)[0]
 
     def get_from_cache(self, fragment, product, version, **kwargs):
         entry = self.get_cache_entry(fragment, product, **kwargs)
         if entry is not None:
             if is_up_to_date(entry, version):
-                return from_dictionary(entry.data)
+                return entry.data
             log.debug(f"Cache entry is outdated")
         return None
 
@@ -122,24 +159,43 @@ class _Cacheable:
 
     def get_fragments_from_cache(self, fragments: List[datetime], product: str, version, **kwargs):
         data_fragments = []
-        with self.cache.transact():
-            for fragment in fragments:
-                data_fragments.append(self.get_from_cache(fragment, product, version, **kwargs))
+        for entry in self.get_cache_entries(fragments, product, **kwargs):
+            if entry is not None and not is_up_to_date(entry, version):
+                log.debug(f"Cache entry is outdated")
+                entry = None
+            data_fragments.append(entry.data if entry is not None else None)
         return data_fragments
 
-    def get_cache_entries(self, fragments: List[datetime], product: str, **kwargs):
-        return [self.get_cache_entry(fragment, product, **kwargs) for fragment in fragments]
+    def get_cache_entries(self, fragments: List[datetime], product: str, **kwargs) -> List[CacheItem or None]:
+        keys = [self.entry_name(self.prefix, product, fragment.isoformat(), **kwargs) for fragment in fragments]
+        entries = [None] * len(keys)
+        missing = list(range(len(keys)))
+        if self.memory_cache is not None and self.memory_cache.enabled:
+            for index, key in enumerate(keys):
+                entries[index] = self.memory_cache.get(key)
+            missing = [index for index, entry in enumerate(entries) if entry is None]
+        if len(missing):
+            # a single transaction and a single lookup per fragment whatever the number of fragments
+            values = self.cache.get_many([keys[index] for index in missing])
+            for index, value in zip(missing, values):
+                if value is not None:
+                    entries[index] = decode_entry(value)
+                    if self.memory_cache is not None:
+                        self.memory_cache.set(keys[index], entries[index], size=entries[index].data.nbytes)
+        log.debug(f"Found {len(keys) - entries.count(None)} out of {len(keys)} entries inside cache")
+        return entries
 
 
 class Cacheable(object):
     def __init__(self, prefix, cache_instance=_cache, start_time_arg='start_time', stop_time_arg='stop_time',
                  version=None,
-                 fragment_hours=lambda x: 1, cache_margins=1.2, leak_cache=False, entry_name=default_cache_entry_name):
+                 fragment_hours=lambda x: 1, cache_margins=1.2, leak_cache=False, entry_name=default_cache_entry_name,
+                 memory_cache_instance=None):
         self._cache = _Cacheable(prefix, cache_instance=cache_instance, start_time_arg=start_time_arg,
                                  stop_time_arg=stop_time_arg,
                                  version=version,
                                  fragment_hours=fragment_hours, cache_margins=cache_margins, leak_cache=leak_cache,
-                                 entry_name=entry_name)
+                                 entry_name=entry_name, memory_cache_instance=memory_cache_instance)
 
     def __call__(self, get_data):
         @wraps(get_data)
@@ -147,6 +203,7 @@ class Cacheable(object):
             product = product_name(product)
             version = self._cache.version(wrapped_self, product)
             dt_range = DateTimeRange(start_time, stop_time)
+            max_workers = max_parallel_downloads(kwargs)
             if kwargs.pop("disable_cache", False):
                 return get_data(wrapped_self, product=product, start_time=dt_range.start_time,
                                 stop_time=dt_range.stop_time, **kwargs)
@@ -159,16 +216,23 @@ class Cacheable(object):
                 [fragment for f_data, fragment in zip(data_chunks, fragments) if f_data is None],
                 duration=fragment_duration)
 
-            data_chunks += [
-                self._cache.add_to_cache(
-                    get_data(
-                        wrapped_self, product=product, start_time=fragment_group[0],
-                        stop_time=fragment_group[-1] + fragment_duration, **kwargs),
-                    fragments=fragment_group, product=product, fragment_duration_hours=fragment_hours,
-                    version=version, **kwargs)
-                for fragment_group
-                in
-                progress_bar(leave=False, desc="Downloading missing fragments from cache", **kwargs)(missing_fragments)]
+            def _get_fragment_group(fragment_group):
+                return get_data(wrapped_self, product=product, start_time=fragment_group[0],
+                                stop_time=fragment_group[-1] + fragment_duration, **kwargs)
+
+            # downloads run concurrently but results are consumed in fragments order, new entries are written to
+            # cache in a single transaction once all downloads are done or if one fails
+            downloads = parallel_imap(_get_fragment_group, missing_fragments, max_workers=max_workers)
+            new_entries = {}
+            try:
+                for fragment_group, data in progress_bar(leave=False, desc="Downloading missing fragments from cache",
+                                                         **kwargs)(zip(missing_fragments, downloads)):
+                    new_entries.update(self._cache.make_cache_entries(
+                        data, fragments=fragment_group, product=product, fragment_duration_hours=fragment_hours,
+                        version=version, **kwargs))
+                    data_chunks.append(data)
+            finally:
+                self._cache.set_cache_entries(new_entries)
 
             data_chunks = list(filter(lambda d: d is not None, data_chunks))
 
@@ -182,18 +246,20 @@ class Cacheable(object):
 
         if self._cache.leak_cache:
             wrapped.cache = self._cache.cache
+        # gives access to fragments planning and entries handling, for example to pre-populate cache entries
+        wrapped.provider_cache = self._cache
         return wrapped
 
 
 class UnversionedProviderCache(object):
     def __init__(self, prefix, cache_instance=_cache, start_time_arg='start_time', stop_time_arg='stop_time',
                  fragment_hours=lambda x: 1, cache_margins=1.2, leak_cache=False, entry_name=default_cache_entry_name,
-                 cache_retention=None):
+                 cache_retention=None, memory_cache_instance=None):
         self._cache = _Cacheable(prefix, cache_instance=cache_instance, start_time_arg=start_time_arg,
                                  stop_time_arg=stop_time_arg,
                                  version=lambda x, y: datetime.utcnow().isoformat(),
                                  fragment_hours=fragment_hours, cache_margins=cache_margins, leak_cache=leak_cache,
-                                 entry_name=entry_name)
+                                 entry_name=entry_name, memory_cache_instance=memory_cache_instance)
         self.cache_retention = cache_retention or timedelta(days=14)
 
     def split_fragments(self, fragments, product, fragment_duration, **kwargs):
@@ -205,7 +271,7 @@ class UnversionedProviderCache(object):
             if entry is None:
                 missing_fragments.append(fragment)
             elif (entry.version + self.cache_retention) > datetime.utcnow():
-                data_chunks.append(from_dictionary(entry.data))
+                data_chunks.append(entry.data)
             else:
                 maybe_outdated_fragments.append((fragment, entry))
 
@@ -226,6 +292,7 @@ class UnversionedProviderCache(object):
         def wrapped(wrapped_self, product, start_time, stop_time, **kwargs):
             product = product_name(product)
             dt_range = DateTimeRange(start_time, stop_time)
+            max_workers = max_parallel_downloads(kwargs)
             if kwargs.pop("disable_cache", False):
                 return get_data(wrapped_self, product=product, start_time=dt_range.start_time,
                                 stop_time=dt_range.stop_time, **kwargs)
@@ -234,33 +301,49 @@ class UnversionedProviderCache(object):
             fragment_duration = timedelta(hours=fragment_hours)
             data_chunks, maybe_outdated_fragments, missing_fragments = self.split_fragments(fragments, product,
                                                                                             fragment_duration, **kwargs)
-            data_chunks += \
-                list(filter(lambda d: d is not None, [
-                    self._cache.add_to_cache(
-                        get_data(
-                            wrapped_self, product=product, start_time=fragment_group[0],
-                            stop_time=fragment_group[-1] + fragment_duration, **kwargs),
-                        fragments=fragment_group, product=product, fragment_duration_hours=fragment_hours,
-                        version=datetime.utcnow(), **kwargs)
-                    for fragment_group
-                    in progress_bar(leave=False, desc="Downloading missing fragments from cache", **kwargs)(
-                        missing_fragments)]))
-
-            for group in progress_bar(leave=False, desc="Checking if cache fragments are outdated", **kwargs)(
-                maybe_outdated_fragments):
+
+            def _get_missing_group(group):
+                return get_data(wrapped_self, product=product, start_time=group[0],
+                                stop_time=group[-1] + fragment_duration, **kwargs)
+
+            def _get_maybe_outdated_group(group):
                 oldest = max(group, key=lambda item: item[1].version)[1].version
-                data = get_data(wrapped_self, product=product, start_time=group[0][0],
+                return get_data(wrapped_self, product=product, start_time=group[0][0],
                                 stop_time=group[-1][0] + fragment_duration, if_newer_than=oldest, **kwargs)
-                if data is None:
-                    for fragment, entry in group:
-                        entry.version = datetime.utcnow()
-                        self._cache.set_cache_entry(fragment, product, entry)
-                        data_chunks.append(entry.data)
-                else:
-                    self._cache.add_to_cache(data, [item[0] for item in group], product,
-                                             fragment_duration_hours=fragment_hours,
-                                             version=datetime.now(), **kwargs)
-                    data_chunks.append(data)
+
+            # both kinds of groups are downloaded in the same pool, results are consumed, hence written to cache,
+            # in the same order than the sequential implementation: missing groups first then maybe outdated ones
+            downloads = parallel_imap(lambda job: job[0](job[1]),
+                                      [(_get_missing_group, group) for group in missing_fragments] +
+                                      [(_get_maybe_outdated_group, group) for group in maybe_outdated_fragments],
+                                      max_workers=max_workers)
+
+            # all new or refreshed entries are written to cache in a single transaction
+            new_entries = {}
+            try:
+                for fragment_group, data in progress_bar(leave=False, desc="Downloading missing fragments from cache",
+                                                         **kwargs)(zip(missing_fragments, downloads)):
+                    new_entries.update(self._cache.make_cache_entries(
+                        data, fragments=fragment_group, product=product, fragment_duration_hours=fragment_hours,
+                        version=datetime.utcnow(), **kwargs))
+                    if data is not None:
+                        data_chunks.append(data)
+
+                for group, data in progress_bar(leave=False, desc="Checking if cache fragments are outdated",
+                                                **kwargs)(zip(maybe_outdated_fragments, downloads)):
+                    if data is None:
+                        for fragment, entry in group:
+                            entry.version = datetime.utcnow()
+                            new_entries[self._cache.entry_name(self._cache.prefix, product, fragment.isoformat(),
+                                                               **kwargs)] = entry
+                            data_chunks.append(entry.data)
+                    else:
+                        new_entries.update(self._cache.make_cache_entries(
+                            data, [item[0] for item in group], product, fragment_duration_hours=fragment_hours,
+                            version=datetime.now(), **kwargs))
+                        data_chunks.append(data)
+            finally:
+                self._cache.set_cache_entries(new_entries)
 
             if len(data_chunks):
                 if len(data_chunks) == 1:
@@ -272,4 +355,6 @@ class UnversionedProviderCache(object):
 
         if self._cache.leak_cache:
             wrapped.cache = self._cache.cache
+        # gives access to fragments planning and entries handling, for example to pre-populate cache entries
+        wrapped.provider_cache = self._cache
         return wrapped
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Dict, Iterable, List, Union
 
 import diskcache as dc
 from .version import str_to_version, version_to_str, Version
@@ -7,6 +7,8 @@ from contextlib import ExitStack
 
 cache_version = str_to_version("2.0")
 
+_MISSING = object()
+
 
 class CacheItem:
     def __init__(self, data, version):
@@ -82,6 +84,47 @@ class Cache:
     def get(self, key, default_value=None):
         return self._data.get(key, default_value)
 
+    def get_many(self, keys: Iterable[str], default_value=None) -> List:
+        """Gets several entries at once inside a single transaction, each key is looked up only once
+
+        Parameters
+        ----------
+        keys: Iterable[str]
+            entries keys
+        default_value:
+            value returned for missing entries
+
+        Returns
+        -------
+        List
+            entries values in keys order
+        """
+        values = []
+        with self.transact():
+            for key in keys:
+                value = self._data.get(key, _MISSING)
+                if value is _MISSING:
+                    self._miss += 1
+                    values.append(default_value)
+                else:
+                    self._hit += 1
+                    values.append(value)
+        return values
+
+    def set_many(self, items: Dict[str, object], expire=None):
+        """Sets several entries at once inside a single transaction
+
+        Parameters
+        ----------
+        items: Dict[str, object]
+            entries values by key
+        expire: float or None
+            seconds until entries expire (default: None, no expiry)
+        """
+        with self.transact():
+            for key, value in items.items():
+                self._data.set(key, value, expire=expire)
+
     def transact(self):
         if self.cache_type != 'Fanout':
             return self._data.transact()
@@ -1,3 +1,5 @@
+from typing import Dict, List, Optional
+
 import pyistp
 from ...products import SpeasyVariable, VariableAxis, VariableTimeAxis, DataContainer
 
@@ -22,29 +24,43 @@ def _make_axis(axis, time_axis_name):
         is_time_dependent = True
     else:
         is_time_dependent = False
-    return VariableAxis(values=axis.values.copy(), meta=_fix_attributes_types(axis.attributes), name=axis.name,
+    return VariableAxis(values=axis.values, meta=_fix_attributes_types(axis.attributes), name=axis.name,
                         is_time_dependent=is_time_dependent)
 
 
+def _make_variable(istp, variable: str) -> SpeasyVariable or None:
+    if variable in istp.data_variables():
+        var = istp.data_variable(variable)
+    elif variable.replace('-', '_') in istp.data_variables():  # THX CSA/ISTP
+        var = istp.data_variable(variable.replace('-', '_'))
+    elif variable.replace('/', '$') in istp.data_variables():  # CDA
+        var = istp.data_variable(variable.replace('/', '$'))
+    else:
+        return None
+    if var:
+        time_axis_name = var.axes[0].name
+        return SpeasyVariable(
+            axes=[VariableTimeAxis(values=var.axes[0].values,
+                                   meta=_fix_attributes_types(var.axes[0].attributes))] + [
+                     _make_axis(axis, time_axis_name) for axis in var.axes[1:]],
+            values=DataContainer(values=var.values, meta=_fix_attributes_types(var.attributes),
+                                 name=var.name,
+                                 is_time_dependent=True),
+            columns=var.labels)
+    return None
+
+
 def load_variable(variable="", file=None, buffer=None) -> SpeasyVariable or None:
+    # values are not copied, they are owned by the CDF library variables which are only kept alive by these arrays
     istp = pyistp.load(file=file, buffer=buffer)
     if istp:
-        if variable in istp.data_variables():
-            var = istp.data_variable(variable)
-        elif variable.replace('-', '_') in istp.data_variables():  # THX CSA/ISTP
-            var = istp.data_variable(variable.replace('-', '_'))
-        elif variable.replace('/', '$') in istp.data_variables():  # CDA
-            var = istp.data_variable(variable.replace('/', '$'))
-        else:
-            return None
-        if var:
-            time_axis_name = var.axes[0].name
-            return SpeasyVariable(
-                axes=[VariableTimeAxis(values=var.axes[0].values.copy(),
-                                       meta=_fix_attributes_types(var.axes[0].attributes))] + [
-                         _make_axis(axis, time_axis_name) for axis in var.axes[1:]],
-                values=DataContainer(values=var.values.copy(), meta=_fix_attributes_types(var.attributes),
-                                     name=var.name,
-                                     is_time_dependent=True),
-                columns=var.labels)
+        return _make_variable(istp, variable)
     return None
+
+
+def load_variables(variables: List[str], file=None, buffer=None) -> Dict[str, Optional[SpeasyVariable]]:
+    """Same as load_variable for several variables, the file is only loaded once"""
+    istp = pyistp.load(file=file, buffer=buffer)
+    if istp:
+        return {variable: _make_variable(istp, variable) for variable in variables}
+    return {variable: None for variable in variables}
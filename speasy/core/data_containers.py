@@ -179,6 +179,10 @@ class VariableAxis(object):
     def name(self) -> str:
         return self.__data.name
 
+    @property
+    def meta(self) -> Dict:
+        return self.__data.meta
+
     @property
     def nbytes(self) -> int:
         return self.__data.nbytes
@@ -248,6 +252,10 @@ class VariableTimeAxis(object):
     def name(self) -> str:
         return self.__data.name
 
+    @property
+    def meta(self) -> Dict:
+        return self.__data.meta
+
     @property
     def nbytes(self) -> int:
         return self.__data.nbytes
@@ -1,8 +1,8 @@
 import logging
 from datetime import datetime
 from functools import wraps
-from typing import Callable, List, Optional
-from threading import Lock
+from typing import Callable, Dict, List, Optional
+from threading import Lock, RLock
 
 from speasy.core.datetime_range import DateTimeRange
 from speasy.core.inventory import ProviderInventory
@@ -15,6 +15,93 @@ log = logging.getLogger(__name__)
 GET_DATA_ALLOWED_KWARGS = ['product', 'start_time', 'stop_time', 'extra_http_headers', 'progress']
 PROVIDERS = {}
 
+_PROVIDERS_CTORS: Dict[str, Callable[[], "DataProvider"]] = {}
+_PROVIDERS_ALIASES: Dict[str, str] = {}
+_PROVIDERS_BEING_BUILT = set()
+_providers_lock = RLock()
+
+
+def register_provider(name: str, ctor: Callable[[], "DataProvider"], alt_names: List[str] or None = None):
+    """Registers a provider constructor, the provider will only be built on first use through :func:`get_provider`.
+
+    Parameters
+    ----------
+    name: str
+        provider name, must match the name given by the provider to :class:`DataProvider`
+    ctor: Callable[[], DataProvider]
+        function or class building the provider
+    alt_names: List[str] or None
+        alternative names also resolving to this provider
+    """
+    _PROVIDERS_CTORS[name] = ctor
+    for alias in (alt_names or []) + [name]:
+        _PROVIDERS_ALIASES[alias] = name
+
+
+def provider_names(include_alt_names=True) -> List[str]:
+    """Returns registered providers names whether they are already built or not
+
+    Parameters
+    ----------
+    include_alt_names: bool
+        also list alternative names when True (default: True)
+
+    Returns
+    -------
+    List[str]
+        registered providers names
+    """
+    if include_alt_names:
+        return list(_PROVIDERS_ALIASES.keys())
+    return list(_PROVIDERS_CTORS.keys())
+
+
+def canonical_provider_name(name: str) -> Optional[str]:
+    """Returns the name under which the provider matching given name or alternative name is registered
+
+    Parameters
+    ----------
+    name: str
+        provider name or alternative name
+
+    Returns
+    -------
+    Optional[str]
+        the provider name or None if no provider is registered under this name
+    """
+    return _PROVIDERS_ALIASES.get(name)
+
+
+def get_provider(name: str) -> Optional["DataProvider"]:
+    """Returns the provider registered under given name or alternative name, builds it and its inventory on first
+    call.
+
+    Parameters
+    ----------
+    name: str
+        provider name or alternative name
+
+    Returns
+    -------
+    Optional[DataProvider]
+        the provider or None if no provider is registered under this name or if it is being built by the calling
+        thread
+    """
+    name = canonical_provider_name(name)
+    if name is None:
+        return None
+    provider = PROVIDERS.get(name)
+    if provider is not None:
+        return provider
+    with _providers_lock:
+        if name not in PROVIDERS and name not in _PROVIDERS_BEING_BUILT:
+            _PROVIDERS_BEING_BUILT.add(name)
+            try:
+                _PROVIDERS_CTORS[name]()
+            finally:
+                _PROVIDERS_BEING_BUILT.discard(name)
+        return PROVIDERS.get(name)
+
 
 class ParameterRangeCheck(object):
     def __init__(self):
@@ -1,27 +1,193 @@
 from speasy import __version__
+from speasy.config import http as http_cfg
 import platform
 import requests
+from requests.adapters import HTTPAdapter
 from requests.utils import quote as _quote
+from contextlib import contextmanager
+import os
+import shutil
+import tempfile
+from threading import Lock
 from time import sleep
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from urllib.request import urlopen as _urlopen
 import logging
 
 log = logging.getLogger(__name__)
 
 USER_AGENT = f'Speasy/{__version__} {platform.uname()} (SciQLop project)'
 
+_session: Optional[requests.Session] = None
+_session_lock = Lock()
+
+
 def quote(*args, **kwargs):
     return _quote(*args, **kwargs)
 
-def get(url, headers: dict = None, params: dict = None):
+
+def _pool_sizes() -> Dict[str, int]:
+    sizes = {}
+    for entry in filter(None, map(str.strip, http_cfg.pool_sizes().split(','))):
+        host, size = entry.rsplit('=', 1)
+        sizes[host.strip()] = int(size)
+    return sizes
+
+
+def _make_session() -> requests.Session:
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    session.headers['Connection'] = 'keep-alive'
+    default_adapter = HTTPAdapter(pool_connections=http_cfg.pool_connections(), pool_maxsize=http_cfg.pool_size())
+    session.mount('http://', default_adapter)
+    session.mount('https://', default_adapter)
+    # adapters are only mounted here, once for all, since requests.Session looks them up without any lock
+    for host, size in _pool_sizes().items():
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        session.mount(f'http://{host}', adapter)
+        session.mount(f'https://{host}', adapter)
+    return session
+
+
+def session() -> requests.Session:
+    """Returns the requests.Session shared by all speasy requests, connections are kept alive and pooled per host.
+
+    Returns
+    -------
+    requests.Session
+        the shared session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _make_session()
+    return _session
+
+
+def reset_session():
+    """Closes all pooled connections, the next request will open a new session taking into account current
+    configuration.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def stats() -> Dict[str, int]:
+    """Returns pooled connections counters of the current session
+
+    Returns
+    -------
+    Dict[str, int]
+        number of requests sent, of connections opened and of requests sent through an already opened connection
+    """
+    opened = sent = 0
+    if _session is not None:
+        adapters = {id(adapter): adapter for adapter in _session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    sent += pool.num_requests
+    return {
+        "requests": sent,
+        "opened": opened,
+        "reused": max(sent - opened, 0)
+    }
+
+
+def _timeout() -> Tuple[float, float]:
+    return http_cfg.connect_timeout(), http_cfg.read_timeout()
+
+
+def _request(method: str, url: str, headers: dict = None, params: dict = None, timeout=None, **kwargs):
     headers = {} if headers is None else headers
     headers['User-Agent'] = USER_AGENT
-    resp = requests.get(url, headers=headers, params=params)
+    timeout = timeout or _timeout()
+    resp = session().request(method, url, headers=headers, params=params, timeout=timeout, **kwargs)
     while resp.status_code in [429, 503]:
         try:
             delay = float(resp.headers['Retry-After'])
-        except ValueError:
+        except (ValueError, KeyError):
             delay = 5
         log.debug(f"Got {resp.status_code} response, will sleep for {delay} seconds")
+        resp.close()
         sleep(delay)
-        resp = requests.get(url, headers=headers, params=params)
+        resp = session().request(method, url, headers=headers, params=params, timeout=timeout, **kwargs)
     return resp
+
+
+def get(url, headers: dict = None, params: dict = None, timeout=None, stream=False):
+    return _request('GET', url, headers=headers, params=params, timeout=timeout, stream=stream)
+
+
+def head(url, headers: dict = None, params: dict = None, timeout=None):
+    return _request('HEAD', url, headers=headers, params=params, timeout=timeout)
+
+
+@contextmanager
+def urlopen(url: str, timeout=None):
+    """Opens given URL as a binary file like object, http(s) URLs go through the shared session while other schemes
+    such as file:// are handled by urllib.
+
+    Parameters
+    ----------
+    url: str
+        URL to open
+    timeout: float or Tuple[float, float] or None
+        overrides configured timeouts
+
+    Yields
+    ------
+    file like object
+    """
+    if url.startswith('http://') or url.startswith('https://'):
+        resp = get(url, timeout=timeout, stream=True)
+        try:
+            resp.raise_for_status()
+            resp.raw.decode_content = True
+            yield resp.raw
+        finally:
+            resp.close()
+    else:
+        with _urlopen(url, timeout=timeout or http_cfg.read_timeout()) as f:
+            yield f
+
+
+@contextmanager
+def download(url: str, suffix: str = ""):
+    """Streams given URL content into a temporary file, the whole content is never held in memory.
+    Local file:// URLs are used in place.
+
+    Parameters
+    ----------
+    url: str
+        URL to download
+    suffix: str
+        temporary file name suffix
+
+    Yields
+    ------
+    str
+        path to the downloaded file, removed on exit
+    """
+    if url.startswith('file://'):
+        yield unquote(urlparse(url).path)
+        return
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            with urlopen(url) as remote:
+                shutil.copyfileobj(remote, f, length=1 << 20)
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            log.debug(f"Can't remove temporary file {path}: {e}")
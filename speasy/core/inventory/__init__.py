@@ -1,26 +1,175 @@
-from typing import Dict, Callable
+from collections.abc import MutableMapping
+from itertools import chain
+from typing import Dict, Callable, Iterator, List, Optional, Tuple
 from .indexes import ParameterIndex, DatasetIndex, TimetableIndex, ComponentIndex, CatalogIndex, SpeasyIndex
+from ._packed_tree import PackedInventory, pending_node
+
+
+class FlatIndex(MutableMapping):
+    """uid to node mapping of a single node type. Nodes are either registered one by one or looked up in packed
+    subtrees which were not accessed yet, those are only built when requested, a lookup only walks down the path to
+    the requested node.
+    """
+
+    def __init__(self, node_type: type):
+        self._node_type = node_type.__name__
+        self._nodes: Dict[str, SpeasyIndex] = {}
+        self._subtrees: List[Tuple[PackedInventory, int, int, SpeasyIndex]] = []
+        # packed subtrees lookups results, including uids they do not contain
+        self._packed: Dict[str, List[Tuple[PackedInventory, int, int, SpeasyIndex]]] = {}
+        self._packed_count: Optional[int] = None
+        # packed nodes removed from the mapping
+        self._removed = set()
+
+    def add_subtree(self, inventory: PackedInventory, offset: int, root: SpeasyIndex):
+        """Makes nodes of the packed subtree starting at given offset available, root being its not yet accessed
+        first node"""
+        end = int(inventory.nodes[offset]['end'])
+        # as with a dict update, the subtree nodes replace those previously registered or removed
+        for uid in [uid for uid in chain(self._nodes, self._removed)
+                    if any(offset <= found < end for found in inventory.find(self._node_type, uid))]:
+            self._nodes.pop(uid, None)
+            self._removed.discard(uid)
+        self._subtrees.append((inventory, offset, end, root))
+        self._packed.clear()
+        self._packed_count = None
+
+    def _packed_offsets(self, uid: str) -> List[Tuple[PackedInventory, int, int, SpeasyIndex]]:
+        if not self._subtrees:
+            return []
+        offsets = self._packed.get(uid)
+        if offsets is None:
+            offsets = self._packed[uid] = [(inventory, start, offset, root)
+                                           for inventory, start, end, root in self._subtrees
+                                           for offset in inventory.find(self._node_type, uid)
+                                           if start <= offset < end]
+        return offsets
+
+    def _is_packed(self, uid: str) -> bool:
+        return len(self._packed_offsets(uid)) != 0
+
+    def _lookup(self, uid: str) -> Optional[SpeasyIndex]:
+        # as with registered nodes, the last one in tree order wins
+        for inventory, start, offset, root in reversed(self._packed_offsets(uid)):
+            node = inventory.resolve(root, start, offset)
+            if node is not None:
+                return node
+        return None
+
+    def __getitem__(self, uid: str) -> SpeasyIndex:
+        node = self._nodes.get(uid)
+        if node is None:
+            if uid in self._removed:
+                raise KeyError(uid)
+            node = self._lookup(uid)
+            if node is None:
+                raise KeyError(uid)
+            self._nodes[uid] = node
+        return node
+
+    def __setitem__(self, uid: str, node: SpeasyIndex):
+        self._removed.discard(uid)
+        self._nodes[uid] = node
+
+    def __delitem__(self, uid: str):
+        if uid not in self:
+            raise KeyError(uid)
+        self._nodes.pop(uid, None)
+        if self._is_packed(uid):
+            self._removed.add(uid)
+
+    def __contains__(self, uid) -> bool:
+        return uid in self._nodes or (uid not in self._removed and self._is_packed(uid))
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._nodes.keys()
+        seen = set(self._nodes.keys()) | self._removed
+        for inventory, start, end, _ in self._subtrees:
+            for offset in inventory.offsets(self._node_type).tolist():
+                if start <= offset < end:
+                    uid = inventory.uid(offset)
+                    if uid not in seen:
+                        seen.add(uid)
+                        yield uid
+
+    def __len__(self) -> int:
+        if not self._subtrees:
+            return len(self._nodes)
+        if self._packed_count is None:
+            if len(self._subtrees) == 1:
+                inventory, start, end, _ = self._subtrees[0]
+                self._packed_count = inventory.uids_count(self._node_type, start, end)
+            else:
+                # overlapping uids can only be found by comparing them
+                self._packed_count = len({inventory.uid(offset)
+                                          for inventory, start, end, _ in self._subtrees
+                                          for offset in inventory.offsets(self._node_type).tolist()
+                                          if start <= offset < end})
+        registered = sum(1 for uid in self._nodes if not self._is_packed(uid))
+        return self._packed_count + registered - len(self._removed)
+
+    def _load_subtrees(self):
+        # walking packed subtrees builds all their nodes at once, much faster than resolving them one by one
+        packed = {}
+        for _, _, _, root in self._subtrees:
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                if type(node).__name__ == self._node_type:
+                    packed[node.spz_uid()] = node
+                stack.extend(reversed([child for child in node.__dict__.values() if isinstance(child, SpeasyIndex)]))
+        self._subtrees.clear()
+        self._packed.clear()
+        self._packed_count = None
+        for uid, node in packed.items():
+            if uid not in self._nodes and uid not in self._removed:
+                self._nodes[uid] = node
+        self._removed.clear()
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        self._load_subtrees()
+        return self._nodes.values()
+
+    def items(self):
+        self._load_subtrees()
+        return self._nodes.items()
+
+    def _ipython_key_completions_(self) -> List[str]:
+        return list(self)
+
+    def clear(self):
+        self._nodes.clear()
+        self._subtrees.clear()
+        self._packed.clear()
+        self._packed_count = None
+        self._removed.clear()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._node_type}, {len(self)} entries)"
 
 
 class ProviderInventory:
-    parameters: Dict[str, ParameterIndex]
-    datasets: Dict[str, DatasetIndex]
+    parameters: FlatIndex
+    datasets: FlatIndex
     missions: Dict[str, SpeasyIndex]
-    timetables: Dict[str, TimetableIndex]
-    catalogs: Dict[str, CatalogIndex]
-    components: Dict[str, ComponentIndex]
+    timetables: FlatIndex
+    catalogs: FlatIndex
+    components: FlatIndex
 
     _type_lookup: Dict[type, Callable]
 
     def __init__(self):
-        self.parameters = {}
-        self.datasets = {}
+        self.parameters = FlatIndex(ParameterIndex)
+        self.datasets = FlatIndex(DatasetIndex)
         self.instruments = {}
         self.observatories = {}
         self.missions = {}
-        self.timetables = {}
-        self.catalogs = {}
-        self.components = {}
+        self.timetables = FlatIndex(TimetableIndex)
+        self.catalogs = FlatIndex(CatalogIndex)
+        self.components = FlatIndex(ComponentIndex)
         self._type_lookup = {
             ParameterIndex: lambda node: self.parameters.__setitem__(node.spz_uid(), node),
             DatasetIndex: lambda node: self.datasets.__setitem__(node.spz_uid(), node),
@@ -39,14 +188,27 @@ class ProviderInventory:
         self.catalogs.clear()
         self.components.clear()
 
+    def _register_packed_subtree(self, inventory: PackedInventory, offset: int, root: SpeasyIndex):
+        for flat_index in (self.parameters, self.datasets, self.timetables, self.components, self.catalogs):
+            flat_index.add_subtree(inventory, offset, root)
+
     def _register_nodes(self, node: SpeasyIndex):
         if isinstance(node, SpeasyIndex):
             for child in node.__dict__.values():
-                self._type_lookup.get(type(child), lambda _: None)(child)
-                self._register_nodes(child)
+                # packed subtrees are looked up through their uid table, walking them would build every node
+                packed = pending_node(child) if isinstance(child, SpeasyIndex) else None
+                if packed is not None:
+                    self._register_packed_subtree(*packed, root=child)
+                else:
+                    self._type_lookup.get(type(child), lambda _: None)(child)
+                    self._register_nodes(child)
 
     def update(self, root: SpeasyIndex):
-        self._register_nodes(root)
+        packed = pending_node(root)
+        if packed is not None:
+            self._register_packed_subtree(*packed, root=root)
+        else:
+            self._register_nodes(root)
 
 
 class FlatInventories:
@@ -0,0 +1,419 @@
+"""Packed inventory tree format, a whole tree is stored as a few flat arrays instead of nested pickled objects:
+
+    MAGIC | header | string offsets | strings | nodes | entries | uid keys | uid table | pickled extra values
+
+- strings: every name, uid, type and meta-data key or value is stored once, as utf-8 and sorted, node and entry
+  fields only hold string indexes, so that comparing two indexes is the same as comparing their strings
+- nodes: one record per node in depth first order with its type, name, provider and uid, its parent offset and the
+  end of its subtree, so any subtree is the contiguous range [offset, end)
+- entries: node meta-data and children, in the node ``__dict__`` order, a value is either a string index, a child
+  node offset or an index in the pickled list of extra values, which holds meta-data that are not strings
+- uid keys and table: one 64 bits key per node made of its type and uid string indexes, sorted, and the matching
+  nodes offsets, so that a node is found from its uid with a binary search on the keys without walking the tree
+
+Loading only wraps those arrays with numpy.frombuffer, nodes are created empty and only get their meta-data and
+children, themselves empty, once accessed. Strings are decoded on first use.
+"""
+import pickle
+import struct
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .indexes import SpeasyIndex, from_dict, _instance_dict, __INDEXES_TYPES__
+
+MAGIC = b"SPZINV3\0"
+_HEADER = struct.Struct("<QQQQQ")
+_ALIGNMENT = 8
+_PADDING = bytes(_ALIGNMENT)
+
+_NODE_DTYPE = np.dtype([('type', '<u4'), ('name', '<u4'), ('provider', '<u4'), ('uid', '<u4'), ('parent', '<i4'),
+                        ('end', '<u4'), ('first_entry', '<u4'), ('entries', '<u4')])
+_ENTRY_DTYPE = np.dtype([('key', '<u4'), ('kind', 'u1'), ('value', '<u4')])
+
+_STRING_ENTRY = 0
+_CHILD_ENTRY = 1
+_EXTRA_ENTRY = 2
+
+_NODE_FIELDS = ('__spz_type__', '__spz_name__', '__spz_provider__', '__spz_uid__')
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def is_packed_inventory(value) -> bool:
+    return type(value) is bytes and value[:len(MAGIC)] == MAGIC
+
+
+class _StringTable:
+    __slots__ = ['ids', 'strings']
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def __call__(self, string: str) -> int:
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+
+def _uid_key(type_id, uid_id):
+    return (np.asarray(type_id, dtype='<u8') << np.uint64(32)) | np.asarray(uid_id, dtype='<u8')
+
+
+def _flatten(root: SpeasyIndex) -> List[SpeasyIndex]:
+    nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed([child for child in node.__dict__.values() if isinstance(child, SpeasyIndex)]))
+    return nodes
+
+
+def dump_inventory(root: SpeasyIndex) -> bytes:
+    """Packs an inventory tree into a single bytes object
+
+    Parameters
+    ----------
+    root: SpeasyIndex
+        tree root
+
+    Returns
+    -------
+    bytes
+        packed tree, see :class:`PackedInventory` to load it
+    """
+    strings = _StringTable()
+    nodes = _flatten(root)
+    offsets = {id(node): offset for offset, node in enumerate(nodes)}
+    parents = [-1] * len(nodes)
+    last_child = [-1] * len(nodes)
+    node_records = []
+    entry_records = []
+    extras = []
+    for offset, node in enumerate(nodes):
+        first_entry = len(entry_records)
+        for key, value in node.__dict__.items():
+            if key in _NODE_FIELDS:
+                continue
+            if isinstance(value, SpeasyIndex):
+                child = offsets[id(value)]
+                parents[child] = offset
+                last_child[offset] = child
+                entry_records.append((strings(key), _CHILD_ENTRY, child))
+            elif type(value) is str:
+                entry_records.append((strings(key), _STRING_ENTRY, strings(value)))
+            else:
+                entry_records.append((strings(key), _EXTRA_ENTRY, len(extras)))
+                extras.append(value)
+        node_records.append([strings(node.spz_type()), strings(node.spz_name()), strings(node.spz_provider()),
+                             strings(node.spz_uid()), parents[offset], 0, first_entry,
+                             len(entry_records) - first_entry])
+    # depth first order, a subtree ends where its last child subtree ends
+    ends = [0] * len(nodes)
+    for offset in range(len(nodes) - 1, -1, -1):
+        ends[offset] = ends[last_child[offset]] if last_child[offset] != -1 else offset + 1
+    for record, parent, end in zip(node_records, parents, ends):
+        record[4] = parent
+        record[5] = end
+    node_records = np.array(list(map(tuple, node_records)), dtype=_NODE_DTYPE)
+    entries = np.array(entry_records, dtype=_ENTRY_DTYPE)
+
+    # strings are renumbered by value
+    order = sorted(range(len(strings.strings)), key=strings.strings.__getitem__)
+    sorted_strings = [strings.strings[string_id] for string_id in order]
+    new_ids = np.empty(len(order), dtype='<u4')
+    new_ids[order] = np.arange(len(order), dtype='<u4')
+    for field in ('type', 'name', 'provider', 'uid'):
+        node_records[field] = new_ids[node_records[field]]
+    entries['key'] = new_ids[entries['key']]
+    string_entries = entries['kind'] == _STRING_ENTRY
+    entries['value'][string_entries] = new_ids[entries['value'][string_entries]]
+
+    # NUL separated so that all strings can be decoded at once with a single split
+    blob = "\0".join(sorted_strings).encode()
+    string_offsets = np.zeros(len(sorted_strings) + 1, dtype='<u8')
+    np.cumsum([len(string.encode()) + 1 for string in sorted_strings], out=string_offsets[1:])
+    # stable sort, nodes sharing a type and an uid stay in tree order
+    uid_keys = _uid_key(node_records['type'], node_records['uid'])
+    uid_table = np.argsort(uid_keys, kind='stable').astype('<u4')
+    uid_keys = uid_keys[uid_table]
+    extras_bytes = pickle.dumps(extras, protocol=pickle.HIGHEST_PROTOCOL)
+
+    parts = [MAGIC, _HEADER.pack(len(strings.strings), len(blob), len(nodes), len(entries), len(extras_bytes))]
+    offset = len(MAGIC) + _HEADER.size
+    for part in (string_offsets.tobytes(), blob, node_records.tobytes(), entries.tobytes(), uid_keys.tobytes(),
+                 uid_table.tobytes(), extras_bytes):
+        padding = _aligned(offset) - offset
+        parts.append(_PADDING[:padding])
+        parts.append(part)
+        offset += padding + len(part)
+    return b"".join(parts)
+
+
+class PackedInventory:
+    """Read-only view on a packed inventory tree, nothing but the arrays headers is allocated when loading it.
+
+    Parameters
+    ----------
+    buffer: bytes
+        packed tree written by :func:`dump_inventory`
+    """
+    __slots__ = ['_buffer', '_string_offsets', '_blob', '_strings', 'nodes', '_entries', '_uid_keys', '_uid_table',
+                 '_type_ranges', '_extras', '_lock']
+
+    def __init__(self, buffer: bytes):
+        if not is_packed_inventory(buffer):
+            raise ValueError("Not a packed inventory")
+        strings_count, blob_size, nodes_count, entries_count, extras_size = _HEADER.unpack_from(buffer, len(MAGIC))
+        self._buffer = buffer
+        offset = len(MAGIC) + _HEADER.size
+        self._string_offsets, offset = self._array(offset, '<u8', strings_count + 1)
+        offset = _aligned(offset)
+        self._blob = memoryview(buffer)[offset:offset + blob_size]
+        self.nodes, offset = self._array(offset + blob_size, _NODE_DTYPE, nodes_count)
+        self._entries, offset = self._array(offset, _ENTRY_DTYPE, entries_count)
+        self._uid_keys, offset = self._array(offset, '<u8', nodes_count)
+        self._uid_table, offset = self._array(offset, '<u4', nodes_count)
+        self._type_ranges: Dict[str, Tuple[int, int]] = {}
+        offset = _aligned(offset)
+        self._extras = memoryview(buffer)[offset:offset + extras_size]
+        self._strings: List[str or None] or None = None
+        # nodes can be accessed from several threads, they are loaded one at a time
+        self._lock = Lock()
+
+    def __reduce__(self):
+        # not yet loaded nodes refer to their inventory, they can still be pickled
+        return PackedInventory, (self._buffer,)
+
+    def _array(self, offset: int, dtype, count: int):
+        offset = _aligned(offset)
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._buffer, dtype=dtype, count=count, offset=offset), offset + count * dtype.itemsize
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _decoded_strings(self) -> List[str or None]:
+        if self._strings is None:
+            # python integers are much faster to index and slice with than numpy scalars
+            self._string_offsets = self._string_offsets.tolist()
+            self._strings = [None] * (len(self._string_offsets) - 1)
+        return self._strings
+
+    def _decode(self, string_id: int) -> str:
+        string = self._strings[string_id] = str(
+            self._blob[self._string_offsets[string_id]:self._string_offsets[string_id + 1] - 1], 'utf-8')
+        return string
+
+    def string(self, string_id: int) -> str:
+        return self._decoded_strings()[string_id] or self._decode(string_id)
+
+    def _extra_values(self) -> List[Any]:
+        if type(self._extras) is memoryview:
+            self._extras = pickle.loads(self._extras)
+        return self._extras
+
+    def parent(self, offset: int) -> int:
+        return int(self.nodes[offset]['parent'])
+
+    def entries(self, offset: int) -> np.ndarray:
+        first = int(self.nodes[offset]['first_entry'])
+        return self._entries[first:first + int(self.nodes[offset]['entries'])]
+
+    def children(self, offset: int) -> List[int]:
+        entries = self.entries(offset)
+        return entries['value'][entries['kind'] == _CHILD_ENTRY].tolist()
+
+    def node(self, offset: int = 0) -> SpeasyIndex:
+        """Returns a new node for given offset, its content and its children are only loaded once any of its
+        attributes is accessed
+
+        Parameters
+        ----------
+        offset: int
+            node offset, 0 is the tree root
+
+        Returns
+        -------
+        SpeasyIndex
+            a node of the matching SpeasyIndex subclass
+        """
+        return self._new_node(offset, self.string(int(self.nodes[offset]['type'])))
+
+    def string_id(self, string: str) -> Optional[int]:
+        """Returns the index of given string, None if this inventory does not contain it"""
+        strings = self._decoded_strings()
+        # strings are sorted
+        low, high = 0, len(strings)
+        while low < high:
+            middle = (low + high) // 2
+            if (strings[middle] or self._decode(middle)) < string:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(strings) and (strings[low] or self._decode(low)) == string:
+            return low
+        return None
+
+    def _type_range(self, node_type: str) -> Tuple[Optional[int], int, int]:
+        """Returns given type string index and the range of its nodes in the uid table"""
+        type_range = self._type_ranges.get(node_type)
+        if type_range is None:
+            type_id = self.string_id(node_type)
+            if type_id is None:
+                type_range = (None, 0, 0)
+            else:
+                start, stop = np.searchsorted(self._uid_keys, _uid_key([type_id, type_id + 1], 0)).tolist()
+                type_range = (type_id, start, stop)
+            self._type_ranges[node_type] = type_range
+        return type_range
+
+    def find(self, node_type: str, uid: str) -> List[int]:
+        """Looks up nodes by type and uid in the uid table
+
+        Parameters
+        ----------
+        node_type: str
+            SpeasyIndex subclass name such as ParameterIndex
+        uid: str
+            node uid
+
+        Returns
+        -------
+        List[int]
+            offsets of all matching nodes in tree order, usually a single one
+        """
+        type_id, type_start, type_stop = self._type_range(node_type)
+        if type_start == type_stop:
+            return []
+        uid_id = self.string_id(uid)
+        if uid_id is None:
+            return []
+        key = _uid_key(type_id, uid_id)
+        start, stop = np.searchsorted(self._uid_keys[type_start:type_stop], [key, key + np.uint64(1)]).tolist()
+        return self._uid_table[type_start + start:type_start + stop].tolist()
+
+    def offsets(self, node_type: str) -> np.ndarray:
+        """Returns offsets of all nodes of given type, sorted by uid"""
+        _, start, stop = self._type_range(node_type)
+        return self._uid_table[start:stop]
+
+    def uids_count(self, node_type: str, start: int, end: int) -> int:
+        """Returns the number of distinct uids of nodes of given type in the subtree range [start, end)"""
+        _, type_start, type_stop = self._type_range(node_type)
+        offsets = self._uid_table[type_start:type_stop]
+        keys = self._uid_keys[type_start:type_stop][(offsets >= start) & (offsets < end)]
+        # keys are sorted, duplicated uids are next to each other
+        return int(np.count_nonzero(keys[1:] != keys[:-1])) + 1 if len(keys) else 0
+
+    def uid(self, offset: int) -> str:
+        return self.string(int(self.nodes[offset]['uid']))
+
+    def resolve(self, anchor: SpeasyIndex, anchor_offset: int, offset: int) -> Optional[SpeasyIndex]:
+        """Returns the node at given offset by walking down from anchor, a node of this inventory at anchor_offset,
+        so that returned nodes are the ones of the tree anchor belongs to
+
+        Returns
+        -------
+        SpeasyIndex or None
+            the node or None if it is no longer in the tree
+        """
+        keys = []
+        while offset != anchor_offset:
+            if offset < anchor_offset:
+                return None
+            parent = self.parent(offset)
+            entries = self.entries(parent)
+            slot = np.nonzero((entries['kind'] == _CHILD_ENTRY) & (entries['value'] == offset))[0][0]
+            keys.append(self.string(int(entries['key'][slot])))
+            offset = parent
+        node = anchor
+        for key in reversed(keys):
+            node = node.__dict__.get(key)
+            if not isinstance(node, SpeasyIndex):
+                return None
+        return node
+
+    def _new_node(self, offset: int, node_type: str) -> SpeasyIndex:
+        node_type = __INDEXES_TYPES__.get(node_type, SpeasyIndex)
+        node = node_type.__new__(node_type)
+        _instance_dict(node)['__spz_loader__'] = _NodeLoader(self, offset)
+        return node
+
+    def _load(self, offset: int, node: SpeasyIndex):
+        attributes = _instance_dict(node)
+        with self._lock:
+            # the loader is only removed once the node is complete, so other threads never see a partial node
+            if '__spz_loader__' not in attributes:
+                return
+            strings = self._decoded_strings()
+            decode = self._decode
+            node_type, name, provider, uid, _, _, first, count = self.nodes[offset].tolist()
+            entries = self._entries[first:first + count].tolist()
+            children_types = iter(self.nodes['type'][
+                [value for _, kind, value in entries if kind == _CHILD_ENTRY]].tolist() if count else [])
+            for key, kind, value in entries:
+                key = strings[key] or decode(key)
+                if kind == _STRING_ENTRY:
+                    attributes[key] = strings[value] or decode(value)
+                elif kind == _CHILD_ENTRY:
+                    child_type = next(children_types)
+                    attributes[key] = self._new_node(value, strings[child_type] or decode(child_type))
+                else:
+                    attributes[key] = self._extra_values()[value]
+            attributes['__spz_provider__'] = strings[provider] or decode(provider)
+            attributes['__spz_name__'] = strings[name] or decode(name)
+            attributes['__spz_uid__'] = strings[uid] or decode(uid)
+            attributes['__spz_type__'] = strings[node_type] or decode(node_type)
+            del attributes['__spz_loader__']
+
+
+def pending_node(node: SpeasyIndex) -> Optional[Tuple[PackedInventory, int]]:
+    """Returns the packed inventory and offset of a node which was not accessed yet, None for any other node"""
+    loader = _instance_dict(node).get('__spz_loader__')
+    if type(loader) is _NodeLoader:
+        return loader.inventory, loader.offset
+    return None
+
+
+class _NodeLoader:
+    __slots__ = ['inventory', 'offset']
+
+    def __init__(self, inventory: PackedInventory, offset: int):
+        self.inventory = inventory
+        self.offset = offset
+
+    def __reduce__(self):
+        return _NodeLoader, (self.inventory, self.offset)
+
+    def __call__(self, node: SpeasyIndex):
+        self.inventory._load(self.offset, node)
+
+
+def load_inventory(value) -> SpeasyIndex or None:
+    """Loads an inventory tree saved either packed or with former formats, a to_dict nested dict or a SpeasyIndex
+
+    Parameters
+    ----------
+    value: bytes or dict or SpeasyIndex or None
+        saved inventory
+
+    Returns
+    -------
+    SpeasyIndex or None
+        the inventory tree, None if value is None or was saved with another version of the packed format
+    """
+    if is_packed_inventory(value):
+        return PackedInventory(value).node(0)
+    if type(value) is dict:
+        return from_dict(value)
+    if isinstance(value, SpeasyIndex):
+        return value
+    return None
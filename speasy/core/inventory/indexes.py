@@ -4,7 +4,16 @@ import json
 __INDEXES_TYPES__ = {}
 
 
-class SpeasyIndex:
+class _InstanceDict:
+    pass
+
+
+# SpeasyIndex overrides __dict__, these give access to the actual instance dictionary
+_instance_dict = _InstanceDict.__dict__['__dict__'].__get__
+_set_instance_dict = _InstanceDict.__dict__['__dict__'].__set__
+
+
+class SpeasyIndex(_InstanceDict):
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         __INDEXES_TYPES__[cls.__name__] = cls
@@ -17,6 +26,27 @@ class SpeasyIndex:
         self.__spz_uid__ = uid
         self.__spz_type__ = self.__class__.__name__
 
+    # nodes from a packed inventory are empty and hold a loader until they are accessed, either through __dict__ or
+    # through any attribute since they are all missing, loaded nodes are regular objects without any access overhead
+    @property
+    def __dict__(self):
+        attributes = _instance_dict(self)
+        loader = attributes.get('__spz_loader__')
+        if loader is not None:
+            loader(self)
+        return attributes
+
+    @__dict__.setter
+    def __dict__(self, attributes: dict):
+        _set_instance_dict(self, attributes)
+
+    def __getattr__(self, item):
+        loader = _instance_dict(self).get('__spz_loader__')
+        if loader is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{item}'")
+        loader(self)
+        return object.__getattribute__(self, item)
+
     def __eq__(self, other):
         return self.__dict__ == other.__dict__
 
@@ -14,6 +14,7 @@ from ... import SpeasyIndex
 from ...products.variable import from_dictionary as var_from_dict
 from .. import http
 from ..inventory.indexes import from_dict as inventory_from_dict
+from ..inventory._packed_tree import dump_inventory, load_inventory
 from ..index import index
 
 log = logging.getLogger(__name__)
@@ -84,7 +85,7 @@ class GetProduct:
 class GetInventory:
     @staticmethod
     def get(provider: str, **kwargs):
-        saved_inventory: SpeasyIndex = index.get("proxy_inventories", provider, None)
+        saved_inventory: SpeasyIndex = load_inventory(index.get("proxy_inventories", provider, None))
         saved_inventory_dt: datetime = index.get("proxy_inventories_save_date", provider, datetime.utcfromtimestamp(0))
         if saved_inventory_dt + timedelta(days=inventories_cfg.cache_retention_days.get()) > datetime.utcnow():
             return saved_inventory
@@ -100,7 +101,7 @@ class GetInventory:
         log.debug(f"Asking {provider} inventory from proxy {resp.url}, {resp.request.headers}")
         if resp.status_code == 200:
             inventory = inventory_from_dict(pickle.loads(decompress(resp.content)))
-            index.set("proxy_inventories", provider, inventory)
+            index.set("proxy_inventories", provider, dump_inventory(inventory))
             index.set("proxy_inventories_save_date", provider, datetime.utcnow())
             return inventory
         if resp.status_code == 304:
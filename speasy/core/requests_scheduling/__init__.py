@@ -1,2 +1,2 @@
 from .split_large_requests import SplitLargeRequests
-from .request_dispatch import get_data
+from .request_dispatch import get_data, aget_data
@@ -1,5 +1,10 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Iterable, List, Optional, Tuple, Union, overload
+from functools import partial
+from itertools import zip_longest
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union, overload
 
 import numpy as np
 
@@ -10,7 +15,9 @@ from ..inventory.indexes import (CatalogIndex, ComponentIndex,
 from ...products import *
 from ...webservices import (AMDA_Webservice, CDA_Webservice, CSA_Webservice,
                             SSC_Webservice)
+from ...config import requests_scheduling as requests_scheduling_cfg
 from .. import is_collection, progress_bar
+from ..dataprovider import canonical_provider_name, get_provider, provider_names, register_provider
 from ..datetime_range import DateTimeRange
 
 TimeT = Union[str, datetime, float, np.datetime64]
@@ -18,23 +25,30 @@ TimeRangeT = Union[DateTimeRange, Tuple[TimeT, TimeT]]
 TimeSerieIndexT = Union[ParameterIndex, ComponentIndex]
 TimeRangeCollectionT = Union[TimetableIndex, CatalogIndex, Iterable[Iterable[Union[TimeT]]]]
 
-amda = AMDA_Webservice()
-cda = CDA_Webservice()
-ssc = SSC_Webservice()
-csa = CSA_Webservice()
+register_provider('amda', AMDA_Webservice)
+register_provider('cda', CDA_Webservice, alt_names=['cdaweb'])
+register_provider('ssc', SSC_Webservice, alt_names=['sscweb'])
+register_provider('csa', CSA_Webservice)
 
-PROVIDERS = {
-    'amda': amda,
-    'cdaweb': cda,
-    'cda': cda,
-    'sscweb': ssc,
-    'ssc': ssc,
-    'csa': csa
-}
+
+_PROVIDERS_SEMAPHORES: Dict[str, BoundedSemaphore] = {}
+_providers_semaphores_lock = Lock()
+
+_async_executor: Optional[ThreadPoolExecutor] = None
+_async_executor_size = 0
+_async_executor_lock = Lock()
 
 
 def list_providers() -> List[str]:
-    return list(PROVIDERS.keys())
+    return provider_names()
+
+
+def _provider_semaphore(provider_name: str) -> BoundedSemaphore:
+    with _providers_semaphores_lock:
+        if provider_name not in _PROVIDERS_SEMAPHORES:
+            _PROVIDERS_SEMAPHORES[provider_name] = BoundedSemaphore(
+                requests_scheduling_cfg.max_concurrent_requests_per_provider())
+        return _PROVIDERS_SEMAPHORES[provider_name]
 
 
 @overload
@@ -131,8 +145,10 @@ def provider_and_product(path_or_product: str or SpeasyIndex) -> (str, str):
 
 def _scalar_get_data(index, *args, **kwargs):
     provider_uid, product_uid = provider_and_product(index)
-    if provider_uid in PROVIDERS:
-        return PROVIDERS[provider_uid].get_data(product_uid, *args, **kwargs)
+    provider = get_provider(provider_uid)
+    if provider is not None:
+        with _provider_semaphore(provider.provider_name):
+            return provider.get_data(product_uid, *args, **kwargs)
     raise ValueError(f"Can't find a provider for {index}")
 
 
@@ -165,6 +181,113 @@ def _is_dtrange(value):
         hasattr(value, '__len__') and len(value) == 2 and _could_be_datetime(value[0]) and _could_be_datetime(value[1]))
 
 
+def _plan_requests(*args, **kwargs):
+    """Follows get_data dispatch rules but returns pending requests nested in lists instead of results, so they can
+    be executed concurrently while keeping get_data results shape.
+    """
+    product = args[0]
+    if is_collection(product) and not isinstance(product, SpeasyIndex):
+        return [_plan_requests(p, *args[1:], **kwargs) for p in product]
+
+    if len(args) == 1:
+        return partial(_get_catalog_or_timetable, *args, **kwargs)
+    if len(args) == 2:
+        t_range = args[1]
+        if _is_dtrange(t_range):
+            return partial(_get_timeserie1, *args, **kwargs)
+        if is_collection(t_range):
+            return [_plan_requests(product, r, *args[2:], **kwargs) for r in t_range]
+        return _plan_requests(product, get_data(t_range), *args[2:], **kwargs)
+    if len(args) == 3:
+        return partial(_get_timeserie2, *args, **kwargs)
+
+
+def _request_provider(request: partial) -> Optional[str]:
+    try:
+        provider_uid = provider_and_product(request.args[0])[0]
+    except (ValueError, TypeError):
+        return None
+    return canonical_provider_name(provider_uid) or provider_uid
+
+
+def _interleave_by_provider(requests: List[partial]) -> List[int]:
+    """Returns requests indexes alternating between providers, this way per provider limits do not leave the whole
+    pool waiting on a single provider.
+    """
+    by_provider = {}
+    for index, request in enumerate(requests):
+        by_provider.setdefault(_request_provider(request), []).append(index)
+    return [index for indexes in zip_longest(*by_provider.values()) for index in indexes if index is not None]
+
+
+def _execute_requests(requests: List[Callable], parallel: int, **kwargs) -> List:
+    progress = progress_bar(leave=True, **kwargs)
+    if parallel <= 1 or len(requests) <= 1:
+        return [request() for request in progress(requests)]
+    futures = [None] * len(requests)
+    with ThreadPoolExecutor(max_workers=min(parallel, len(requests))) as executor:
+        for index in _interleave_by_provider(requests):
+            futures[index] = executor.submit(requests[index])
+        for _ in progress(as_completed(futures)):
+            pass
+    return [future.result() for future in futures]
+
+
+def _flatten_plan(plan) -> Tuple[Union[list, int], List[Callable]]:
+    requests = []
+
+    def _flatten(node):
+        if type(node) is list:
+            return [_flatten(child) for child in node]
+        requests.append(node)
+        return len(requests) - 1
+
+    return _flatten(plan), requests
+
+
+def _rebuild_results(shape, results: List):
+    if type(shape) is list:
+        return [_rebuild_results(child, results) for child in shape]
+    return results[shape]
+
+
+def _run_requests(plan, parallel: int, **kwargs):
+    shape, requests = _flatten_plan(plan)
+    return _rebuild_results(shape, _execute_requests(requests, parallel=parallel, **kwargs))
+
+
+def _get_async_executor(workers: int) -> ThreadPoolExecutor:
+    """Returns the shared aget_data executor, replaced by a larger one when less than given workers count"""
+    global _async_executor, _async_executor_size
+    with _async_executor_lock:
+        if _async_executor is None or _async_executor_size < workers:
+            # the replaced executor is never shut down since running aget_data calls may still submit to it, its idle
+            # threads exit once it is garbage collected
+            _async_executor_size = max(workers, requests_scheduling_cfg.async_parallel())
+            _async_executor = ThreadPoolExecutor(max_workers=_async_executor_size,
+                                                 thread_name_prefix="speasy-aget_data")
+        return _async_executor
+
+
+async def _aexecute_requests(requests: List[Callable], parallel: int) -> List:
+    loop = asyncio.get_running_loop()
+    parallel = max(parallel, 1)
+    # requests wait here rather than in executor threads, per provider limits are taken by each request in
+    # _scalar_get_data, interleaving providers keeps most of the running requests from waiting on a single one
+    slots = asyncio.Semaphore(parallel)
+
+    async def _run(request):
+        async with slots:
+            # looked up on each submit, so requests go to the latest executor if another call grew it
+            return await loop.run_in_executor(_get_async_executor(parallel), request)
+
+    results = [None] * len(requests)
+    order = _interleave_by_provider(requests)
+    for index, result in zip(order, await asyncio.gather(*[_run(requests[index]) for index in order])):
+        results[index] = result
+    return results
+
+
 def get_data(*args, **kwargs) -> MaybeAnyProduct:
     """Retrieve requested product(s).
     Speasy gives access to two kind of products, time-dependent products such as physical measurements or trajectories
@@ -201,8 +324,15 @@ def get_data(*args, **kwargs) -> MaybeAnyProduct:
             ignore proxy configuration and always bypass proxy server when True (default: False).
         - disable_cache: bool
             ignore cache content when True (default: False).
+        - max_parallel_downloads: int
+            maximum number of missing cache fragments groups downloaded concurrently
+            (default: speasy.config.cache.max_parallel_downloads).
         - progress: bool
             show progress bar when True (default: False).
+        - parallel: int
+            maximum number of requests executed concurrently when several products or time ranges are requested,
+            requests to a same provider are also limited by speasy.config.requests_scheduling.max_concurrent_requests_per_provider
+            (default: speasy.config.requests_scheduling.parallel).
 
     Returns
     -------
@@ -288,21 +418,120 @@ def get_data(*args, **kwargs) -> MaybeAnyProduct:
     args, kwargs = _compile_args(*args, **kwargs)
     if len(args) == 0:
         raise ValueError("You must at least provide a product to retrieve")
+    parallel = kwargs.pop('parallel', None)
+    if parallel is None:
+        parallel = requests_scheduling_cfg.parallel()
 
-    product = args[0]
-    if is_collection(product) and not isinstance(product, SpeasyIndex):
-        return list(map(lambda p: get_data(p, *args[1:], **kwargs), progress_bar(leave=True, **kwargs)(product)))
+    return _run_requests(_plan_requests(*args, **kwargs), parallel=parallel, **kwargs)
 
-    if len(args) == 1:
-        return _get_catalog_or_timetable(*args, **kwargs)
-    if len(args) == 2:
-        t_range = args[1]
-        if _is_dtrange(t_range):
-            return _get_timeserie1(*args, **kwargs)
-        if is_collection(t_range):
-            return list(
-                map(lambda r: get_data(product, r, *args[2:], **kwargs),
-                    progress_bar(leave=False, **kwargs)(t_range)))
-        return get_data(product, get_data(t_range), *args[2:], **kwargs)
-    if len(args) == 3:
-        return _get_timeserie2(*args, **kwargs)
+
+@overload
+async def aget_data(product: CatalogIndex, **kwargs) -> Catalog:
+    ...
+
+
+@overload
+async def aget_data(product: TimetableIndex, **kwargs) -> TimeTable:
+    ...
+
+
+@overload
+async def aget_data(product: str, **kwargs) -> TimeTable or Catalog:
+    ...
+
+
+@overload
+async def aget_data(product: DatasetIndex, start_time: TimeT, stop_time: TimeT, **kwargs) -> Dataset or None:
+    ...
+
+
+@overload
+async def aget_data(product: DatasetIndex, time_range: TimeRangeT, **kwargs) -> Dataset or None:
+    ...
+
+
+@overload
+async def aget_data(product: DatasetIndex, time_range: Iterable[TimeRangeT], **kwargs) -> List[
+    Optional[Dataset]] or None:
+    ...
+
+
+@overload
+async def aget_data(product: TimeSerieIndexT, start_time: TimeT, stop_time: TimeT, **kwargs) -> SpeasyVariable or None:
+    ...
+
+
+@overload
+async def aget_data(product: TimeSerieIndexT, time_range: TimeRangeT, **kwargs) -> SpeasyVariable or None:
+    ...
+
+
+@overload
+async def aget_data(product: TimeSerieIndexT, time_range: Iterable[TimeRangeT], **kwargs) -> List[Optional[
+    SpeasyVariable]] or None:
+    ...
+
+
+@overload
+async def aget_data(product: TimeSerieIndexT, time_range: TimeRangeCollectionT, **kwargs) -> List[Optional[
+    SpeasyVariable]] or None:
+    ...
+
+
+@overload
+async def aget_data(product: Iterable[TimeSerieIndexT], start_time: TimeT, stop_time: TimeT,
+                    **kwargs) -> List[Optional[SpeasyVariable]] or None:
+    ...
+
+
+@overload
+async def aget_data(product: Iterable[TimeSerieIndexT], time_range: TimeRangeCollectionT, **kwargs) -> List[List[
+    Optional[SpeasyVariable]]] or None:
+    ...
+
+
+async def aget_data(*args, **kwargs) -> MaybeAnyProduct:
+    """Asynchronous version of :func:`speasy.get_data`, accepts the same arguments and returns the same results.
+
+    Requests are executed by the same providers and go through the same cache as :func:`speasy.get_data` but in a
+    pool of worker threads, so downloads, decoding and cache accesses never block the event loop. Requests waiting for
+    a free slot are suspended coroutines, so thousands of time ranges can be requested at once.
+
+    Parameters
+    ----------
+    args :
+        see :func:`speasy.get_data`
+    kwargs :
+        see :func:`speasy.get_data`, except for:
+
+        - parallel: int
+            maximum number of requests executed concurrently, the worker threads pool grows to this size when needed,
+            requests to a same provider are also limited by
+            speasy.config.requests_scheduling.max_concurrent_requests_per_provider
+            (default: speasy.config.requests_scheduling.async_parallel).
+
+    Returns
+    -------
+        requested product(s) according to given parameters, either a single product or a collection of products.
+
+    Examples
+    --------
+
+    >>> import asyncio
+    >>> import speasy as spz
+    >>> asyncio.run(spz.aget_data("amda/imf_gsm", [["2016-10-10", "2016-10-11"],
+    ...                                            ["2017-10-10", "2017-10-11"]]))
+    [<speasy.products.variable.SpeasyVariable object at ...>, <speasy.products.variable.SpeasyVariable object at ...>]
+
+    """
+    args, kwargs = _compile_args(*args, **kwargs)
+    if len(args) == 0:
+        raise ValueError("You must at least provide a product to retrieve")
+    parallel = kwargs.pop('parallel', None)
+    if parallel is None:
+        parallel = requests_scheduling_cfg.async_parallel()
+    # planning might download a timetable or a catalog used as time ranges collection
+    plan = await asyncio.get_running_loop().run_in_executor(_get_async_executor(parallel),
+                                                            partial(_plan_requests, *args, **kwargs))
+    shape, requests = _flatten_plan(plan)
+    return _rebuild_results(shape, await _aexecute_requests(requests, parallel=parallel))
@@ -1,7 +1,32 @@
 from types import SimpleNamespace
 from speasy.core.inventory import FlatInventories
 
-flat_inventories = FlatInventories()
-tree = SimpleNamespace()
-data_tree = tree
 
+class _LazyProviders:
+    """Builds the matching provider on first access to a missing entry, this is what allows `import speasy` to not
+    build every inventory."""
+    _include_alt_names = True
+
+    def __getattr__(self, item):
+        if not item.startswith('_'):
+            from speasy.core.dataprovider import get_provider
+            if get_provider(item) is not None and item in self.__dict__:
+                return self.__dict__[item]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {item!r}")
+
+    def __dir__(self):
+        from speasy.core.dataprovider import provider_names
+        return sorted(set(super().__dir__()) | set(provider_names(include_alt_names=self._include_alt_names)))
+
+
+class _LazyFlatInventories(_LazyProviders, FlatInventories):
+    pass
+
+
+class _LazyTree(_LazyProviders, SimpleNamespace):
+    _include_alt_names = False
+
+
+flat_inventories = _LazyFlatInventories()
+tree = _LazyTree()
+data_tree = tree
@@ -550,8 +550,79 @@ def to_dataframe(var: SpeasyVariable) -> pds.DataFrame:
     return SpeasyVariable.to_dataframe(var)
 
 
+class SpeasyVariableBuilder:
+    """Incrementally assembles time ordered variable fragments into a single variable.
+
+    Fragments are only referenced when appended, overlaps are resolved on the fly (the last appended fragment wins)
+    and :meth:`build` allocates the resulting variable once and copies each kept sample once.
+    """
+    __slots__ = ['__fragments', '__template']
+
+    def __init__(self):
+        self.__fragments: List[List[SpeasyVariable or int]] = []
+        self.__template: Optional[SpeasyVariable] = None
+
+    def __len__(self):
+        return sum(length for _, length in self.__fragments)
+
+    def append(self, variable: Optional[SpeasyVariable]) -> "SpeasyVariableBuilder":
+        """Appends a fragment, fragments are expected to be appended in time order of their first sample.
+        A fragment covered by the previous one is ignored while samples of previous fragments overlapping given one
+        are dropped.
+
+        Parameters
+        ----------
+        variable : Optional[SpeasyVariable]
+            fragment to append, None or empty fragments are ignored
+
+        Returns
+        -------
+        SpeasyVariableBuilder
+            self
+        """
+        if variable is None:
+            return self
+        if self.__template is None:
+            self.__template = variable
+        if len(variable) == 0:
+            return self
+        time = variable.time
+        while len(self.__fragments):
+            last, last_length = self.__fragments[-1]
+            if last.time[last_length - 1] >= time[-1]:
+                return self
+            kept = int(np.searchsorted(last.time[:last_length], time[0], side='left'))
+            if kept:
+                self.__fragments[-1][1] = kept
+                break
+            self.__fragments.pop()
+        self.__fragments.append([variable, len(variable)])
+        return self
+
+    def build(self) -> Optional[SpeasyVariable]:
+        """Builds a variable from appended fragments
+
+        Returns
+        -------
+        Optional[SpeasyVariable]
+            a new variable, an empty one if all fragments were empty or None if no fragment was appended
+        """
+        if len(self.__fragments) == 0:
+            if self.__template is not None:
+                return SpeasyVariable.reserve_like(self.__template, length=0)
+            return None
+        result = SpeasyVariable.reserve_like(self.__fragments[0][0], len(self))
+        pos = 0
+        for fragment, length in self.__fragments:
+            result[pos: pos + length] = fragment[0:length]
+            pos += length
+        return result
+
+
 def merge(variables: List[SpeasyVariable]) -> Optional[SpeasyVariable]:
     """Merge a list of :class:`~speasy.common.variable.SpeasyVariable` objects.
+    When fragments overlap, samples of the one starting last are kept. Runs in a single pass over given fragments
+    samples, see :class:`SpeasyVariableBuilder` to assemble fragments incrementally.
 
     Parameters
     ----------
@@ -565,49 +636,12 @@ def merge(variables: List[SpeasyVariable]) -> Optional[SpeasyVariable]:
     """
     if len(variables) == 0:
         return None
-    sorted_var_list = [v for v in variables if (
-        v is not None) and (len(v.time) > 0)]
-    sorted_var_list.sort(key=lambda v: v.time[0])
-
-    # drop variables covered by previous ones
-    for prev, current in zip(sorted_var_list[:-1], sorted_var_list[1:]):
-        if prev.time[-1] >= current.time[-1]:
-            sorted_var_list.remove(current)
-
-    # drop variables covered by next ones
-    for current, nxt in zip(sorted_var_list[:-1], sorted_var_list[1:]):
-        if nxt.time[0] == current.time[0] and nxt.time[-1] >= current.time[-1]:
-            sorted_var_list.remove(current)
-
-    if len(sorted_var_list) == 0:
+    builder = SpeasyVariableBuilder()
+    for variable in sorted(filter(lambda v: (v is not None) and len(v), variables), key=lambda v: v.time[0]):
+        builder.append(variable)
+    if len(builder) == 0:
         for v in variables:
             if v is not None:
                 return SpeasyVariable.reserve_like(v, length=0)
         return None
-
-    overlaps = [
-        np.where(current.time >= nxt.time[0])[0][0]
-        if current.time[-1] >= nxt.time[0]
-        else -1
-        for current, nxt in zip(sorted_var_list[:-1], sorted_var_list[1:])
-    ]
-
-    dest_len = int(
-        np.sum(
-            [
-                overlap if overlap != -1 else len(r.time)
-                for overlap, r in zip(overlaps, sorted_var_list[:-1])
-            ]
-        )
-    )
-    dest_len += len(sorted_var_list[-1].time)
-
-    result = SpeasyVariable.reserve_like(sorted_var_list[0], dest_len)
-
-    pos = 0
-
-    for r, overlap in zip(sorted_var_list, overlaps + [-1]):
-        frag_len = len(r.time) if overlap == -1 else overlap
-        result[pos: (pos + frag_len)] = r[0:frag_len]
-        pos += frag_len
-    return result
+    return builder.build()
@@ -5,18 +5,30 @@ from typing import Dict, Optional
 
 # General modules
 from ...config import amda as amda_cfg
+from ...core import parallel_imap
 from ...core.cache import CacheCall
 from ...core.inventory.indexes import SpeasyIndex
 from ...inventories import flat_inventories
-from ...products.variable import SpeasyVariable, merge
+from ...products.variable import SpeasyVariable, SpeasyVariableBuilder
 from . import rest_client
 from .exceptions import MissingCredentials
 from .inventory import AmdaXMLParser
 from .rest_client import auth_args
-from .utils import load_catalog, load_csv, load_timetable
+from .utils import load_catalog, load_cdf, load_csv, load_timetable
 
 log = logging.getLogger(__name__)
 
+OUTPUT_FORMATS = ('ASCII', 'CDF_ISTP')
+
+
+def output_format_name(output_format: str or None) -> str:
+    """Returns given AMDA output format in upper case or amda output_format configuration entry when None, raises
+    ValueError if it is not supported"""
+    output_format = (output_format or amda_cfg.output_format()).upper()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported AMDA output format: {output_format}, expecting one of {OUTPUT_FORMATS}")
+    return output_format
+
 
 def credential_are_valid():
     login = amda_cfg.username()
@@ -42,6 +54,8 @@ def is_private(node):
 class AmdaImpl:
     def __init__(self, server_url: str = amda_cfg.entry_point()):
         self.server_url = server_url
+        # parameters missing from AMDA CDF responses, those are directly downloaded in ASCII format
+        self._ascii_only_parameters = set()
 
     def _update_private_lists(self, TimeTables: SpeasyIndex, Catalogs: SpeasyIndex, root: SpeasyIndex):
         if credential_are_valid():
@@ -91,22 +105,47 @@ class AmdaImpl:
         self._update_private_lists(TimeTables=root.TimeTables, Catalogs=root.Catalogs, root=root)
         return root
 
-    def dl_parameter_chunk(self, start_time: datetime, stop_time: datetime, parameter_id: str,
-                           extra_http_headers: Dict or None = None, **kwargs) -> Optional[
-        SpeasyVariable]:
+    def _dl_cdf_parameter_chunk(self, start_time: datetime, stop_time: datetime, parameter_id: str,
+                                extra_http_headers: Dict or None = None, **kwargs) -> Optional[SpeasyVariable]:
+        url = rest_client.get_parameter(server_url=self.server_url, startTime=start_time.timestamp(),
+                                        stopTime=stop_time.timestamp(), parameterID=parameter_id,
+                                        outputFormat='CDF_ISTP', extra_http_headers=extra_http_headers, **kwargs)
+        if url is not None:
+            var = load_cdf(url, variable=parameter_id)
+            if var is None:
+                log.warning(f"Can't find {parameter_id} in AMDA CDF response, falling back to ASCII format")
+                self._ascii_only_parameters.add(parameter_id)
+                return self._dl_csv_parameter_chunk(start_time, stop_time, parameter_id,
+                                                    extra_http_headers=extra_http_headers, **kwargs)
+            return var
+        return None
+
+    def _dl_csv_parameter_chunk(self, start_time: datetime, stop_time: datetime, parameter_id: str,
+                                extra_http_headers: Dict or None = None, **kwargs) -> Optional[SpeasyVariable]:
         url = rest_client.get_parameter(server_url=self.server_url, startTime=start_time.timestamp(),
                                         stopTime=stop_time.timestamp(), parameterID=parameter_id, timeFormat='UNIXTIME',
                                         extra_http_headers=extra_http_headers, **kwargs)
-        # check status until done
         if url is not None:
-            var = load_csv(url)
+            return load_csv(url)
+        return None
+
+    def dl_parameter_chunk(self, start_time: datetime, stop_time: datetime, parameter_id: str,
+                           extra_http_headers: Dict or None = None, output_format: str or None = None, **kwargs) -> \
+        Optional[SpeasyVariable]:
+        output_format = output_format_name(output_format)
+        if output_format == 'CDF_ISTP' and parameter_id not in self._ascii_only_parameters:
+            var = self._dl_cdf_parameter_chunk(start_time, stop_time, parameter_id,
+                                               extra_http_headers=extra_http_headers, **kwargs)
+        else:
+            var = self._dl_csv_parameter_chunk(start_time, stop_time, parameter_id,
+                                               extra_http_headers=extra_http_headers, **kwargs)
+        if var is not None:
             if len(var):
                 log.debug(
                     f'Loaded var: data shape = {var.values.shape}, data start time = {var.time[0]}, data stop time = {var.time[-1]}')
             else:
                 log.debug('Loaded var: Empty var')
-            return var
-        return None
+        return var
 
     def dl_parameter(self, start_time: datetime, stop_time: datetime, parameter_id: str,
                      extra_http_headers: Dict or None = None, **kwargs) -> Optional[
@@ -114,17 +153,18 @@ class AmdaImpl:
         dt = timedelta(days=amda_cfg.max_chunk_size_days())
 
         if stop_time - start_time > dt:
-            var = None
+            chunks = []
             curr_t = start_time
             while curr_t < stop_time:
-                if curr_t + dt < stop_time:
-                    var = merge([var, self.dl_parameter_chunk(curr_t, curr_t + dt, parameter_id,
-                                                              extra_http_headers=extra_http_headers, **kwargs)])
-                else:
-                    var = merge([var, self.dl_parameter_chunk(curr_t, stop_time, parameter_id,
-                                                              extra_http_headers=extra_http_headers, **kwargs)])
+                chunks.append((curr_t, min(curr_t + dt, stop_time)))
                 curr_t += dt
-            return var
+            builder = SpeasyVariableBuilder()
+            for var in parallel_imap(
+                lambda chunk: self.dl_parameter_chunk(chunk[0], chunk[1], parameter_id,
+                                                      extra_http_headers=extra_http_headers, **kwargs),
+                chunks, max_workers=amda_cfg.max_parallel_chunks()):
+                builder.append(var)
+            return builder.build()
         else:
             return self.dl_parameter_chunk(start_time, stop_time, parameter_id, extra_http_headers=extra_http_headers,
                                            **kwargs)
@@ -1,2 +1,6 @@
 class MissingCredentials(Exception):
     pass
+
+
+class JobTimeout(Exception):
+    pass
@@ -1,5 +1,6 @@
 """Base inventory tree management
 """
+import io
 import xml.etree.ElementTree as Et
 
 from ...core import fix_name
@@ -129,6 +130,20 @@ class AmdaXMLParser:
 
     @staticmethod
     def parse(xml, is_public=True):
+        """Builds an inventory tree from an AMDA XML tree
+
+        Parameters
+        ----------
+        xml: str or bytes or file like object or None
+            XML tree, parsed incrementally
+        is_public: bool
+            whether products are public or user products
+
+        Returns
+        -------
+        SpeasyIndex
+            inventory tree root
+        """
         handlers = {
             'instrument': AmdaXMLParser.make_instrument_node,
             'dataset': AmdaXMLParser.make_dataset_node,
@@ -140,14 +155,25 @@ class AmdaXMLParser:
             'param': AmdaXMLParser.make_user_parameter_node,
         }
 
-        def _recursive_parser(parent, node, is_public):
-            new = handlers.get(node.tag, AmdaXMLParser.make_path_node)(parent, node, is_public)
-            for subnode in node:
-                _recursive_parser(new, subnode, is_public)
-
         root = SpeasyIndex("root", "amda", "amda_root_node")
         if xml is not None:
-            tree = Et.fromstring(xml)
-            _recursive_parser(root, tree, is_public=is_public)
+            if type(xml) is str:
+                xml = io.StringIO(xml)
+            elif type(xml) is bytes:
+                xml = io.BytesIO(xml)
+            # index nodes only need XML attributes, so they are built on start events and each element is dropped
+            # from its parent once parsed, neither the whole DOM nor the XML text are held at once
+            parents = [root]
+            elements = []
+            for event, node in Et.iterparse(xml, events=('start', 'end')):
+                if event == 'start':
+                    parents.append(handlers.get(node.tag, AmdaXMLParser.make_path_node)(parents[-1], node, is_public))
+                    elements.append(node)
+                else:
+                    parents.pop()
+                    elements.pop()
+                    node.clear()
+                    if elements:
+                        del elements[-1][-1]
 
         return root
@@ -0,0 +1,160 @@
+"""AMDA long requests handling. When a request takes too long, AMDA answers with an "in progress" status and the result
+has to be polled from getStatus.php. All pending jobs are polled from a single background thread with a delay growing
+from job_poll_min_delay up to job_poll_max_delay, requesting threads only wait on a future, so any number of jobs can be
+pending at the same time and asyncio callers can await them with :func:`asyncio.wrap_future`.
+"""
+import concurrent.futures
+import logging
+from concurrent.futures import Future
+from threading import Condition, Thread
+from time import monotonic
+from typing import Dict, List, Optional
+
+from speasy.config import amda as amda_cfg
+from speasy.core import http
+from .exceptions import JobTimeout
+
+log = logging.getLogger(__name__)
+
+_BACKOFF_FACTOR = 1.5
+
+# only raised by Python >= 3.8 when setting the result of a cancelled future
+_InvalidStateError = getattr(concurrent.futures, "InvalidStateError", RuntimeError)
+
+
+class _Job:
+    __slots__ = ['status_url', 'params', 'headers', 'future', 'deadline', 'delay', 'next_poll']
+
+    def __init__(self, status_url: str, params: Dict, headers: Dict, timeout: float, delay: float):
+        now = monotonic()
+        self.status_url = status_url
+        self.params = params
+        self.headers = headers
+        self.future = Future()
+        self.deadline = now + timeout
+        self.delay = delay
+        self.next_poll = now + delay
+
+
+class JobManager:
+    """Polls pending AMDA jobs until they are done, fail or reach their deadline.
+
+    Parameters
+    ----------
+    min_delay: float or None
+        first delay between two status checks of a job, defaults to amda job_poll_min_delay configuration entry
+    max_delay: float or None
+        maximum delay between two status checks of a job, defaults to amda job_poll_max_delay configuration entry
+    timeout: float or None
+        maximum time to wait for a job, defaults to amda job_timeout configuration entry
+    """
+
+    def __init__(self, min_delay: Optional[float] = None, max_delay: Optional[float] = None,
+                 timeout: Optional[float] = None):
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+        self._timeout = timeout
+        self._jobs: List[_Job] = []
+        self._condition = Condition()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def min_delay(self) -> float:
+        return self._min_delay if self._min_delay is not None else amda_cfg.job_poll_min_delay()
+
+    @property
+    def max_delay(self) -> float:
+        return self._max_delay if self._max_delay is not None else amda_cfg.job_poll_max_delay()
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout if self._timeout is not None else amda_cfg.job_timeout()
+
+    def submit(self, status_url: str, params: Dict, headers: Dict or None = None) -> Future:
+        """Registers a pending job
+
+        Parameters
+        ----------
+        status_url: str
+            getStatus.php URL
+        params: Dict
+            the "in progress" response, sent back as getStatus.php parameters
+        headers: Dict or None
+            extra HTTP headers
+
+        Returns
+        -------
+        Future
+            resolves to the job dataFileURLs or None if it failed, raises JobTimeout once the deadline is reached
+        """
+        return self._submit(status_url, params, headers).future
+
+    def wait(self, status_url: str, params: Dict, headers: Dict or None = None):
+        """Same as :meth:`submit` but blocks until the job completes and returns its result"""
+        job = self._submit(status_url, params, headers)
+        try:
+            return job.future.result(timeout=max(job.deadline - monotonic(), 0.))
+        except concurrent.futures.TimeoutError:
+            job.future.cancel()
+            raise JobTimeout(f"AMDA job {job.params} did not complete in {self.timeout}s")
+
+    def _submit(self, status_url: str, params: Dict, headers: Dict or None) -> _Job:
+        job = _Job(status_url, params, headers or {}, timeout=self.timeout, delay=self.min_delay)
+        with self._condition:
+            self._jobs.append(job)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="speasy-amda-jobs", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return job
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._jobs)
+
+    def _poll(self, job: _Job):
+        # any error ends the job rather than the polling thread which would leave all other jobs pending forever
+        try:
+            self._check_status(job)
+        except _InvalidStateError:
+            # cancelled by its caller meanwhile
+            pass
+        except Exception as e:
+            log.debug(f"Failed to check AMDA job status: {e}")
+            try:
+                job.future.set_exception(e)
+            except _InvalidStateError:
+                pass
+
+    def _check_status(self, job: _Job):
+        try:
+            status = http.get(job.status_url, params=job.params, headers=dict(job.headers)).json()
+        except Exception as e:
+            log.debug(f"Failed to get AMDA job status: {e}")
+            status = None
+        if status is not None and not isinstance(status, dict):
+            raise ValueError(f"Unexpected AMDA job status: {status}")
+        if status is not None and status.get("status") == "done":
+            job.future.set_result(status.get("dataFileURLs"))
+        elif status is not None and status.get("success") is False:
+            log.debug(f"Failed: {status}")
+            job.future.set_result(None)
+        elif monotonic() >= job.deadline:
+            job.future.set_exception(JobTimeout(f"AMDA job {job.params} did not complete in {self.timeout}s"))
+        else:
+            job.delay = min(job.delay * _BACKOFF_FACTOR, self.max_delay)
+            job.next_poll = min(monotonic() + job.delay, job.deadline)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._jobs = [job for job in self._jobs if not job.future.done()]
+                now = monotonic()
+                due = [job for job in self._jobs if job.next_poll <= now]
+                if not due:
+                    next_poll = min((job.next_poll for job in self._jobs), default=None)
+                    self._condition.wait(None if next_poll is None else next_poll - now)
+                    continue
+            for job in due:
+                if not job.future.done():
+                    self._poll(job)
@@ -1,17 +1,21 @@
 import logging
-import time
 from enum import Enum
+from threading import Lock
+from time import monotonic
 
 from speasy.core import http, pack_kwargs
 from speasy.core.cache import CacheCall
 from speasy.config import amda as amda_cfg
+from .jobs import JobManager
 
 import xml.etree.ElementTree as Et
 
-from typing import Dict
+from typing import Callable, Dict, Tuple
 
 log = logging.getLogger(__name__)
 
+job_manager = JobManager()
+
 
 class Endpoint(Enum):
     """AMDA_Webservice REST API endpoints.
@@ -55,8 +59,45 @@ def request_url(endpoint: Endpoint, server_url: str) -> str:
         raise TypeError(f"You must provide an {Endpoint} instead of {type(endpoint)}")
 
 
+class _TokenCache:
+    """Thread safe per server cache of authentication tokens, a token is reused until it is older than amda
+    token_lifetime or gets rejected by the server."""
+
+    def __init__(self):
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._lock = Lock()
+
+    def get(self, server_url: str, fetch: Callable[[str], str]) -> str:
+        with self._lock:
+            value, expiry = self._tokens.get(server_url, (None, 0.))
+            if value is None or monotonic() >= expiry:
+                value = fetch(server_url)
+                self._tokens[server_url] = (value, monotonic() + amda_cfg.token_lifetime())
+            return value
+
+    def invalidate(self, server_url: str, value: str):
+        with self._lock:
+            if self._tokens.get(server_url, (None, 0.))[0] == value:
+                self._tokens.pop(server_url)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+_tokens = _TokenCache()
+
+
+def _new_token(server_url: str) -> str:
+    r = http.get(request_url(Endpoint.AUTH, server_url=server_url))
+    if r.status_code == 200:
+        return r.text.strip()
+    else:
+        raise RuntimeError("Failed to get auth token")
+
+
 def token(server_url: str = amda_cfg.entry_point()) -> str:
-    """Returns authentication token.
+    """Returns authentication token, the same token is shared by all requests until it expires or gets rejected.
 
     Parameters
     ----------
@@ -68,12 +109,20 @@ def token(server_url: str = amda_cfg.entry_point()) -> str:
     str
         the generated token
     """
-    # url = "{0}/php/rest/auth.php?".format(self.server_url)
-    r = http.get(request_url(Endpoint.AUTH, server_url=server_url))
-    if r.status_code == 200:
-        return r.text.strip()
-    else:
-        raise RuntimeError("Failed to get auth token")
+    return _tokens.get(server_url, _new_token)
+
+
+def invalidate_token(server_url: str, value: str):
+    """Discards given token, the next request will get a new one.
+
+    Parameters
+    ----------
+    server_url:str
+        server base URL on which the API token was generated
+    value: str
+        the rejected token, ignored if it was already replaced
+    """
+    _tokens.invalidate(server_url, value)
 
 
 def send_request(endpoint: Endpoint, params: dict = None, n_try: int = 3,
@@ -99,14 +148,16 @@ def send_request(endpoint: Endpoint, params: dict = None, n_try: int = 3,
     """
     url = request_url(endpoint, server_url=server_url)
     params = params or {}
-    params['token'] = token(server_url=server_url)
     for _ in [None] * n_try:  # in case of failure
-        # add token now ? does it change
+        params['token'] = token(server_url=server_url)
         log.debug(f"Send request on AMDA_Webservice server {url}")
         r = http.get(url, params=params)
         if r is None:
             # try again
             continue
+        if r.status_code in (401, 403):
+            invalidate_token(server_url, params['token'])
+            continue
         return r.text.strip()
     return None
 
@@ -168,11 +219,14 @@ def send_request_json(endpoint: Endpoint, params: Dict = None, n_try: int = 3,
     url = request_url(endpoint, server_url=server_url)
     params = params or {}
     http_headers = extra_http_headers or {}
-    params['token'] = token(server_url=server_url)
+    token_renewed = False
     for _ in [None] * n_try:  # in case of failure
-        # add token now ? does it change
+        params['token'] = token(server_url=server_url)
         log.debug(f"Send request on AMDA_Webservice server {url}")
         r = http.get(url, params=params, headers=http_headers)
+        if r.status_code in (401, 403):
+            invalidate_token(server_url, params['token'])
+            continue
         js = r.json()
         if 'success' in js and \
             js['success'] is True and \
@@ -184,18 +238,15 @@ def send_request_json(endpoint: Endpoint, params: Dict = None, n_try: int = 3,
             "status" in js and \
             js["status"] == "in progress":
             log.warning("This request duration is too long, consider reducing time range")
-            while True:
-                default_sleep_time = 10.
-                time.sleep(default_sleep_time)
-                url = request_url(Endpoint.GETSTATUS, server_url=server_url)
-
-                status = http.get(url, params=js, headers=http_headers).json()
-                if status is not None and status["status"] == "done":
-                    return status["dataFileURLs"]
-
-
+            return job_manager.wait(request_url(Endpoint.GETSTATUS, server_url=server_url), params=js,
+                                    headers=http_headers)
         else:
             log.debug(f"Failed: {r.text}")
+            # an expired token is one of the reasons a request can fail, retry once with a new one but don't make
+            # every failing request renew the token shared by all other requests
+            if not token_renewed:
+                invalidate_token(server_url, params['token'])
+                token_renewed = True
     return None
 
 
@@ -1,17 +1,17 @@
 """AMDA_Webservice utility functions. This module defines some conversion functions specific to AMDA_Webservice, mainly
-conversion procedures for parsing CSV and VOTable data.
+conversion procedures for parsing CSV, CDF and VOTable data.
 
 """
 import datetime
+import io
 import os
-from typing import Dict, List
-from urllib.request import urlopen
-import tempfile
+from typing import Dict, List, Tuple
 
 import numpy as np
 import pandas as pds
 
-from speasy.core import epoch_to_datetime64
+from speasy.core import epoch_to_datetime64, http
+from speasy.core.cdf import load_variable
 from speasy.core.datetime_range import DateTimeRange
 from speasy.products.catalog import Catalog, Event
 from speasy.products.timetable import TimeTable
@@ -19,6 +19,62 @@ from speasy.products.variable import (DataContainer, SpeasyVariable,
                                       VariableAxis, VariableTimeAxis)
 
 
+class _PrefixedStream(io.RawIOBase):
+    """Binary stream yielding prefix before the remaining content of the wrapped stream"""
+
+    def __init__(self, prefix: bytes, stream):
+        self._prefix = memoryview(prefix)
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if len(self._prefix):
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        chunk = self._stream.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def _read_header(stream, chunk_size=1 << 16) -> Tuple[Dict[str, str], bytes]:
+    """Reads AMDA ASCII header, returns parsed header and the already read beginning of the data block"""
+    content = b""
+    header_end = 0
+    while True:
+        while header_end < len(content) and content[header_end:header_end + 1] == b'#':
+            line_end = content.find(b'\n', header_end)
+            if line_end == -1:
+                break
+            header_end = line_end + 1
+        if header_end < len(content) and content[header_end:header_end + 1] != b'#':
+            break
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            header_end = len(content)
+            break
+        content += chunk
+    meta = {}
+    for line in content[:header_end].decode().splitlines():
+        if ':' in line:
+            key, value = line[1:].split(':', 1)
+            meta[key.strip()] = value.strip()
+    return meta, content[header_end:]
+
+
+def _read_data_block(stream, columns_count: int) -> np.ndarray:
+    """Decodes whitespace separated columns with pandas C parser, straight from given stream"""
+    try:
+        return pds.read_csv(stream, sep=r'\s+', header=None, comment='#', engine='c',
+                            usecols=range(columns_count) if columns_count else None,
+                            dtype=np.float64).values
+    except pds.errors.EmptyDataError:
+        return np.empty((0, max(columns_count, 1)), dtype=np.float64)
+
+
 def load_csv(filename: str) -> SpeasyVariable:
     """Load a CSV file
 
@@ -34,26 +90,16 @@ def load_csv(filename: str) -> SpeasyVariable:
     """
     if '://' not in filename:
         filename = f"file:///{os.path.abspath(filename)}"
-    with urlopen(filename, timeout=10.) as csv:
-        with tempfile.TemporaryFile() as fd:
-            fd.write(csv.read())
-            fd.seek(0)
-            line = fd.readline().decode()
-            meta = {}
-            y = None
-            y_label = None
-            while len(line) > 0 and line[0] == '#':
-                if ':' in line:
-                    key, value = line[1:].split(':', 1)
-                    meta[key.strip()] = value.strip()
-                line = fd.readline().decode()
-            columns = [col.strip()
-                       for col in meta.get('DATA_COLUMNS', "").split(', ')[:]]
-            meta["UNITS"] = meta.get("PARAMETER_UNITS")
-            fd.seek(0)
-            data = pds.read_csv(fd, comment='#', delim_whitespace=True,
-                                header=None, names=columns).values.transpose()
-            time, data = epoch_to_datetime64(data[0]), data[1:].transpose()
+    with http.urlopen(filename, timeout=10.) as csv:
+        y = None
+        y_label = None
+        meta, data_start = _read_header(csv)
+        columns = [col.strip()
+                   for col in meta.get('DATA_COLUMNS', "").split(', ')[:]]
+        meta["UNITS"] = meta.get("PARAMETER_UNITS")
+        data = _read_data_block(io.BufferedReader(_PrefixedStream(data_start, csv), buffer_size=1 << 20),
+                                columns_count=len(columns) if 'DATA_COLUMNS' in meta else 0)
+        time, data = epoch_to_datetime64(data[:, 0]), data[:, 1:]
 
         if "PARAMETER_TABLE_MIN_VALUES[1]" in meta:
             min_v = np.array(
@@ -81,6 +127,27 @@ def load_csv(filename: str) -> SpeasyVariable:
             columns=columns[1:])
 
 
+def load_cdf(filename: str, variable: str) -> SpeasyVariable or None:
+    """Load a variable from a CDF file
+
+    Parameters
+    ----------
+    filename: str
+        CDF filename or URL
+    variable: str
+        variable name
+
+    Returns
+    -------
+    SpeasyVariable or None
+        variable contents or None if the file does not contain it
+    """
+    if '://' not in filename:
+        filename = f"file://{os.path.abspath(filename)}"
+    with http.download(filename, suffix='.cdf') as cdf_file:
+        return load_variable(variable=variable, file=cdf_file)
+
+
 def _build_event(data, colnames: List[str]) -> Event:
     return Event(datetime.datetime.strptime(data[0], "%Y-%m-%dT%H:%M:%S.%f"),
                  datetime.datetime.strptime(data[1], "%Y-%m-%dT%H:%M:%S.%f"),
@@ -102,11 +169,9 @@ def load_timetable(filename: str) -> TimeTable:
     """
     if '://' not in filename:
         filename = f"file://{os.path.abspath(filename)}"
-    with urlopen(filename) as votable:
+    with http.urlopen(filename) as votable:
         # save the timetable as a dataframe, speasy.common.SpeasyVariable
         # get header data first
-        import io
-
         from astropy.io.votable import parse as parse_votable
         votable = parse_votable(io.BytesIO(votable.read()))
         name = next(filter(lambda e: 'Name' in e,
@@ -138,11 +203,9 @@ def load_catalog(filename: str) -> Catalog:
     """
     if '://' not in filename:
         filename = f"file://{os.path.abspath(filename)}"
-    with urlopen(filename) as votable:
+    with http.urlopen(filename) as votable:
         # save the timetable as a dataframe, speasy.common.SpeasyVariable
         # get header data first
-        import io
-
         from astropy.io.votable import parse as parse_votable
         votable = parse_votable(io.BytesIO(votable.read()))
         # convert astropy votable structure to SpeasyVariable
@@ -4,10 +4,11 @@
 import logging
 from datetime import datetime
 from enum import Enum
+from functools import wraps
 from typing import Dict, List, Optional, Union
 
 from ...config import amda as amda_cfg
-from ...core import AllowedKwargs, make_utc_datetime
+from ...core import AllowedKwargs, make_utc_datetime, parallel_imap
 from ...core.cache import CACHE_ALLOWED_KWARGS, Cacheable, CacheCall
 from ...core.dataprovider import (GET_DATA_ALLOWED_KWARGS, DataProvider,
                                   ParameterRangeCheck)
@@ -20,13 +21,35 @@ from ...products.catalog import Catalog
 from ...products.dataset import Dataset
 from ...products.timetable import TimeTable
 from ...products.variable import SpeasyVariable
-from ._impl import is_private, is_public
+from ._impl import is_private, is_public, output_format_name
 from .inventory import to_xmlid
 from .utils import get_parameter_args
 
 log = logging.getLogger(__name__)
 
 
+def _parameter_cache_entry_name(prefix: str, product: str, start_time: str, output_format: str or None = None,
+                                **kwargs) -> str:
+    # formats give different meta-data and columns so their fragments must not be merged, ASCII keeps former keys
+    output_format = output_format_name(output_format)
+    if output_format == 'ASCII':
+        return f"{prefix}/{product}/{start_time}"
+    return f"{prefix}/{output_format}/{product}/{start_time}"
+
+
+def _bypass_proxy_unless_ascii(get_parameter):
+    """Proxy server only serves parameters as if they were downloaded in ASCII format, other formats are always
+    downloaded from AMDA"""
+
+    @wraps(get_parameter)
+    def wrapped(self, product, start_time, stop_time, **kwargs):
+        if output_format_name(kwargs.get('output_format')) != 'ASCII':
+            kwargs['disable_proxy'] = True
+        return get_parameter(self, product=product, start_time=start_time, stop_time=stop_time, **kwargs)
+
+    return wrapped
+
+
 class ProductType(Enum):
     """Enumeration of the type of products available in AMDA_Webservice.
     """
@@ -212,7 +235,7 @@ class AMDA_Webservice(DataProvider):
         raise ValueError(f"Unknown product: {product}")
 
     def get_user_parameter(self, parameter_id: str or ParameterIndex, start_time: datetime or str,
-                           stop_time: datetime or str) -> Optional[SpeasyVariable]:
+                           stop_time: datetime or str, output_format: str or None = None) -> Optional[SpeasyVariable]:
         """Get user parameter. Raises an exception if user is not authenticated.
 
         Parameters
@@ -223,6 +246,8 @@ class AMDA_Webservice(DataProvider):
             begining of data time
         stop_time: datetime or str
             end of data time
+        output_format: str or None
+            download format, either ASCII or CDF_ISTP, defaults to amda output_format configuration entry
 
         Returns
         -------
@@ -249,7 +274,8 @@ class AMDA_Webservice(DataProvider):
         """
         parameter_id = to_xmlid(parameter_id)
         start_time, stop_time = make_utc_datetime(start_time), make_utc_datetime(stop_time)
-        return self._impl.dl_user_parameter(parameter_id=parameter_id, start_time=start_time, stop_time=stop_time)
+        return self._impl.dl_user_parameter(parameter_id=parameter_id, start_time=start_time, stop_time=stop_time,
+                                            output_format=output_format)
 
     @CacheCall(cache_retention=amda_cfg.user_cache_retention())
     def get_user_timetable(self, timetable_id: str or TimetableIndex) -> Optional[TimeTable]:
@@ -313,11 +339,14 @@ class AMDA_Webservice(DataProvider):
         catalog_id = to_xmlid(catalog_id)
         return self._impl.dl_user_catalog(catalog_id=catalog_id)
 
-    @AllowedKwargs(PROXY_ALLOWED_KWARGS + CACHE_ALLOWED_KWARGS + GET_DATA_ALLOWED_KWARGS)
+    @AllowedKwargs(PROXY_ALLOWED_KWARGS + CACHE_ALLOWED_KWARGS + GET_DATA_ALLOWED_KWARGS + ['output_format'])
     @ParameterRangeCheck()
-    @Cacheable(prefix="amda", version=product_version, fragment_hours=lambda x: 12)
+    @Cacheable(prefix="amda", version=product_version, fragment_hours=lambda x: 12,
+               entry_name=_parameter_cache_entry_name)
+    @_bypass_proxy_unless_ascii
     @Proxyfiable(GetProduct, get_parameter_args)
-    def get_parameter(self, product, start_time, stop_time, extra_http_headers: Dict or None = None, **kwargs) -> \
+    def get_parameter(self, product, start_time, stop_time, extra_http_headers: Dict or None = None,
+                      output_format: str or None = None, **kwargs) -> \
     Optional[
         SpeasyVariable]:
         """Get parameter data.
@@ -332,6 +361,9 @@ class AMDA_Webservice(DataProvider):
             desired data stop time
         extra_http_headers: dict
             reserved for internal use
+        output_format: str or None
+            download format, either ASCII or CDF_ISTP, defaults to amda output_format configuration entry,
+            formats other than ASCII are always downloaded from AMDA even if the proxy is enabled
 
         Returns
         -------
@@ -352,7 +384,7 @@ class AMDA_Webservice(DataProvider):
         """
         log.debug(f'Get data: product = {product}, data start time = {start_time}, data stop time = {stop_time}')
         return self._impl.dl_parameter(start_time=start_time, stop_time=stop_time, parameter_id=product,
-                                       extra_http_headers=extra_http_headers)
+                                       extra_http_headers=extra_http_headers, output_format=output_format)
 
     def get_dataset(self, dataset_id: str or DatasetIndex, start: str or datetime, stop: str or datetime,
                     **kwargs) -> Dataset or None:
@@ -396,8 +428,9 @@ class AMDA_Webservice(DataProvider):
         meta = {k: v for k, v in self.flat_inventory.datasets[dataset_id].__dict__.items() if
                 not isinstance(v, SpeasyIndex)}
         parameters = self.list_parameters(dataset_id)
-        return Dataset(name=name, variables={p.name: self.get_parameter(p, start, stop, **kwargs) for p in parameters},
-                       meta=meta)
+        variables = parallel_imap(lambda p: self.get_parameter(p, start, stop, **kwargs), parameters,
+                                  max_workers=amda_cfg.max_parallel_parameters())
+        return Dataset(name=name, variables={p.name: v for p, v in zip(parameters, variables)}, meta=meta)
 
     @CacheCall(cache_retention=amda_cfg.user_cache_retention())
     def get_timetable(self, timetable_id: str or TimetableIndex, **kwargs) -> Optional[TimeTable]:
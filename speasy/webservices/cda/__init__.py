@@ -8,13 +8,15 @@ __version__ = '0.1.0'
 
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
-from urllib.request import urlopen
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
 
-from speasy.core import AllowedKwargs, http
+from speasy.config import proxy as proxy_cfg
+from speasy.core import AllowedKwargs, http, make_utc_datetime
 from speasy.core.cache import _cache  # _cache is used for tests (hack...)
 from speasy.core.cache import CACHE_ALLOWED_KWARGS, UnversionedProviderCache
-from speasy.core.cdf import load_variable
+from speasy.core.cache._providers_caches import group_contiguous_fragments
+from speasy.core.cdf import load_variable, load_variables
 from speasy.core.dataprovider import (GET_DATA_ALLOWED_KWARGS, DataProvider,
                                       ParameterRangeCheck)
 from speasy.core.datetime_range import DateTimeRange
@@ -26,6 +28,8 @@ from speasy.products.variable import SpeasyVariable
 
 log = logging.getLogger(__name__)
 
+_MAX_REQUEST_DURATION = timedelta(days=7)
+
 
 class CdaWebException(BaseException):
     def __init__(self, text):
@@ -33,8 +37,15 @@ class CdaWebException(BaseException):
 
 
 def _read_cdf(url: str, variable: str) -> SpeasyVariable:
-    with urlopen(url) as remote_cdf:
-        return load_variable(buffer=remote_cdf.read(), variable=variable)
+    # streamed to disk so only the requested variable gets decoded in memory
+    with http.download(url, suffix='.cdf') as cdf_file:
+        return load_variable(file=cdf_file, variable=variable)
+
+
+def _read_cdf_variables(url: str, variables: List[str]) -> Dict[str, Optional[SpeasyVariable]]:
+    # downloaded and loaded once, each variable is then extracted from the same file
+    with http.download(url, suffix='.cdf') as cdf_file:
+        return load_variables(file=cdf_file, variables=variables)
 
 
 def get_parameter_args(start_time: datetime, stop_time: datetime, product: str, **kwargs):
@@ -118,15 +129,15 @@ class CDA_Webservice(DataProvider):
             raise ValueError(f"Given string does not look like a CDA dataset/variable pair: {index_or_str}")
         raise TypeError(f"Wrong type for {index_or_str}, expecting a string or a SpeasyIndex, got {type(index_or_str)}")
 
-    def _dl_variable(self,
-                     dataset: str, variable: str,
-                     start_time: datetime, stop_time: datetime, if_newer_than: datetime or None = None,
-                     extra_http_headers: Dict or None = None) -> Optional[
-        SpeasyVariable]:
+    def _dl_variables(self,
+                      dataset: str, variables: List[str],
+                      start_time: datetime, stop_time: datetime, if_newer_than: datetime or None = None,
+                      extra_http_headers: Dict or None = None) -> Dict[str, Optional[SpeasyVariable]]:
 
         start_time, stop_time = start_time.strftime('%Y%m%dT%H%M%SZ'), stop_time.strftime('%Y%m%dT%H%M%SZ')
         fmt = "cdf"
-        url = f"{self.__url}/dataviews/sp_phys/datasets/{http.quote(dataset, safe='')}/data/{start_time},{stop_time}/{http.quote(variable, safe='')}?format={fmt}"
+        variables_path = ','.join(map(lambda variable: http.quote(variable, safe=''), variables))
+        url = f"{self.__url}/dataviews/sp_phys/datasets/{http.quote(dataset, safe='')}/data/{start_time},{stop_time}/{variables_path}?format={fmt}"
         headers = {"Accept": "application/json"}
         if if_newer_than is not None:
             headers["If-Modified-Since"] = if_newer_than.ctime()
@@ -135,20 +146,67 @@ class CDA_Webservice(DataProvider):
         resp = http.get(url, headers=headers)
         log.debug(resp.url)
         if resp.status_code == 200 and 'FileDescription' in resp.json():
-            return _read_cdf(resp.json()['FileDescription'][0]['Name'], variable)
+            return _read_cdf_variables(resp.json()['FileDescription'][0]['Name'], variables)
         elif not resp.ok:
             if resp.status_code == 404 and "No data available" in resp.json().get('Message', [""])[0]:
                 log.warning(f"Got 404 'No data available' from CDAWeb with {url}")
-                return None
+                return {variable: None for variable in variables}
             raise CdaWebException(f'Failed to get data with request: {url}, got {resp.status_code} HTTP response')
         else:
-            return None
+            return {variable: None for variable in variables}
+
+    def _dl_variable(self,
+                     dataset: str, variable: str,
+                     start_time: datetime, stop_time: datetime, if_newer_than: datetime or None = None,
+                     extra_http_headers: Dict or None = None) -> Optional[
+        SpeasyVariable]:
+        return self._dl_variables(dataset=dataset, variables=[variable], start_time=start_time, stop_time=stop_time,
+                                  if_newer_than=if_newer_than, extra_http_headers=extra_http_headers)[variable]
+
+    def _prefetch_variables(self, dataset: str, variables: List[str], start_time: datetime, stop_time: datetime,
+                            extra_http_headers: Dict or None = None):
+        cache = self.get_data.provider_cache
+        requested_range = DateTimeRange(start_time, stop_time)
+        missing = {}
+        for variable in variables:
+            p_range = self.parameter_range(f"{dataset}/{variable}")
+            if not p_range.intersect(requested_range):
+                # get_data won't request it either
+                continue
+            fragment_hours, fragments = cache.fragment_list(
+                dataset, DateTimeRange(max(start_time, p_range.start_time), min(stop_time, p_range.stop_time)))
+            fragment_duration = timedelta(hours=fragment_hours)
+            entries = cache.get_cache_entries(fragments, product=f"{dataset}/{variable}")
+            for fragment, entry in zip(fragments, entries):
+                if entry is None:
+                    missing.setdefault(fragment, []).append(variable)
+        if not missing:
+            return
+        max_fragments = max(int(_MAX_REQUEST_DURATION / fragment_duration), 1)
+        for group in group_contiguous_fragments(sorted(missing.keys()), duration=fragment_duration):
+            for first in range(0, len(group), max_fragments):
+                sub_group = group[first:first + max_fragments]
+                group_variables = sorted(set(chain.from_iterable(missing[fragment] for fragment in sub_group)))
+                if len(group_variables) < 2:
+                    # nothing to share, leave it to get_data
+                    continue
+                downloaded = self._dl_variables(dataset=dataset, variables=group_variables, start_time=sub_group[0],
+                                                stop_time=sub_group[-1] + fragment_duration,
+                                                extra_http_headers=extra_http_headers)
+                entries = {}
+                for variable, data in downloaded.items():
+                    entries.update(
+                        cache.make_cache_entries(data, fragments=[f for f in sub_group if variable in missing[f]],
+                                                 product=f"{dataset}/{variable}",
+                                                 fragment_duration_hours=fragment_hours,
+                                                 version=datetime.utcnow()))
+                cache.set_cache_entries(entries)
 
     @AllowedKwargs(
         PROXY_ALLOWED_KWARGS + CACHE_ALLOWED_KWARGS + GET_DATA_ALLOWED_KWARGS + ['if_newer_than'])
     @ParameterRangeCheck()
     @UnversionedProviderCache(prefix="cda", fragment_hours=lambda x: 12, cache_retention=timedelta(days=7))
-    @SplitLargeRequests(threshold=lambda: timedelta(days=7))
+    @SplitLargeRequests(threshold=lambda: _MAX_REQUEST_DURATION)
     @Proxyfiable(GetProduct, get_parameter_args)
     def get_data(self, product, start_time: datetime, stop_time: datetime, if_newer_than: datetime or None = None,
                  extra_http_headers: Dict or None = None):
@@ -160,3 +218,45 @@ class CDA_Webservice(DataProvider):
                      **kwargs) -> \
         Optional[SpeasyVariable]:
         return self.get_data(f"{dataset}/{variable}", start_time, stop_time, **kwargs)
+
+    @AllowedKwargs(
+        PROXY_ALLOWED_KWARGS + CACHE_ALLOWED_KWARGS + GET_DATA_ALLOWED_KWARGS + ['if_newer_than'])
+    def get_variables(self, dataset: str, variables: List[str], start_time: datetime or str,
+                      stop_time: datetime or str, **kwargs) -> Dict[str, Optional[SpeasyVariable]]:
+        """Get several variables of the same dataset. Cache fragments missing for any of them are downloaded in a
+        single CDF holding all the variables, then each variable goes through :meth:`get_data` and is served from cache.
+        Variables are downloaded one by one when the cache is disabled or the proxy is used, each variable is only
+        prefetched within its own definition range.
+
+        Parameters
+        ----------
+        dataset: str
+            dataset id
+        variables: List[str]
+            variables names
+        start_time: datetime or str
+            desired data start time
+        stop_time: datetime or str
+            desired data stop time
+        kwargs:
+            same keyword arguments as :meth:`get_data`
+
+        Returns
+        -------
+        Dict[str, Optional[SpeasyVariable]]
+            variables data indexed by name
+
+        Examples
+        --------
+
+        >>> import speasy as spz
+        >>> variables = spz.cda.get_variables("AC_H0_MFI", ["BGSEc", "Magnitude"], "2018-01-01", "2018-01-01T01") # doctest: +SKIP
+        >>> list(variables.keys()) # doctest: +SKIP
+        ['BGSEc', 'Magnitude']
+        """
+        use_proxy = proxy_cfg.enabled() and not kwargs.get("disable_proxy", False)
+        if len(variables) > 1 and not use_proxy and not kwargs.get("disable_cache", False):
+            self._prefetch_variables(dataset, variables, make_utc_datetime(start_time), make_utc_datetime(stop_time),
+                                     extra_http_headers=kwargs.get("extra_http_headers"))
+        return {variable: self.get_data(f"{dataset}/{variable}", start_time, stop_time, **kwargs) for variable in
+                variables}
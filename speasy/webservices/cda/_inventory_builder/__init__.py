@@ -1,14 +1,19 @@
-from ._xml_catalogs_parser import load_xml_catalog
-from ._cdf_masters_parser import update_tree
+from ._xml_catalogs_parser import load_xml_catalog, iter_datasets, dataset_hash, master_cdf_name, has_master_cdf, \
+    parse_dataset
+from ._cdf_masters_parser import update_tree, member_signature
 from ....core.index import index
-from ....core.inventory.indexes import SpeasyIndex, to_dict, from_dict
+from ....core.inventory.indexes import SpeasyIndex, DatasetIndex
+from ....core.inventory._packed_tree import dump_inventory, load_inventory
 from ....config import cdaweb as cda_cfg
-import requests
-from tempfile import NamedTemporaryFile
+from ....core import http
+from typing import Dict, List, Optional, Tuple
 import tarfile
 import os
+import logging
 from glob import glob
 
+log = logging.getLogger(__name__)
+
 _MASTERS_CDF_PATH = f"{cda_cfg.inventory_data_path()}/masters_cdf/"
 _XML_CATALOG_PATH = f"{cda_cfg.inventory_data_path()}/all.xml"
 
@@ -19,51 +24,122 @@ def _ensure_path_exists(path: str):
         os.makedirs(dirname)
 
 
-def _clean_master_cdf_folder():
+def _update_master_cdf_files(masters_url: str):
+    """Streams master.tar and only writes members which differ from already extracted files, files no longer in the
+    archive are removed. Extracted files keep their member size and mtime which are used as master CDFs fingerprints.
+    """
     _ensure_path_exists(_MASTERS_CDF_PATH)
-    cdf_files = glob(f"{_MASTERS_CDF_PATH}/*.cdf")
-    for cdf_file in cdf_files:
-        os.remove(cdf_file)
-
-
-def _download_and_extract_master_cdf(masters_url: str):
-    with NamedTemporaryFile('wb') as master_archive:
-        master_archive.write(requests.get(masters_url).content)
-        master_archive.flush()
-        tar = tarfile.open(master_archive.name)
-        tar.extractall(_MASTERS_CDF_PATH)
+    members = set()
+    extracted = 0
+    with http.urlopen(masters_url) as remote:
+        with tarfile.open(fileobj=remote, mode='r|*') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                path = os.path.join(_MASTERS_CDF_PATH, member.name)
+                members.add(os.path.normpath(path))
+                if not os.path.exists(path) or member_signature(path) != (member.size, int(member.mtime)):
+                    tar.extract(member, _MASTERS_CDF_PATH)
+                    extracted += 1
+    for cdf_file in glob(f"{_MASTERS_CDF_PATH}/*.cdf"):
+        if os.path.normpath(cdf_file) not in members:
+            os.remove(cdf_file)
+    log.info(f"{extracted} master CDFs added or updated out of {len(members)}")
 
 
 def update_master_cdf(masters_url: str = "https://spdf.gsfc.nasa.gov/pub/software/cdawlib/0MASTERS/master.tar"):
-    last_modified = requests.head(masters_url).headers['last-modified']
+    last_modified = http.head(masters_url).headers['last-modified']
     if index.get("cdaweb-inventory", "masters-last-modified", "") != last_modified:
-        _clean_master_cdf_folder()
-        _download_and_extract_master_cdf(masters_url)
+        _update_master_cdf_files(masters_url)
         index.set("cdaweb-inventory", "masters-last-modified", last_modified)
         return True
     return False
 
 
 def update_xml_catalog(xml_catalog_url: str = "https://spdf.gsfc.nasa.gov/pub/catalogs/all.xml"):
-    last_modified = requests.head(xml_catalog_url).headers['last-modified']
+    last_modified = http.head(xml_catalog_url).headers['last-modified']
     if index.get("cdaweb-inventory", "xml_catalog-last-modified", "") != last_modified:
         _ensure_path_exists(_XML_CATALOG_PATH)
         with open(_XML_CATALOG_PATH, 'w') as f:
-            f.write(requests.get(xml_catalog_url).text)
+            f.write(http.get(xml_catalog_url).text)
             index.set("cdaweb-inventory", "xml_catalog-last-modified", last_modified)
             return True
     return False
 
 
+def _dataset_fingerprint(dataset_node) -> Tuple[str, Optional[Tuple[int, int]]]:
+    master_cdf = os.path.join(_MASTERS_CDF_PATH, master_cdf_name(dataset_node))
+    return dataset_hash(dataset_node), member_signature(master_cdf) if os.path.exists(master_cdf) else None
+
+
+def _datasets_paths(root: SpeasyIndex) -> Dict[str, List[SpeasyIndex]]:
+    def walk(path: List[SpeasyIndex], paths: Dict[str, List[SpeasyIndex]]):
+        node = path[-1]
+        if isinstance(node, DatasetIndex):
+            paths[node.spz_uid()] = path
+        else:
+            for child in node.__dict__.values():
+                if isinstance(child, SpeasyIndex):
+                    walk(path + [child], paths)
+
+    paths = {}
+    walk([root], paths)
+    return paths
+
+
+def _remove_dataset(path: List[SpeasyIndex]):
+    path[-2].__dict__.pop(path[-1].spz_name(), None)
+    # mission, observatory or instrument nodes left without any dataset are removed too
+    for parent, node in zip(reversed(path[:-2]), reversed(path[1:-1])):
+        if any(isinstance(child, SpeasyIndex) for child in node.__dict__.values()):
+            break
+        parent.__dict__.pop(node.spz_name(), None)
+
+
+def _patch_tree(root: SpeasyIndex, previous_fingerprints: Dict) -> Tuple[List[DatasetIndex], Dict]:
+    """Registers all.xml datasets whose fingerprint changed while streaming it and removes datasets no longer listed.
+
+    Returns
+    -------
+    Tuple[List[DatasetIndex], Dict]
+        added or changed datasets, which still lack their parameters, and all datasets fingerprints
+    """
+    paths = _datasets_paths(root) if previous_fingerprints else {}
+    fingerprints = {}
+    changed = []
+    for node in iter_datasets(_XML_CATALOG_PATH):
+        if not has_master_cdf(node):
+            continue
+        uid = node.attrib["serviceprovider_ID"]
+        fingerprints[uid] = _dataset_fingerprint(node)
+        if previous_fingerprints.get(uid) != fingerprints[uid]:
+            if uid in paths:
+                _remove_dataset(paths.pop(uid))
+            changed.append(parse_dataset(root, node))
+    removed = [uid for uid in previous_fingerprints.keys() if uid not in fingerprints]
+    for uid in removed:
+        if uid in paths:
+            _remove_dataset(paths[uid])
+    log.info(f"Inventory update: {len(changed)} datasets added or changed, {len(removed)} removed")
+    return changed, fingerprints
+
+
 def build_inventory(root: SpeasyIndex = None, xml_catalog_url: str = "https://spdf.gsfc.nasa.gov/pub/catalogs/all.xml",
                     masters_url: str = "https://spdf.gsfc.nasa.gov/pub/software/cdawlib/0MASTERS/master.tar"):
+    root = root or SpeasyIndex(name='root', provider='cda', uid='cda_root')
     needs_rebuild = update_xml_catalog(xml_catalog_url)
     needs_rebuild |= update_master_cdf(masters_url)
-    if needs_rebuild or not index.contains("cdaweb-inventory", "tree"):
-        root = load_xml_catalog(xml_file_path=_XML_CATALOG_PATH, root=root)
-        update_tree(root=root, master_cdf_dir=_MASTERS_CDF_PATH)
-        index.set("cdaweb-inventory", "tree", to_dict(root))
+    saved_tree = load_inventory(index.get("cdaweb-inventory", "tree"))
+    if needs_rebuild or saved_tree is None:
+        previous_fingerprints = {}
+        if saved_tree is not None:
+            previous_fingerprints = index.get("cdaweb-inventory", "datasets-fingerprints", {})
+            if previous_fingerprints:
+                root.__dict__ = saved_tree.__dict__
+        changed, fingerprints = _patch_tree(root, previous_fingerprints)
+        update_tree(root=root, master_cdf_dir=_MASTERS_CDF_PATH, datasets=changed)
+        index.set("cdaweb-inventory", "tree", dump_inventory(root))
+        index.set("cdaweb-inventory", "datasets-fingerprints", fingerprints)
     else:
-        t = from_dict(index.get("cdaweb-inventory", "tree"))
-        root.__dict__ = t.__dict__
+        root.__dict__ = saved_tree.__dict__
     return root
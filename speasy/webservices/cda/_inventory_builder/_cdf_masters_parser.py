@@ -1,11 +1,17 @@
 import os.path
 import logging
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
 import pyistp
+from speasy.config import cdaweb as cda_cfg
+from speasy.core.index import index
 from speasy.core.inventory.indexes import ParameterIndex, DatasetIndex, SpeasyIndex
 
 log = logging.getLogger(__name__)
 
+_PROGRESS_STEP = 500
+
 
 def extract_variable(variable):
     return {
@@ -26,7 +32,21 @@ def filter_meta(attributes):
     return {key: value for key, value in attributes.items() if key in keep_list}
 
 
-def load_master_cdf(path, dataset: DatasetIndex):
+def parse_master_cdf(path) -> Tuple[Dict[str, Dict], int]:
+    """Reads data variables meta-data from a master CDF, only relies on picklable inputs and outputs so it can run in
+    a worker process
+
+    Parameters
+    ----------
+    path: str
+        master CDF path
+
+    Returns
+    -------
+    Tuple[Dict[str, Dict], int]
+        filtered meta-data of each data variable and the number of skipped variables
+    """
+    variables = {}
     skip_count = 0
     try:
         cdf = pyistp.load(path)
@@ -34,18 +54,29 @@ def load_master_cdf(path, dataset: DatasetIndex):
             try:
                 datavar = cdf.data_variable(name)
                 if datavar is not None:
-                    index = ParameterIndex(name=name, provider="cda", uid=f"{dataset.serviceprovider_ID}/{name}",
-                                           meta=filter_meta(datavar.attributes))
-                    index.start_date = dataset.start_date
-                    index.stop_date = dataset.stop_date
-                    index.dataset = dataset.spz_uid()
-                    dataset.__dict__[name] = index
-            except IndexError or RuntimeError:
-                print(f"Issue loading {name} from {path}")
+                    variables[name] = filter_meta(datavar.attributes)
+            except (IndexError, RuntimeError):
+                log.debug(f"Issue loading {name} from {path}")
                 skip_count += 1
     except RuntimeError:
-        print(f"Issue loading {name} from {path}")
+        log.debug(f"Issue loading {path}")
         skip_count += 1
+    return variables, skip_count
+
+
+def _add_parameters(dataset: DatasetIndex, variables: Dict[str, Dict]):
+    for name, meta in variables.items():
+        parameter = ParameterIndex(name=name, provider="cda", uid=f"{dataset.serviceprovider_ID}/{name}",
+                                   meta=dict(meta))
+        parameter.start_date = dataset.start_date
+        parameter.stop_date = dataset.stop_date
+        parameter.dataset = dataset.spz_uid()
+        dataset.__dict__[name] = parameter
+
+
+def load_master_cdf(path, dataset: DatasetIndex):
+    variables, skip_count = parse_master_cdf(path)
+    _add_parameters(dataset, variables)
     return skip_count
 
 
@@ -62,14 +93,80 @@ def _extract_datasets(root: SpeasyIndex):
     return datasets
 
 
-def update_tree(root: SpeasyIndex, master_cdf_dir):
+def member_signature(path: str) -> Tuple[int, int]:
+    # extracted files keep their tar member size and mtime, so this tells whether the member changed
+    stat = os.stat(path)
+    return stat.st_size, int(stat.st_mtime)
+
+
+def _workers_count(workers: Optional[int]) -> int:
+    workers = workers if workers is not None else cda_cfg.inventory_parse_workers()
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _parse_master_cdfs(paths: List[str], workers: int) -> Iterator[Tuple[Dict[str, Dict], int]]:
+    if workers == 1 or len(paths) <= 1:
+        yield from map(parse_master_cdf, paths)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # chunks keep inter-process traffic low while still yielding results in order as they come
+            yield from executor.map(parse_master_cdf, paths, chunksize=max(1, min(64, len(paths) // (workers * 4))))
+
+
+def update_tree(root: SpeasyIndex, master_cdf_dir, workers: Optional[int] = None,
+                datasets: Optional[List[DatasetIndex]] = None):
+    """Adds master CDFs data variables to each dataset of the tree. Master CDFs are parsed in a process pool and parsed
+    results are saved in the index, a rebuild only parses master CDFs which changed since the previous one.
+
+    Parameters
+    ----------
+    root: SpeasyIndex
+        inventory tree built from all.xml
+    master_cdf_dir: str
+        folder where master.tar was extracted
+    workers: int or None
+        number of parsing processes, defaults to cdaweb inventory_parse_workers configuration entry
+    datasets: List[DatasetIndex] or None
+        only update those datasets, defaults to all datasets of the tree
+    """
+    start = perf_counter()
     skip_count = 0
-    datasets = _extract_datasets(root)
+    partial_update = datasets is not None
+    datasets = datasets if partial_update else _extract_datasets(root)
+    previous: Dict[str, Tuple[Tuple[int, int], Dict[str, Dict]]] = index.get("cdaweb-inventory", "masters-parameters",
+                                                                            {})
+    parsed = {}
+    to_parse = {}
     for dataset in datasets:
         master_cdf_fname = dataset.mastercdf.split('/')[-1]
         full_path = os.path.join(master_cdf_dir, master_cdf_fname)
-        if os.path.exists(full_path):
-            skip_count += load_master_cdf(full_path, dataset)
-        else:
+        if not os.path.exists(full_path):
             skip_count += 1
-    print(f"{skip_count} datasets or variables skipped")
+        elif master_cdf_fname not in parsed and master_cdf_fname not in to_parse:
+            signature = member_signature(full_path)
+            signature_and_variables = previous.get(master_cdf_fname)
+            if signature_and_variables is not None and tuple(signature_and_variables[0]) == signature:
+                parsed[master_cdf_fname] = signature_and_variables
+            else:
+                to_parse[master_cdf_fname] = (full_path, signature)
+
+    log.info(f"Parsing {len(to_parse)} master CDFs out of {len(to_parse) + len(parsed)}, others did not change")
+    names = list(to_parse.keys())
+    for count, (name, (variables, skipped)) in enumerate(
+        zip(names, _parse_master_cdfs([to_parse[name][0] for name in names], _workers_count(workers))), start=1):
+        parsed[name] = (to_parse[name][1], variables)
+        skip_count += skipped
+        if count % _PROGRESS_STEP == 0 or count == len(names):
+            log.info(f"Parsed {count}/{len(names)} master CDFs in {perf_counter() - start:.1f}s")
+
+    for dataset in datasets:
+        signature_and_variables = parsed.get(dataset.mastercdf.split('/')[-1])
+        if signature_and_variables is not None:
+            _add_parameters(dataset, signature_and_variables[1])
+    if partial_update:
+        # entries of masters removed from the archive are dropped
+        parsed = {name: signature_and_variables for name, signature_and_variables in {**previous, **parsed}.items()
+                  if os.path.exists(os.path.join(master_cdf_dir, name))}
+    index.set("cdaweb-inventory", "masters-parameters", parsed)
+    log.info(f"Master CDFs merged into the inventory in {perf_counter() - start:.1f}s, "
+             f"{skip_count} datasets or variables skipped")
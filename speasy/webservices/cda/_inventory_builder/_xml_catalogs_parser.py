@@ -1,6 +1,8 @@
 from speasy.core import fix_name
 from speasy.core.inventory.indexes import DatasetIndex, SpeasyIndex, make_inventory_node
 import xml.etree.ElementTree as Et
+from hashlib import sha1
+from typing import Iterator
 
 
 def alias_rules(name):
@@ -73,12 +75,45 @@ def parse_dataset(inventory_tree, dataset_node):
         print(f'Missing master CDF for {dataset_node.attrib["serviceprovider_ID"]}')
 
 
+def dataset_hash(dataset_node) -> str:
+    return sha1(Et.tostring(dataset_node)).hexdigest()
+
+
+def master_cdf_name(dataset_node) -> str:
+    return dataset_node.find('{cdas}mastercdf').attrib["serviceprovider_ID"].split('/')[-1]
+
+
+def iter_datasets(xml_file_path: str) -> Iterator:
+    """Streams CDAWeb datasets nodes from all.xml, each node is complete when yielded and dropped right after, so
+    the whole document is never held in memory.
+    """
+    elements = []
+    in_cdaweb_site = False
+    in_dataset = 0
+    for event, node in Et.iterparse(xml_file_path, events=('start', 'end')):
+        if event == 'start':
+            elements.append(node)
+            if node.tag == '{cdas}datasite':
+                in_cdaweb_site = node.attrib.get('ID') == 'CDAWeb_HTTPS'
+            elif node.tag == '{cdas}dataset':
+                in_dataset += 1
+        else:
+            elements.pop()
+            if node.tag == '{cdas}dataset':
+                in_dataset -= 1
+                if in_cdaweb_site:
+                    yield node
+            elif node.tag == '{cdas}datasite':
+                in_cdaweb_site = False
+            if in_dataset == 0:
+                # dataset children are only dropped along with their dataset
+                node.clear()
+                if elements:
+                    del elements[-1][-1]
+
+
 def load_xml_catalog(xml_file_path: str, root: SpeasyIndex or None = None):
-    with open(xml_file_path) as xml_file:
-        tree = Et.fromstring(xml_file.read())
-        inventory_tree = root or SpeasyIndex(name='root', provider='cda', uid='cda_root')
-        for site in tree.iter('{cdas}datasite'):
-            if site.attrib['ID'] == 'CDAWeb_HTTPS':
-                for node in site.iter('{cdas}dataset'):
-                    parse_dataset(inventory_tree, node)
-        return inventory_tree
+    inventory_tree = root or SpeasyIndex(name='root', provider='cda', uid='cda_root')
+    for node in iter_datasets(xml_file_path):
+        parse_dataset(inventory_tree, node)
+    return inventory_tree
@@ -1,20 +1,22 @@
 import requests
-from astroquery.utils.tap.core import TapPlus
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, Iterator, List
 from datetime import datetime, timedelta
+from speasy.config import csa as csa_cfg
+from speasy.config import inventories as inventories_cfg
 from speasy.core.cache import Cacheable, CACHE_ALLOWED_KWARGS  # _cache is used for tests (hack...)
+from speasy.core.cache._providers_caches import round_for_cache
 from speasy.products.variable import SpeasyVariable
-from speasy.core import http, AllowedKwargs, fix_name
+from speasy.core import http, AllowedKwargs, fix_name, parallel_imap
+from speasy.core.index import index
 from speasy.core.proxy import Proxyfiable, GetProduct, PROXY_ALLOWED_KWARGS
-from speasy.core.cdf import load_variable
+from speasy.core.cdf import load_variables
 from speasy.core.inventory.indexes import ParameterIndex, DatasetIndex, SpeasyIndex, make_inventory_node
+from speasy.core.inventory._packed_tree import dump_inventory, load_inventory
 from speasy.core.dataprovider import DataProvider, ParameterRangeCheck, GET_DATA_ALLOWED_KWARGS
-from tempfile import TemporaryDirectory
 from speasy.core.datetime_range import DateTimeRange
 from speasy.core.requests_scheduling import SplitLargeRequests
 import tarfile
 import logging
-from io import BytesIO
 
 log = logging.getLogger(__name__)
 
@@ -31,19 +33,19 @@ def to_dataset_and_variable(index_or_str: ParameterIndex or str) -> Tuple[str, s
 
 
 def register_dataset(instruments, datasets, dataset):
-    meta = {cname: dataset[cname] for cname in dataset.colnames}
+    meta = dict(dataset)
     meta['stop_date'] = meta.pop('end_date')
     name = fix_name(meta['dataset_id'])
-    node = make_inventory_node(instruments[dataset['instruments']], DatasetIndex, name=name,
+    node = make_inventory_node(instruments[meta['instruments']], DatasetIndex, name=name,
                                provider="csa",
                                uid=meta['dataset_id'], **meta)
     datasets[meta['dataset_id']] = node
 
 
 def register_observatory(missions, observatories, observatory):
-    meta = {cname: observatory[cname] for cname in observatory.colnames}
+    meta = dict(observatory)
     name = meta.pop('name')
-    node = make_inventory_node(missions[observatory['mission_name']], SpeasyIndex,
+    node = make_inventory_node(missions[meta['mission_name']], SpeasyIndex,
                                name=fix_name(name),
                                provider="csa",
                                uid=name,
@@ -52,7 +54,7 @@ def register_observatory(missions, observatories, observatory):
 
 
 def register_mission(inventory_tree, missions, mission):
-    meta = {cname: mission[cname] for cname in mission.colnames}
+    meta = dict(mission)
     name = meta.pop('name')
     node = make_inventory_node(inventory_tree, SpeasyIndex, name=fix_name(name),
                                provider="csa",
@@ -61,9 +63,9 @@ def register_mission(inventory_tree, missions, mission):
 
 
 def register_instrument(observatories, instruments, instrument):
-    meta = {cname: instrument[cname] for cname in instrument.colnames}
+    meta = dict(instrument)
     name = meta.pop('name')
-    node = make_inventory_node(observatories.get(instrument['observatories'], observatories['MULTIPLE']),
+    node = make_inventory_node(observatories.get(meta['observatories'], observatories['MULTIPLE']),
                                SpeasyIndex, name=fix_name(name),
                                provider="csa",
                                uid=name, **meta)
@@ -73,7 +75,7 @@ def register_instrument(observatories, instruments, instrument):
 def register_param(datasets, parameter):
     parent_dataset = datasets.get(parameter["dataset_id"], None)
     if parent_dataset is not None:
-        meta = {cname: parameter[cname] for cname in parameter.colnames}
+        meta = dict(parameter)
         meta['dataset'] = parameter["dataset_id"]
         meta['start_date'] = parent_dataset.start_date
         meta['stop_date'] = parent_dataset.stop_date
@@ -82,33 +84,89 @@ def register_param(datasets, parameter):
                             provider="csa", uid=f"{parameter['dataset_id']}/{parameter['parameter_id']}", **meta)
 
 
+def _rows(table) -> Iterator[Dict]:
+    # columns are converted once to python lists, building a dict per astropy row is much slower
+    names = table.colnames
+    return (dict(zip(names, row)) for row in zip(*[table[name].tolist() for name in names]))
+
+
+_INVENTORY_QUERIES = {
+    "missions": "SELECT * FROM csa.v_mission",
+    "observatories": "SELECT * FROM csa.v_observatory",
+    "instruments": "SELECT * FROM csa.v_instrument",
+    "datasets": "SELECT * FROM csa.v_dataset WHERE is_cef='true' AND is_istp='true'",
+    "parameters": "SELECT * FROM csa.v_parameter WHERE data_type='Data'"
+}
+
+_FINGERPRINT_QUERY = "SELECT COUNT(*) AS datasets_count, MAX(date_last_update) AS last_update FROM csa.v_dataset " \
+                     "WHERE is_cef='true' AND is_istp='true'"
+
+
+def _run_queries(queries: List[str], tapurl: str) -> List:
+    # astroquery is slow to import and only needed to build the inventory
+    from astroquery.utils.tap.core import TapPlus
+
+    def _run(query: str):
+        # one client per job since TapPlus connections are not meant to be shared between threads
+        return TapPlus(url=tapurl).launch_job_async(query).get_results()
+
+    return list(parallel_imap(_run, queries, max_workers=len(queries)))
+
+
+def _fingerprint(table) -> str:
+    return f"{table['datasets_count'][0]}/{table['last_update'][0]}"
+
+
+def _inventory_is_up_to_date(tapurl: str) -> bool:
+    build_date = index.get("csa-inventory", "build-date", datetime(1970, 1, 1))
+    if datetime.utcnow() - build_date < timedelta(days=inventories_cfg.cache_retention_days()):
+        return True
+    fingerprint = _fingerprint(_run_queries([_FINGERPRINT_QUERY], tapurl=tapurl)[0])
+    if fingerprint == index.get("csa-inventory", "fingerprint", ""):
+        index.set("csa-inventory", "build-date", datetime.utcnow())
+        return True
+    return False
+
+
 def build_inventory(root: SpeasyIndex, tapurl="https://csa.esac.esa.int/csa-sl-tap/tap/"):
-    CSA = TapPlus(url=tapurl)
-    missions_req = CSA.launch_job_async("SELECT * FROM csa.v_mission")
-    observatories_req = CSA.launch_job_async("SELECT * FROM csa.v_observatory")
-    instruments_req = CSA.launch_job_async("SELECT * FROM csa.v_instrument")
-    datasets_req = CSA.launch_job_async("SELECT * FROM csa.v_dataset WHERE is_cef='true' AND is_istp='true'")
-    parameters_req = CSA.launch_job_async("SELECT * FROM csa.v_parameter WHERE data_type='Data'")
+    saved_tree = load_inventory(index.get("csa-inventory", "tree"))
+    if saved_tree is not None and _inventory_is_up_to_date(tapurl):
+        root.__dict__ = saved_tree.__dict__
+        return root
+    *tables, fingerprint = _run_queries(list(_INVENTORY_QUERIES.values()) + [_FINGERPRINT_QUERY], tapurl=tapurl)
+    missions_table, observatories_table, instruments_table, datasets_table, parameters_table = tables
     missions = {}
     observatories = {}
     instruments = {}
     datasets = {}
-    list(map(lambda m: register_mission(root, missions, m), missions_req.get_results()))
-    list(map(lambda o: register_observatory(missions, observatories, o), observatories_req.get_results()))
-    list(map(lambda i: register_instrument(observatories, instruments, i), instruments_req.get_results()))
-    list(map(lambda d: register_dataset(instruments, datasets, d), datasets_req.get_results()))
-    list(map(lambda p: register_param(datasets, p), parameters_req.get_results()))
-
+    for mission in _rows(missions_table):
+        register_mission(root, missions, mission)
+    for observatory in _rows(observatories_table):
+        register_observatory(missions, observatories, observatory)
+    for instrument in _rows(instruments_table):
+        register_instrument(observatories, instruments, instrument)
+    for dataset in _rows(datasets_table):
+        register_dataset(instruments, datasets, dataset)
+    for parameter in _rows(parameters_table):
+        register_param(datasets, parameter)
+
+    index.set("csa-inventory", "tree", dump_inventory(root))
+    index.set("csa-inventory", "fingerprint", _fingerprint(fingerprint))
+    index.set("csa-inventory", "build-date", datetime.utcnow())
     return root
 
 
+def _read_cdf_variables(response: requests.Response, variables: List[str]) -> Dict[str, Optional[SpeasyVariable]]:
+    # the tarball is streamed and its first file decoded from memory, nothing is written to disk
+    with tarfile.open(fileobj=response.raw, mode='r|*') as tar:
+        for member in tar:
+            if member.isfile():
+                return load_variables(buffer=tar.extractfile(member).read(), variables=variables)
+    return {variable: None for variable in variables}
+
+
 def _read_cdf(response: requests.Response, variable: str) -> SpeasyVariable:
-    with tarfile.open(fileobj=BytesIO(response.content)) as tar:
-        tarname = tar.getnames()
-        if len(tarname):
-            with TemporaryDirectory() as tmp_dir:
-                tar.extractall(tmp_dir)
-                return load_variable(file=f"{tmp_dir}/{tarname[0]}", variable=variable)
+    return _read_cdf_variables(response, [variable])[variable]
 
 
 def get_parameter_args(start_time: datetime, stop_time: datetime, product: str, **kwargs):
@@ -126,16 +184,16 @@ class CSA_Webservice(DataProvider):
             dataset = self.flat_inventory.datasets[dataset]
         return DateTimeRange(dataset.start_date, dataset.stop_date)
 
-    def _dl_variable(self,
-                     dataset: str, variable: str,
-                     start_time: datetime, stop_time: datetime, extra_http_headers: Dict[str, str] or None = None) -> \
-        Optional[SpeasyVariable]:
+    def _dl_variables(self,
+                      dataset: str, variables: List[str],
+                      start_time: datetime, stop_time: datetime, extra_http_headers: Dict[str, str] or None = None) -> \
+        Dict[str, Optional[SpeasyVariable]]:
 
         # https://csa.esac.esa.int/csa-sl-tap/data?RETRIEVAL_TYPE=product&&DATASET_ID=C3_CP_PEA_LERL_DEFlux&START_DATE=2001-06-10T22:12:14Z&END_DATE=2001-06-11T06:12:14Z&DELIVERY_FORMAT=CDF_ISTP&DELIVERY_INTERVAL=all
         ds_range = self._dataset_range(dataset)
         if not ds_range.intersect(DateTimeRange(start_time, stop_time)):
-            log.warning(f"You are requesting {dataset}/{variable} outside of its definition range {ds_range}")
-            return None
+            log.warning(f"You are requesting {dataset}/{variables} outside of its definition range {ds_range}")
+            return {variable: None for variable in variables}
         headers = {}
         if extra_http_headers is not None:
             headers.update(extra_http_headers)
@@ -146,13 +204,52 @@ class CSA_Webservice(DataProvider):
             "END_DATE": stop_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
             "DELIVERY_FORMAT": "CDF_ISTP",
             "DELIVERY_INTERVAL": "all"
-        }, headers=headers)
-        log.debug(f"{resp.url}")
-        if resp.status_code != 200:
-            raise RuntimeError(f'Failed to get data with request: {resp.url}, got {resp.status_code} HTTP response')
-        if not resp.ok:
-            return None
-        return _read_cdf(resp, variable)
+        }, headers=headers, stream=True)
+        with resp:
+            log.debug(f"{resp.url}")
+            if resp.status_code != 200:
+                raise RuntimeError(f'Failed to get data with request: {resp.url}, got {resp.status_code} HTTP response')
+            if not resp.ok:
+                return {variable: None for variable in variables}
+            resp.raw.decode_content = True
+            return _read_cdf_variables(resp, variables)
+
+    def _dl_variable(self,
+                     dataset: str, variable: str,
+                     start_time: datetime, stop_time: datetime, extra_http_headers: Dict[str, str] or None = None) -> \
+        Optional[SpeasyVariable]:
+        if not csa_cfg.cache_sibling_variables():
+            return self._dl_variables(dataset=dataset, variables=[variable], start_time=start_time,
+                                      stop_time=stop_time, extra_http_headers=extra_http_headers)[variable]
+        # dataset children only, scanning all parameters would load the whole inventory
+        siblings = [parameter.parameter_id for parameter in self.flat_inventory.datasets[dataset].__dict__.values() if
+                    isinstance(parameter, ParameterIndex) and parameter.parameter_id != variable]
+        variables = self._dl_variables(dataset=dataset, variables=[variable] + siblings, start_time=start_time,
+                                       stop_time=stop_time, extra_http_headers=extra_http_headers)
+        self._cache_variables(dataset, {name: data for name, data in variables.items() if name != variable},
+                              start_time, stop_time)
+        return variables[variable]
+
+    def _cache_variables(self, dataset: str, variables: Dict[str, Optional[SpeasyVariable]], start_time: datetime,
+                         stop_time: datetime):
+        cache = self.get_data.provider_cache
+        fragment_hours = cache.fragment_hours(dataset)
+        fragment_duration = timedelta(hours=fragment_hours)
+        # only fragments fully covered by the downloaded range are complete
+        fragments = []
+        fragment = round_for_cache(DateTimeRange(start_time, start_time), fragment_hours).start_time
+        if fragment < start_time:
+            fragment += fragment_duration
+        while fragment + fragment_duration <= stop_time:
+            fragments.append(fragment)
+            fragment += fragment_duration
+        entries = {}
+        for name, data in variables.items():
+            product = f"{dataset}/{name}"
+            entries.update(cache.make_cache_entries(data, fragments=fragments, product=product,
+                                                    fragment_duration_hours=fragment_hours,
+                                                    version=cache.version(self, product)))
+        cache.set_cache_entries(entries)
 
     @staticmethod
     def build_inventory(root: SpeasyIndex):
@@ -6,7 +6,7 @@ __author__ = """Alexis Jeandet"""
 __email__ = 'alexis.jeandet@member.fsf.org'
 __version__ = '0.1.0'
 
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime, timedelta
 from speasy.core.cache import Cacheable, CacheCall, CACHE_ALLOWED_KWARGS
 from speasy.products.variable import SpeasyVariable, VariableTimeAxis, DataContainer
@@ -29,17 +29,42 @@ def _make_datetime(dt: str) -> np.datetime64:
         Hack to support python 3.6, once 3.6 support removed then go back to:
         datetime.strptime(v[1], '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
     '''
-    return np.datetime64(dt[:-6], 'ns')
+    utc_offset = np.timedelta64((int(dt[-5:-3]) * 60 + int(dt[-2:])) * 60, 's')
+    if dt[-6] == '-':
+        utc_offset = -utc_offset
+    return np.datetime64(dt[:-6], 'ns') - utc_offset
+
+
+def _digits(chars: np.ndarray, start: int, stop: int) -> np.ndarray:
+    return (chars[:, start:stop] - ord('0')).astype(np.int64) @ (10 ** np.arange(stop - start - 1, -1, -1))
+
+
+def _make_time_axis(timestamps: List[str]) -> np.ndarray:
+    """Converts SSCWeb timestamps such as 2020-01-01T00:00:00.000+00:00 to datetime64[ns], all timestamps are
+    decoded at once from their fixed width characters, per timestamp conversion is only used if widths differ."""
+    if not len(timestamps):
+        return np.array([], dtype='datetime64[ns]')
+    width = len(timestamps[0])
+    raw = ''.join(timestamps).encode()
+    if len(raw) != width * len(timestamps) or width < 25 or timestamps[0][19] != '.':
+        return np.array([_make_datetime(timestamp) for timestamp in timestamps], dtype='datetime64[ns]')
+    chars = np.frombuffer(raw, dtype=np.uint8).reshape(-1, width)
+    months = (_digits(chars, 0, 4) - 1970) * 12 + _digits(chars, 5, 7) - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]') + (_digits(chars, 8, 10) - 1)
+    seconds = (_digits(chars, 11, 13) * 60 + _digits(chars, 14, 16)) * 60 + _digits(chars, 17, 19)
+    fraction_digits = width - 6 - 20
+    nanoseconds = seconds * 1_000_000_000 + _digits(chars, 20, width - 6) * 10 ** (9 - fraction_digits)
+    utc_offset = (_digits(chars, width - 5, width - 3) * 60 + _digits(chars, width - 2, width)) * 60_000_000_000
+    utc_offset[chars[:, width - 6] == ord('-')] *= -1
+    return days.astype('datetime64[ns]') + (nanoseconds - utc_offset).astype('timedelta64[ns]')
 
 
 def _variable(orbit: dict) -> Optional[SpeasyVariable]:
     data = orbit['Result']['Data'][1][0]['Coordinates'][1][0]
-    keys = list(data.keys())
-    keys.remove('CoordinateSystem')
-    values = np.array([data['X'][1], data['Y'][1], data['Z'][1]]).transpose()
-    # this is damn slow!
-    time_axis = np.array([_make_datetime(v[1]) for v in
-                          orbit['Result']['Data'][1][0]['Time'][1]])
+    time_axis = _make_time_axis([v[1] for v in orbit['Result']['Data'][1][0]['Time'][1]])
+    values = np.empty((len(time_axis), 3), dtype=np.float64)
+    for column, name in enumerate(('X', 'Y', 'Z')):
+        values[:, column] = data[name][1]
     return SpeasyVariable(
         axes=[VariableTimeAxis(values=time_axis)],
         values=DataContainer(values, meta={'CoordinateSystem': data['CoordinateSystem'], 'UNITS': 'km'}),
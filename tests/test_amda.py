@@ -3,17 +3,28 @@
 
 """Tests for `amda` package."""
 import os
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 from datetime import datetime, timezone
 
+import numpy as np
+import pycdfpp
 from ddt import data, ddt, unpack
 
 import speasy as spz
 from speasy.inventories import flat_inventories
-from speasy.webservices.amda import ProductType
-from speasy.webservices.amda.exceptions import MissingCredentials
+from speasy.products.variable import DataContainer, SpeasyVariable, VariableTimeAxis
+from speasy.webservices.amda import ProductType, rest_client
+from speasy.webservices.amda._impl import AmdaImpl
+from speasy.webservices.amda.exceptions import JobTimeout, MissingCredentials
 from speasy.webservices.amda.inventory import AmdaXMLParser, to_xmlid
+from speasy.webservices.amda.jobs import JobManager
 from speasy.webservices.amda.utils import load_csv
+from speasy.webservices.amda.ws import _bypass_proxy_unless_ascii, _parameter_cache_entry_name
 
 
 def has_amda_creds() -> bool:
@@ -42,6 +53,7 @@ class UserProductsRequestsWithoutCreds(unittest.TestCase):
             spz.amda.get_user_catalog("Id doesn't matter")
 
 
+@ddt
 class PublicProductsRequests(unittest.TestCase):
     def setUp(self):
         pass
@@ -61,6 +73,15 @@ class PublicProductsRequests(unittest.TestCase):
         result = spz.amda.get_parameter(parameter_id, start_date, stop_date, disable_proxy=True, disable_cache=True)
         self.assertIsNotNone(result)
 
+    @data("ASCII", "CDF_ISTP")
+    def test_get_variable_with_output_format(self, output_format):
+        start_date = datetime(2006, 1, 8, 1, 0, 0, tzinfo=timezone.utc)
+        stop_date = datetime(2006, 1, 8, 1, 0, 10, tzinfo=timezone.utc)
+        result = spz.amda.get_parameter("c1_b_gsm", start_date, stop_date, output_format=output_format,
+                                        disable_proxy=True, disable_cache=True)
+        self.assertIsNotNone(result)
+        self.assertGreater(len(result), 0)
+
     def test_get_variable_over_midnight(self):
         start_date = datetime(2006, 1, 8, 23, 30, 0, tzinfo=timezone.utc)
         stop_date = datetime(2006, 1, 9, 0, 30, 0, tzinfo=timezone.utc)
@@ -114,6 +135,17 @@ class PublicProductsRequests(unittest.TestCase):
         r = spz.amda.get_dataset("tao-ura-sw", start, stop, disable_cache=True)
         self.assertTrue(len(r) != 0)
 
+    def test_get_dataset_sequentially_or_concurrently_gives_same_variables(self):
+        start, stop = datetime(2012, 1, 1), datetime(2012, 1, 1, 1)
+        self.addCleanup(os.environ.pop, spz.config.amda.max_parallel_parameters.env_var_name)
+        os.environ[spz.config.amda.max_parallel_parameters.env_var_name] = "4"
+        concurrent = spz.amda.get_dataset("tao-ura-sw", start, stop, disable_cache=True)
+        os.environ[spz.config.amda.max_parallel_parameters.env_var_name] = "1"
+        sequential = spz.amda.get_dataset("tao-ura-sw", start, stop, disable_cache=True)
+        self.assertListEqual(list(concurrent.variables.keys()), list(sequential.variables.keys()))
+        for name in concurrent.variables:
+            self.assertEqual(concurrent[name], sequential[name])
+
     def test_list_timetables(self):
         result = spz.amda.list_timetables()
         self.assertTrue(len(result) != 0)
@@ -174,6 +206,126 @@ class PrivateProductsRequests(unittest.TestCase):
         self.assertTrue(len(result) != 0)
 
 
+class _FakeStatusResponse:
+    def __init__(self, status):
+        self._status = status
+
+    def json(self):
+        return self._status
+
+
+class _FakeResponse:
+    def __init__(self, status_code=200, text="", js=None):
+        self.status_code = status_code
+        self.text = text
+        self._js = js
+
+    def json(self):
+        return self._js
+
+
+class TokenReuse(unittest.TestCase):
+    def setUp(self):
+        self.issued = []
+        self.rejected = set()
+        rest_client._tokens.clear()
+        self.addCleanup(rest_client._tokens.clear)
+        patcher = mock.patch('speasy.webservices.amda.rest_client.http.get', side_effect=self._fake_get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fake_get(self, url, params=None, headers=None):
+        if url.endswith(rest_client.Endpoint.AUTH.value):
+            self.issued.append(f"token_{len(self.issued)}")
+            return _FakeResponse(text=self.issued[-1])
+        if params['token'] in self.rejected:
+            return _FakeResponse(js={"success": False})
+        return _FakeResponse(js={"success": True, "dataFileURLs": params['token']})
+
+    def _get_parameter(self):
+        return rest_client.get_parameter(server_url="http://amda", parameterID="imf")
+
+    def test_token_is_shared_by_requests(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: self._get_parameter(), range(32)))
+        self.assertEqual(results, ["token_0"] * 32)
+        self.assertEqual(self.issued, ["token_0"])
+
+    def test_rejected_token_is_renewed(self):
+        self.assertEqual(self._get_parameter(), "token_0")
+        self.rejected.add("token_0")
+        self.assertEqual(self._get_parameter(), "token_1")
+        self.assertEqual(self._get_parameter(), "token_1")
+        self.assertEqual(len(self.issued), 2)
+
+    def test_failing_request_renews_token_once(self):
+        self.rejected.update(f"token_{i}" for i in range(10))
+        self.assertIsNone(self._get_parameter())
+        self.assertEqual(len(self.issued), 2)
+
+    def test_expired_token_is_renewed(self):
+        os.environ[spz.config.amda.token_lifetime.env_var_name] = "0"
+        self.addCleanup(os.environ.pop, spz.config.amda.token_lifetime.env_var_name)
+        self.assertEqual(self._get_parameter(), "token_0")
+        self.assertEqual(self._get_parameter(), "token_1")
+
+
+class JobManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.polls = {}
+        self.lock = threading.Lock()
+
+    def _fake_status(self, url, params, headers):
+        with self.lock:
+            self.polls.setdefault(params['id'], []).append(time.monotonic())
+            count = len(self.polls[params['id']])
+        if params['id'] == 'failing':
+            return _FakeStatusResponse({"success": False})
+        if params['id'] == 'garbage':
+            return _FakeStatusResponse(["not", "a", "status"])
+        if count < params['polls']:
+            return _FakeStatusResponse({"success": True, "status": "in progress"})
+        return _FakeStatusResponse({"success": True, "status": "done", "dataFileURLs": f"url_{params['id']}"})
+
+    def test_pending_jobs_progress_concurrently_with_backoff(self):
+        manager = JobManager(min_delay=0.02, max_delay=0.08, timeout=10.)
+        with mock.patch('speasy.webservices.amda.jobs.http.get', side_effect=self._fake_status):
+            start = time.monotonic()
+            futures = [manager.submit("status_url", {"id": str(i), "polls": 5}) for i in range(3)]
+            futures.append(manager.submit("status_url", {"id": 'failing', "polls": 5}))
+            self.assertEqual([f.result(timeout=5) for f in futures], ["url_0", "url_1", "url_2", None])
+            # 0.02 + 0.03 + 0.045 + 0.0675 + 0.08 for each job when polled concurrently, not 3 times this
+            self.assertLess(time.monotonic() - start, 0.6)
+        for i in range(3):
+            delays = np.diff(self.polls[str(i)])
+            self.assertEqual(len(delays), 4)
+            self.assertGreater(delays[-1], delays[0])
+        self.assertEqual(len(self.polls['failing']), 1)
+
+    def test_raises_once_deadline_is_reached(self):
+        manager = JobManager(min_delay=0.01, max_delay=0.02, timeout=0.1)
+        with mock.patch('speasy.webservices.amda.jobs.http.get', side_effect=self._fake_status):
+            with self.assertRaises(JobTimeout):
+                manager.wait("status_url", {"id": "slow", "polls": 1000})
+            self.assertEqual(manager.wait("status_url", {"id": "fast", "polls": 1}), "url_fast")
+
+
+    def test_unexpected_status_fails_the_job_not_the_poller(self):
+        manager = JobManager(min_delay=0.01, max_delay=0.02, timeout=5.)
+        with mock.patch('speasy.webservices.amda.jobs.http.get', side_effect=self._fake_status):
+            with self.assertRaises(ValueError):
+                manager.wait("status_url", {"id": "garbage", "polls": 1})
+            self.assertEqual(manager.wait("status_url", {"id": "after", "polls": 2}), "url_after")
+
+    def test_dead_poller_is_restarted(self):
+        manager = JobManager(min_delay=0.01, max_delay=0.02, timeout=5.)
+        manager._thread = threading.Thread(target=lambda: None)
+        manager._thread.start()
+        manager._thread.join()
+        with mock.patch('speasy.webservices.amda.jobs.http.get', side_effect=self._fake_status):
+            self.assertEqual(manager.wait("status_url", {"id": "restarted", "polls": 1}), "url_restarted")
+
+
 @ddt
 class AMDAModule(unittest.TestCase):
     def setUp(self):
@@ -190,6 +342,103 @@ class AMDAModule(unittest.TestCase):
         self.assertGreater(len(var.time), 0)
         self.assertTrue('MISSION_ID' in var.meta)
 
+    def _write_csv_with_body(self, body: str) -> str:
+        with open(os.path.normpath(
+            f'{os.path.dirname(os.path.abspath(__file__))}/resources/amda_sample_spectro.txt')) as sample:
+            header = "".join(filter(lambda line: line.startswith('#'), sample.readlines()))
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.write(header + body)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def test_loads_csv_with_trailing_spaces_and_nans(self):
+        var = load_csv(self._write_csv_with_body(
+            "  1577836800.000 " + " nan" * 15 + "  \n"
+            "1577836801.000 " + " 1.5" * 15 + " \n"))
+        self.assertEqual(var.values.shape, (2, 15))
+        self.assertTrue(np.all(np.isnan(var.values[0])))
+        self.assertTrue(np.all(var.values[1] == 1.5))
+        self.assertEqual(var.time[0], np.datetime64('2020-01-01T00:00:00', 'ns'))
+
+    def test_loads_tab_separated_csv(self):
+        var = load_csv(self._write_csv_with_body(
+            "1577836800.000\t" + "\t".join(["2.5"] * 15) + "\n"
+            "1577836801.000 \t" + " \t".join(["3.5"] * 15) + "\n"))
+        self.assertEqual(var.values.shape, (2, 15))
+        self.assertTrue(np.all(var.values[0] == 2.5))
+        self.assertTrue(np.all(var.values[1] == 3.5))
+
+    def test_loads_csv_without_data(self):
+        var = load_csv(self._write_csv_with_body(""))
+        self.assertEqual(len(var.time), 0)
+        self.assertEqual(var.values.shape, (0, 15))
+        self.assertTrue('MISSION_ID' in var.meta)
+
+    def test_loads_cdf_and_falls_back_to_csv(self):
+        cdf = pycdfpp.CDF()
+        time = np.datetime64('2020-01-01', 'ns') + np.arange(10).astype('timedelta64[s]')
+        cdf.add_variable("Epoch", values=pycdfpp.to_tt2000(time), data_type=pycdfpp.DataType.CDF_TIME_TT2000)
+        cdf.add_variable("imf", values=np.ones((10, 3)))
+        cdf["imf"].add_attribute("DEPEND_0", "Epoch")
+        cdf["imf"].add_attribute("VAR_TYPE", "data")
+        fd, path = tempfile.mkstemp(suffix='.cdf')
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        pycdfpp.save(cdf, path)
+        sample = os.path.normpath(f'{os.path.dirname(os.path.abspath(__file__))}/resources/amda_sample_spectro.txt')
+        impl = AmdaImpl()
+        with mock.patch('speasy.webservices.amda._impl.rest_client.get_parameter',
+                        side_effect=lambda **kwargs: path if kwargs.get('outputFormat') == 'CDF_ISTP' else sample) \
+            as get_parameter:
+            var = impl.dl_parameter_chunk(datetime(2020, 1, 1), datetime(2020, 1, 2), "imf", output_format="CDF_ISTP")
+            self.assertEqual(var.values.shape, (10, 3))
+            self.assertEqual(var.time[0], time[0])
+            for _ in range(2):
+                self.assertEqual(impl.dl_parameter_chunk(datetime(2020, 1, 1), datetime(2020, 1, 2), "not_in_cdf",
+                                                         output_format="CDF_ISTP"), load_csv(sample))
+            # CDF is not tried again once the parameter was found missing
+            self.assertEqual(len([call for call in get_parameter.call_args_list
+                                  if call[1]['parameterID'] == "not_in_cdf" and
+                                  call[1].get('outputFormat') == 'CDF_ISTP']), 1)
+            self.assertEqual(impl.dl_parameter_chunk(datetime(2020, 1, 1), datetime(2020, 1, 2), "imf",
+                                                     output_format="ASCII"), load_csv(sample))
+            with self.assertRaises(ValueError):
+                impl.dl_parameter_chunk(datetime(2020, 1, 1), datetime(2020, 1, 2), "imf", output_format="JSON")
+
+    def test_output_formats_use_distinct_cache_entries_and_bypass_proxy(self):
+        self.assertNotEqual(_parameter_cache_entry_name("amda", "imf", "2020-01-01T00:00:00", output_format="ascii"),
+                            _parameter_cache_entry_name("amda", "imf", "2020-01-01T00:00:00",
+                                                        output_format="CDF_ISTP"))
+        get_parameter = _bypass_proxy_unless_ascii(lambda self, **kwargs: kwargs)
+        self.assertTrue(get_parameter(None, "imf", 0, 1, output_format="CDF_ISTP")['disable_proxy'])
+        self.assertNotIn('disable_proxy', get_parameter(None, "imf", 0, 1, output_format="ASCII"))
+
+    def test_downloads_chunks_concurrently(self):
+        in_flight = []
+        lock = threading.Lock()
+
+        def _fake_chunk(start_time, stop_time, parameter_id, **kwargs):
+            with lock:
+                in_flight.append(1)
+                peak = len(in_flight)
+            time.sleep(0.05)
+            with lock:
+                in_flight.pop()
+            t = np.arange(np.datetime64(start_time, 'ns'), np.datetime64(stop_time, 'ns'), np.timedelta64(1, 'h'))
+            return SpeasyVariable(axes=[VariableTimeAxis(values=t)],
+                                  values=DataContainer(values=np.full((len(t), 1), float(peak))))
+
+        os.environ[spz.config.amda.max_parallel_chunks.env_var_name] = "4"
+        self.addCleanup(os.environ.pop, spz.config.amda.max_parallel_chunks.env_var_name)
+        impl = AmdaImpl()
+        with mock.patch.object(impl, 'dl_parameter_chunk', side_effect=_fake_chunk):
+            var = impl.dl_parameter(datetime(2020, 1, 1), datetime(2020, 4, 1), "imf")
+        self.assertEqual(len(var), 91 * 24)
+        self.assertTrue(np.all(np.diff(var.time) == np.timedelta64(1, 'h')))
+        self.assertGreater(var.values.max(), 1)
+        self.assertLessEqual(var.values.max(), spz.config.amda.max_parallel_chunks())
+
     def test_load_obs_datatree(self):
         with open(
             os.path.normpath(f'{os.path.dirname(os.path.abspath(__file__))}/resources/obsdatatree.xml')) as obs_xml:
@@ -3,6 +3,7 @@ import shutil
 import tempfile
 import time
 import unittest
+from unittest import mock
 from datetime import datetime, timedelta, timezone
 
 import dateutil.parser as dt_parser
@@ -11,10 +12,13 @@ import packaging.version as Version
 from ddt import data, ddt, unpack
 
 from speasy.core import epoch_to_datetime64
-from speasy.core.cache import Cache, Cacheable, UnversionedProviderCache
+from speasy.core.cache import Cache, CacheItem, Cacheable, MemoryCache, UnversionedProviderCache, stats
+from speasy.core.cache._binary_entry import dump_entry, is_binary_entry, load_entry
+from speasy.core.cache._providers_caches import decode_entry
 from speasy.core.cache.version import str_to_version, version_to_str
 from speasy.products.variable import (DataContainer, SpeasyVariable,
-                                      VariableTimeAxis)
+                                      VariableAxis, VariableTimeAxis,
+                                      to_dictionary)
 
 start_date = datetime(2016, 6, 1, 12, tzinfo=timezone.utc)
 
@@ -124,6 +128,49 @@ class _CacheTest(unittest.TestCase):
         var = self._make_unversioned_data("test_get_outdated_from_unversioned_cache", tstart, tend)
         self.assertEqual(self._make_unversioned_data_cntr, 2)
 
+    def test_get_data_with_parallel_downloads(self):
+        tstart = datetime(2011, 6, 1, 0, tzinfo=timezone.utc)
+        tend = datetime(2011, 6, 1, 12, tzinfo=timezone.utc)
+        for data_f in (self._make_data, self._make_unversioned_data):
+            # leaves holes in cache so the full range request has to download several fragments groups
+            for hour in (2, 5, 8):
+                data_f(f"test_get_data_with_parallel_downloads{data_f}", tstart + timedelta(hours=hour),
+                       tstart + timedelta(hours=hour, minutes=30))
+        self._make_data_cntr = 0
+        self._make_unversioned_data_cntr = 0
+        reference = data_generator(tstart, tend)
+        var = self._make_data(f"test_get_data_with_parallel_downloads{self._make_data}", tstart, tend,
+                              max_parallel_downloads=4)
+        self.assertEqual(self._make_data_cntr, 4)
+        self.assertTrue(np.array_equal(var.time, reference.time))
+        self.assertTrue(np.array_equal(var.values, reference.values))
+        var = self._make_unversioned_data(f"test_get_data_with_parallel_downloads{self._make_unversioned_data}",
+                                          tstart, tend, max_parallel_downloads=4)
+        self.assertEqual(self._make_unversioned_data_cntr, 4)
+        self.assertTrue(np.array_equal(var.time, reference.time))
+        self.assertTrue(np.array_equal(var.values, reference.values))
+
+    def test_get_data_uses_few_transactions(self):
+        tstart = datetime(2014, 6, 1, 0, tzinfo=timezone.utc)
+        tend = datetime(2014, 6, 11, 0, tzinfo=timezone.utc)
+        for data_f in (self._make_data, self._make_unversioned_data):
+            product = f"test_get_data_uses_few_transactions{data_f}"
+            with mock.patch.object(Cache, 'transact', autospec=True, side_effect=Cache.transact) as transact:
+                data_f(product, tstart, tend)
+                self.assertLessEqual(transact.call_count, 2)
+                transact.reset_mock()
+                data_f(product, tstart, tend)
+                self.assertEqual(transact.call_count, 1)
+
+    def test_bulk_get_and_set(self, cache=cache):
+        cache.set_many({"test_bulk_get_and_set/1": 1, "test_bulk_get_and_set/2": b"2"})
+        stats = cache.stats()
+        self.assertListEqual(
+            cache.get_many(["test_bulk_get_and_set/1", "test_bulk_get_and_set/3", "test_bulk_get_and_set/2"]),
+            [1, None, b"2"])
+        self.assertEqual(cache.stats()["hit"], stats["hit"] + 2)
+        self.assertEqual(cache.stats()["misses"], stats["misses"] + 1)
+
     def test_list_keys(self):
         keys = self._make_data.cache.keys()
         types = [type(key) for key in keys]
@@ -139,6 +186,135 @@ class _CacheTest(unittest.TestCase):
         pass
 
 
+@ddt
+class _BinaryEntryTest(unittest.TestCase):
+    @staticmethod
+    def make_spectro(length, dtype):
+        time = epoch_to_datetime64(np.arange(length, dtype=np.float64) + 1e9)
+        return SpeasyVariable(
+            axes=[VariableTimeAxis(values=time, meta={"UNITS": "ns"}),
+                  VariableAxis(values=np.arange(length * 4, dtype=np.float32).reshape(length, 4), name="energy",
+                               meta={"UNITS": "eV"}, is_time_dependent=True)],
+            values=DataContainer(values=np.arange(length * 4).astype(dtype).reshape(length, 4), name="spectro",
+                                 meta={"FILLVAL": -1}),
+            columns=[f"c{i}" for i in range(4)])
+
+    @data(np.float64, np.int32, np.uint8)
+    def test_roundtrip_preserves_variable(self, dtype):
+        var = self.make_spectro(100, dtype)
+        entry = dump_entry(var, version="1.2.3")
+        self.assertTrue(is_binary_entry(entry))
+        item = load_entry(entry)
+        self.assertEqual(item.version, "1.2.3")
+        self.assertEqual(item.data, var)
+        self.assertEqual(item.data.values.dtype, np.dtype(dtype))
+        self.assertEqual(item.data.axes[1].values.dtype, np.float32)
+
+    def test_arrays_are_views_on_entry(self):
+        entry = dump_entry(self.make_spectro(1000, np.float64), version=None)
+        item = load_entry(entry)
+        self.assertFalse(item.data.values.flags.owndata)
+        self.assertFalse(item.data.values.flags.writeable)
+
+    def test_empty_variable(self):
+        var = self.make_spectro(0, np.float64)
+        self.assertEqual(load_entry(dump_entry(var, version=None)).data, var)
+
+    def test_time_slices_are_stored(self):
+        var = self.make_spectro(100, np.float64)
+        self.assertEqual(load_entry(dump_entry(var[10:20], version=None)).data, var[10:20])
+
+    def test_legacy_entries_are_still_readable(self):
+        var = self.make_spectro(10, np.float64)
+        item = decode_entry(CacheItem(to_dictionary(var), "1.0"))
+        self.assertEqual(item.version, "1.0")
+        self.assertEqual(item.data, var)
+
+    def test_cacheable_stores_binary_entries(self):
+        tstart = datetime(2012, 6, 1, 12, 0, tzinfo=timezone.utc)
+        test = _CacheTest()
+        test.setUp()
+        test._make_data("test_cacheable_stores_binary_entries", tstart, tstart + timedelta(hours=2))
+        keys = [key for key in test._make_data.cache.keys() if "test_cacheable_stores_binary_entries" in key]
+        self.assertGreater(len(keys), 0)
+        for key in keys:
+            self.assertTrue(is_binary_entry(test._make_data.cache.get(key)))
+
+
+class _MemoryCacheTest(unittest.TestCase):
+    disk_cache = cache
+
+    def setUp(self):
+        self._make_data_cntr = 0
+        self.memory_cache = MemoryCache(max_size=10 * 1024 * 1024)
+
+    def version(self, product):
+        return 0
+
+    def _make_data(self, product, start_time, stop_time):
+        @Cacheable(prefix="memory", cache_instance=self.disk_cache, version=lambda _, __: self.version(product),
+                   memory_cache_instance=self.memory_cache)
+        def _get(_, product, start_time, stop_time):
+            self._make_data_cntr += 1
+            return data_generator(start_time, stop_time)
+
+        return _get(self, product, start_time, stop_time)
+
+    def test_lru_eviction(self):
+        memory_cache = MemoryCache(max_size=100)
+        for key in ("a", "b", "c"):
+            memory_cache.set(key, CacheItem(key, None), size=40)
+        self.assertNotIn("a", memory_cache)
+        self.assertIsNotNone(memory_cache.get("b"))
+        memory_cache.set("d", CacheItem("d", None), size=40)
+        self.assertIn("b", memory_cache)
+        self.assertNotIn("c", memory_cache)
+        memory_cache.set("e", CacheItem("e", None), size=200)
+        self.assertNotIn("e", memory_cache)
+        self.assertEqual(memory_cache.stats()["evictions"], 2)
+        self.assertLessEqual(memory_cache.stats()["size"], 100)
+
+    def test_disabled_by_zero_size(self):
+        memory_cache = MemoryCache(max_size=0)
+        memory_cache.set("a", CacheItem("a", None), size=1)
+        self.assertEqual(len(memory_cache), 0)
+
+    def test_warm_requests_are_served_from_memory(self):
+        tstart = datetime(2013, 6, 1, 12, 0, tzinfo=timezone.utc)
+        tend = datetime(2013, 6, 1, 15, 30, tzinfo=timezone.utc)
+        reference = self._make_data("test_warm_requests_are_served_from_memory", tstart, tend)
+        disk_stats = self.disk_cache.stats()
+        memory_stats = self.memory_cache.stats()
+        for _ in range(5):
+            self.assertEqual(self._make_data("test_warm_requests_are_served_from_memory", tstart, tend), reference)
+        self.assertEqual(self._make_data_cntr, 1)
+        self.assertEqual(self.disk_cache.stats(), disk_stats)
+        self.assertGreater(self.memory_cache.stats()["hit"], memory_stats["hit"])
+
+    def test_falls_back_to_disk(self):
+        tstart = datetime(2013, 7, 1, 12, 0, tzinfo=timezone.utc)
+        tend = datetime(2013, 7, 1, 15, 30, tzinfo=timezone.utc)
+        reference = self._make_data("test_falls_back_to_disk", tstart, tend)
+        self.memory_cache.clear()
+        self.assertEqual(self._make_data("test_falls_back_to_disk", tstart, tend), reference)
+        self.assertEqual(self._make_data_cntr, 1)
+        self.assertGreater(len(self.memory_cache), 0)
+
+    def test_entries_do_not_keep_downloaded_data_alive(self):
+        tstart = datetime(2013, 8, 1, 12, 0, tzinfo=timezone.utc)
+        tend = datetime(2013, 8, 1, 15, 30, tzinfo=timezone.utc)
+        self._make_data("test_entries_do_not_keep_downloaded_data_alive", tstart, tend)
+        entries = [entry for entry, _ in self.memory_cache._entries.values()]
+        self.assertGreater(len(entries), 0)
+        for entry in entries:
+            values = entry.data.values
+            self.assertTrue(values.base is None or values.base.nbytes == values.nbytes)
+        self.assertLessEqual(sum(entry.data.nbytes for entry in entries), self.memory_cache.stats()["size"])
+
+    def test_global_stats_have_one_entry_per_tier(self):
+        self.assertEqual(set(stats().keys()), {"memory", "disk"})
+
+
 @ddt
 class _CacheVersionTest(unittest.TestCase):
 
@@ -1,13 +1,26 @@
 import logging
 import os
+import tarfile
+import tempfile
 import unittest
+import uuid
 from datetime import datetime, timedelta, timezone
 from multiprocessing import dummy
+from unittest import mock
 
 import numpy as np
+import pycdfpp
 from ddt import data, ddt
 
 import speasy as spz
+from speasy.core.dataprovider import PROVIDERS
+from speasy.core.index.speasy_index import SpeasyIndex as _Index
+from speasy.core.inventory.indexes import DatasetIndex, SpeasyIndex, make_inventory_node
+from speasy.core.datetime_range import DateTimeRange
+from speasy.inventories import flat_inventories
+from speasy.webservices.cda import CDA_Webservice
+from speasy.webservices.cda import _inventory_builder
+from speasy.webservices.cda._inventory_builder import _cdf_masters_parser
 
 
 @ddt
@@ -125,6 +138,232 @@ class SimpleRequest(unittest.TestCase):
         self.assertGreaterEqual(len(spz.inventories.flat_inventories.cda.parameters), 47000)
 
 
+class _FakeResponse:
+    def __init__(self, url, js):
+        self.url = url
+        self.status_code = 200
+        self.ok = True
+        self._js = js
+
+    def json(self):
+        return self._js
+
+
+class BatchedVariablesRequests(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cdf_path = os.path.join(self.tmp_dir.name, "test.cdf")
+        cdf = pycdfpp.CDF()
+        time = np.datetime64('2020-01-01', 'ns') + np.arange(4 * 24 * 60).astype('timedelta64[m]')
+        cdf.add_variable("Epoch", values=pycdfpp.to_tt2000(time), data_type=pycdfpp.DataType.CDF_TIME_TT2000)
+        for name in ("B", "V", "N"):
+            cdf.add_variable(name, values=np.random.random_sample((len(time), 3)))
+            cdf[name].add_attribute("DEPEND_0", "Epoch")
+            cdf[name].add_attribute("VAR_TYPE", "data")
+        pycdfpp.save(cdf, self.cdf_path)
+        # unique dataset name so previous runs cache entries never match
+        self.dataset = f"SPZ_BATCH_TEST_{uuid.uuid4().hex}"
+        self.urls = []
+        # a provider without inventory which is not registered, so other tests still get the real one
+        with mock.patch.dict(PROVIDERS), mock.patch.dict(flat_inventories.__dict__), \
+            mock.patch.object(CDA_Webservice, 'update_inventory'):
+            self.cda = CDA_Webservice()
+        patchers = [
+            mock.patch('speasy.webservices.cda.http.get', side_effect=self._fake_get),
+            mock.patch.object(self.cda, 'parameter_range',
+                              return_value=DateTimeRange(datetime(2020, 1, 1), datetime(2020, 1, 4))),
+            mock.patch.object(spz.config.proxy.enabled, 'get', return_value=False)
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _fake_get(self, url, headers=None):
+        self.urls.append(url)
+        return _FakeResponse(url, {'FileDescription': [{'Name': f"file://{self.cdf_path}"}]})
+
+    def test_sibling_variables_are_downloaded_once(self):
+        start, stop = datetime(2020, 1, 2, 1), datetime(2020, 1, 2, 5)
+        variables = self.cda.get_variables(self.dataset, ["B", "V"], start, stop)
+        self.assertEqual(len(self.urls), 1)
+        self.assertTrue(self.urls[0].split('?')[0].endswith("/B,V"))
+        self.assertEqual(list(variables.keys()), ["B", "V"])
+        for variable in variables.values():
+            self.assertEqual(len(variable), 4 * 60)
+            self.assertEqual(variable.time[0], np.datetime64(start, 'ns'))
+        # sibling fragments are already in cache
+        self.assertIsNotNone(self.cda.get_variable(self.dataset, "V", start, stop))
+        self.assertEqual(len(self.urls), 1)
+        # only the missing variable is requested
+        self.cda.get_variables(self.dataset, ["B", "V", "N"], start, stop)
+        self.assertEqual(len(self.urls), 2)
+        self.assertTrue(self.urls[1].split('?')[0].endswith("/N"))
+
+    def test_variables_are_only_prefetched_within_their_range(self):
+        ranges = {"B": DateTimeRange(datetime(2020, 1, 1), datetime(2020, 1, 4)),
+                  "V": DateTimeRange(datetime(2020, 1, 1), datetime(2020, 1, 4)),
+                  "N": DateTimeRange(datetime(2019, 1, 1), datetime(2019, 1, 4))}
+        with mock.patch.object(self.cda, 'parameter_range', side_effect=lambda p: ranges[p.split('/')[-1]]):
+            variables = self.cda.get_variables(self.dataset, ["B", "V", "N"], datetime(2020, 1, 2, 1),
+                                               datetime(2020, 1, 2, 5))
+        self.assertEqual(len(self.urls), 1)
+        self.assertTrue(self.urls[0].split('?')[0].endswith("/B,V"))
+        self.assertIsNone(variables["N"])
+
+    def test_unexpected_kwargs_are_rejected_before_prefetch(self):
+        with self.assertRaises(TypeError):
+            self.cda.get_variables(self.dataset, ["B", "V"], datetime(2020, 1, 2, 1), datetime(2020, 1, 2, 5),
+                                   not_a_kwarg=True)
+        self.assertEqual(len(self.urls), 0)
+
+
+class _MasterCDFsFixture(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.masters_dir = os.path.join(self.tmp_dir.name, "masters")
+        os.makedirs(self.masters_dir)
+        os.environ[spz.config.index.path.env_var_name] = os.path.join(self.tmp_dir.name, "index")
+        self.addCleanup(os.environ.pop, spz.config.index.path.env_var_name)
+        patcher = mock.patch.object(_cdf_masters_parser, 'index', _Index())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.datasets = [f"DS_{i}" for i in range(4)]
+        for dataset in self.datasets:
+            self._write_master(dataset, ("B", "V"))
+
+    def _write_master(self, dataset, variables):
+        cdf = pycdfpp.CDF()
+        time = np.datetime64('2020-01-01', 'ns') + np.arange(3).astype('timedelta64[s]')
+        cdf.add_variable("Epoch", values=pycdfpp.to_tt2000(time), data_type=pycdfpp.DataType.CDF_TIME_TT2000)
+        cdf["Epoch"].add_attribute("VAR_TYPE", "support_data")
+        for name in variables:
+            cdf.add_variable(name, values=np.zeros((len(time), 3)))
+            for key, value in dict(DEPEND_0="Epoch", VAR_TYPE="data", CATDESC=f"{name} of {dataset}", UNITS="nT",
+                                   FIELDNAM=name, DISPLAY_TYPE="time_series").items():
+                cdf[name].add_attribute(key, value)
+        path = os.path.join(self.masters_dir, f"{dataset.lower()}_00000000_v01.cdf")
+        pycdfpp.save(cdf, path)
+        return path
+
+
+class MasterCDFsParsing(_MasterCDFsFixture):
+    def _tree(self):
+        root = SpeasyIndex(name="cda", provider="cda", uid="cda")
+        for dataset in self.datasets + ["NO_MASTER"]:
+            make_inventory_node(root, DatasetIndex, name=dataset, provider="cda", uid=dataset,
+                                serviceprovider_ID=dataset, start_date="2020-01-01", stop_date="2020-01-02",
+                                mastercdf=f"https://cdaweb.gsfc.nasa.gov/pub/software/cdawlib/0MASTERS/"
+                                          f"{dataset.lower()}_00000000_v01.cdf")
+        return root
+
+    def test_parses_master_cdfs_in_a_process_pool(self):
+        root = self._tree()
+        _cdf_masters_parser.update_tree(root, self.masters_dir, workers=2)
+        for dataset in self.datasets:
+            node = root.__dict__[dataset]
+            self.assertEqual(set(p.spz_name() for p in node), {"B", "V"})
+            self.assertEqual(node.B.CATDESC, f"B of {dataset}")
+            self.assertEqual(node.B.dataset, dataset)
+        self.assertEqual(len(list(root.NO_MASTER)), 0)
+
+    def test_only_changed_master_cdfs_are_parsed_again(self):
+        _cdf_masters_parser.update_tree(self._tree(), self.masters_dir, workers=1)
+        path = self._write_master(self.datasets[0], ("B", "V", "N"))
+        # mtime resolution can be coarser than the time elapsed since the first build
+        os.utime(path, (0, 0))
+        root = self._tree()
+        with mock.patch.object(_cdf_masters_parser, 'parse_master_cdf',
+                               wraps=_cdf_masters_parser.parse_master_cdf) as parse:
+            _cdf_masters_parser.update_tree(root, self.masters_dir, workers=1)
+        self.assertEqual([call[0][0] for call in parse.call_args_list], [path])
+        self.assertIn("N", root.__dict__[self.datasets[0]])
+        for dataset in self.datasets[1:]:
+            self.assertEqual(set(p.spz_name() for p in root.__dict__[dataset]), {"B", "V"})
+
+
+class IncrementalInventoryBuild(_MasterCDFsFixture):
+    def setUp(self):
+        super().setUp()
+        self.xml_path = os.path.join(self.tmp_dir.name, "all.xml")
+        patchers = [
+            mock.patch.object(_inventory_builder, 'index', _cdf_masters_parser.index),
+            mock.patch.object(_inventory_builder, '_MASTERS_CDF_PATH', self.masters_dir),
+            mock.patch.object(_inventory_builder, '_XML_CATALOG_PATH', self.xml_path),
+            mock.patch.object(_inventory_builder, 'update_xml_catalog', return_value=True),
+            mock.patch.object(_inventory_builder, 'update_master_cdf', return_value=True)
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _write_xml_catalog(self, datasets: dict):
+        with open(self.xml_path, 'w') as f:
+            f.write('<sites xmlns="cdas"><datasite ID="CDAWeb_HTTPS">')
+            for dataset, observatory in datasets.items():
+                master_cdf = f"https://cdaweb.gsfc.nasa.gov/pub/software/cdawlib/0MASTERS/{dataset.lower()}_00000000_v01.cdf"
+                f.write(f"""<dataset serviceprovider_ID="{dataset}" timerange_start="2020-01-01"
+                        timerange_stop="2020-01-02"><mission_group serviceprovider_ID="MISSION"/>
+                        <observatory serviceprovider_ID="{observatory}"/><instrument serviceprovider_ID="INST"/>
+                        <description short="{dataset} from {observatory}"/>
+                        <mastercdf serviceprovider_ID="{master_cdf}"/></dataset>""")
+            f.write('</datasite></sites>')
+
+    def _build(self):
+        return _inventory_builder.build_inventory(SpeasyIndex(name='root', provider='cda', uid='cda_root'))
+
+    def test_only_changed_datasets_are_processed(self):
+        self._write_xml_catalog({"DS_0": "OBS_A", "DS_1": "OBS_A", "DS_2": "OBS_B"})
+        root = self._build()
+        self.assertEqual(set(p.spz_name() for p in root.MISSION.OBS_B.INST.DS_2), {"B", "V"})
+        # DS_1 moves to another observatory, DS_2 is removed and DS_3 is added
+        self._write_xml_catalog({"DS_0": "OBS_A", "DS_1": "OBS_C", "DS_3": "OBS_A"})
+        registered = []
+        register = _inventory_builder.parse_dataset
+
+        def parse_dataset(inventory_tree, dataset_node):
+            # streamed nodes are cleared once processed
+            registered.append(dataset_node.attrib["serviceprovider_ID"])
+            return register(inventory_tree, dataset_node)
+
+        with mock.patch.object(_cdf_masters_parser, 'parse_master_cdf',
+                               wraps=_cdf_masters_parser.parse_master_cdf) as parse, \
+            mock.patch.object(_inventory_builder, 'parse_dataset', side_effect=parse_dataset):
+            root = self._build()
+        self.assertEqual(sorted(registered), ["DS_1", "DS_3"])
+        # DS_1 master did not change, only DS_3 one is parsed
+        self.assertEqual([os.path.basename(call[0][0]) for call in parse.call_args_list],
+                         ["ds_3_00000000_v01.cdf"])
+        self.assertEqual(set(root.MISSION.__dict__.keys()) & {"OBS_A", "OBS_B", "OBS_C"}, {"OBS_A", "OBS_C"})
+        self.assertEqual(set(root.MISSION.OBS_A.INST.__dict__.keys()) & set(self.datasets), {"DS_0", "DS_3"})
+        self.assertEqual(root.MISSION.OBS_C.INST.DS_1.description, "DS_1 from OBS_C")
+        self.assertEqual(set(p.spz_name() for p in root.MISSION.OBS_A.INST.DS_3), {"B", "V"})
+
+    def test_only_changed_archive_members_are_extracted(self):
+        archive = os.path.join(self.tmp_dir.name, "master.tar")
+        extracted_dir = os.path.join(self.tmp_dir.name, "extracted/")
+
+        def make_archive(datasets):
+            with tarfile.open(archive, 'w') as tar:
+                for dataset in datasets:
+                    name = f"{dataset.lower()}_00000000_v01.cdf"
+                    tar.add(os.path.join(self.masters_dir, name), arcname=name)
+
+        make_archive(self.datasets)
+        with mock.patch.object(_inventory_builder, '_MASTERS_CDF_PATH', extracted_dir):
+            _inventory_builder._update_master_cdf_files(f"file://{archive}")
+            self.assertEqual(len(os.listdir(extracted_dir)), 4)
+            os.utime(self._write_master(self.datasets[0], ("B", "V", "N")), (0, 0))
+            make_archive(self.datasets[:3])
+            with mock.patch.object(tarfile.TarFile, 'extract', autospec=True,
+                                   side_effect=tarfile.TarFile.extract) as extract:
+                _inventory_builder._update_master_cdf_files(f"file://{archive}")
+        self.assertEqual([call[0][1].name for call in extract.call_args_list], ["ds_0_00000000_v01.cdf"])
+        self.assertEqual(sorted(os.listdir(extracted_dir)),
+                         [f"{dataset.lower()}_00000000_v01.cdf" for dataset in self.datasets[:3]])
+
+
 class ConcurrentRequests(unittest.TestCase):
 
     def test_get_variable(self):
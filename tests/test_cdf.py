@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `speasy.core.cdf` module."""
+import os
+import tempfile
+import threading
+import unittest
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import numpy as np
+import pycdfpp
+import pyistp
+
+from speasy.core import http
+from speasy.core.cdf import load_variable, load_variables
+from speasy.webservices.cda import _read_cdf
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def make_cdf(path: str, length: int = 1000):
+    cdf = pycdfpp.CDF()
+    time = np.datetime64('2020-01-01', 'ns') + np.arange(length).astype('timedelta64[s]')
+    cdf.add_variable("Epoch", values=pycdfpp.to_tt2000(time), data_type=pycdfpp.DataType.CDF_TIME_TT2000)
+    cdf["Epoch"].add_attribute("VAR_TYPE", "support_data")
+    cdf.add_variable("B", values=np.arange(length * 3, dtype=np.float64).reshape(length, 3))
+    cdf["B"].add_attribute("DEPEND_0", "Epoch")
+    cdf["B"].add_attribute("VAR_TYPE", "data")
+    cdf["B"].add_attribute("UNITS", "nT")
+    pycdfpp.save(cdf, path)
+
+
+class LoadVariable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp_dir.name, "test.cdf")
+        make_cdf(cls.path)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=cls.tmp_dir.name))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/test.cdf"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmp_dir.cleanup()
+
+    def test_file_and_buffer_give_same_variable(self):
+        with open(self.path, 'rb') as f:
+            from_buffer = load_variable(buffer=f.read(), variable="B")
+        from_file = load_variable(file=self.path, variable="B")
+        self.assertEqual(from_file, from_buffer)
+        self.assertEqual(from_file.unit, "nT")
+        self.assertEqual(from_file.values.shape, (1000, 3))
+        self.assertEqual(from_file.time[0], np.datetime64('2020-01-01', 'ns'))
+
+    def test_values_are_not_copied(self):
+        var = load_variable(file=self.path, variable="B")
+        self.assertFalse(var.values.flags.owndata)
+        self.assertTrue(var.values.flags.writeable)
+
+    def test_missing_variable(self):
+        self.assertIsNone(load_variable(file=self.path, variable="C"))
+
+    def test_load_variables_loads_the_file_once(self):
+        with mock.patch('speasy.core.cdf.pyistp.load', wraps=pyistp.load) as load:
+            variables = load_variables(file=self.path, variables=["B", "C"])
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(variables["B"], load_variable(file=self.path, variable="B"))
+        self.assertIsNone(variables["C"])
+
+    def test_download_streams_to_a_removed_temporary_file(self):
+        with http.download(self.url, suffix='.cdf') as path:
+            self.assertNotEqual(path, self.path)
+            self.assertEqual(os.path.getsize(path), os.path.getsize(self.path))
+        self.assertFalse(os.path.exists(path))
+
+    def test_cda_read_cdf(self):
+        self.assertEqual(_read_cdf(self.url, "B"), load_variable(file=self.path, variable="B"))
+
+
+if __name__ == '__main__':
+    unittest.main()
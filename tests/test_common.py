@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 """Tests for `speasy.common` package."""
+import random
+import time
 import unittest
 from ddt import ddt, data, unpack
 
@@ -24,3 +26,15 @@ class Listify(unittest.TestCase):
     @unpack
     def test_listify(self, input, expected):
         self.assertEqual(speasy.core.listify(input), expected)
+
+
+@ddt
+class ParallelImap(unittest.TestCase):
+    @data(1, 4)
+    def test_results_keep_input_order(self, max_workers):
+        def func(x):
+            time.sleep(random.random() * 0.01)
+            return x * 2
+
+        self.assertListEqual(list(speasy.core.parallel_imap(func, list(range(20)), max_workers=max_workers)),
+                             [x * 2 for x in range(20)])
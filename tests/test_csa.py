@@ -1,7 +1,22 @@
+import io
 import os
+import tarfile
+import tempfile
 import unittest
+import uuid
+from unittest import mock
+
+import numpy as np
+import pycdfpp
+from astropy.table import Table
 
 import speasy as spz
+from speasy.core.cdf import load_variables
+from speasy.core.dataprovider import PROVIDERS
+from speasy.core.index.speasy_index import SpeasyIndex as _Index
+from speasy.core.inventory.indexes import DatasetIndex, ParameterIndex, SpeasyIndex, make_inventory_node
+from speasy.inventories import flat_inventories
+from speasy.webservices.csa import CSA_Webservice, build_inventory
 
 
 class CSAInventory(unittest.TestCase):
@@ -14,5 +29,151 @@ class CSAInventory(unittest.TestCase):
                       spz.inventories.tree.csa.Cluster.Cluster_1.CIS_HIA1.C1_CP_CIS_HIA_HS_1D_PEF.__dict__)
 
 
+class _FakeStreamedResponse:
+    def __init__(self, content: bytes):
+        self.raw = io.BytesIO(content)
+        self.url = "https://csa/data"
+        self.status_code = 200
+        self.ok = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class CSADecoding(unittest.TestCase):
+    def setUp(self):
+        time = np.datetime64('2010-01-01', 'ns') + np.arange(4 * 24 * 60).astype('timedelta64[m]')
+        cdf = pycdfpp.CDF()
+        cdf.add_variable("Epoch", values=pycdfpp.to_tt2000(time), data_type=pycdfpp.DataType.CDF_TIME_TT2000)
+        for name in ("B", "V", "N"):
+            cdf.add_variable(name, values=np.random.random_sample((len(time), 3)))
+            cdf[name].add_attribute("DEPEND_0", "Epoch")
+            cdf[name].add_attribute("VAR_TYPE", "data")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pycdfpp.save(cdf, os.path.join(tmp_dir, "test.cdf"))
+            tarball = io.BytesIO()
+            with tarfile.open(fileobj=tarball, mode='w:gz') as tar:
+                tar.add(os.path.join(tmp_dir, "test.cdf"), arcname="CSA_Download/test.cdf")
+        self.tarball = tarball.getvalue()
+        self.requests = 0
+
+        # a provider with a handmade inventory which is not registered, so other tests still get the real one
+        with mock.patch.dict(PROVIDERS), mock.patch.dict(flat_inventories.__dict__), \
+            mock.patch.object(CSA_Webservice, 'update_inventory'):
+            self.csa = CSA_Webservice()
+        # unique dataset name so previous runs cache entries never match
+        self.dataset = f"SPZ_CSA_TEST_{uuid.uuid4().hex}"
+        root = SpeasyIndex(name="csa", provider="csa", uid="csa")
+        dataset = make_inventory_node(root, DatasetIndex, name=self.dataset, provider="csa", uid=self.dataset,
+                                      dataset_id=self.dataset, start_date="2010-01-01", stop_date="2010-01-05",
+                                      date_last_update="2020-01-01")
+        for name in ("B", "V", "N"):
+            make_inventory_node(dataset, ParameterIndex, name=name, provider="csa", uid=f"{self.dataset}/{name}",
+                                parameter_id=name, dataset=self.dataset, start_date="2010-01-01",
+                                stop_date="2010-01-05")
+        self.csa.flat_inventory.update(root)
+
+        patcher = mock.patch('speasy.webservices.csa.http.get', side_effect=self._fake_get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ[spz.config.proxy.enabled.env_var_name] = "False"
+        self.addCleanup(os.environ.pop, spz.config.proxy.enabled.env_var_name)
+
+    def _fake_get(self, url, params=None, headers=None, stream=False):
+        self.requests += 1
+        return _FakeStreamedResponse(self.tarball)
+
+    def test_decodes_cdf_from_streamed_tarball(self):
+        # the fake server ignores requested range and always sends the whole file
+        var = self.csa.get_variable(self.dataset, "B", "2010-01-02", "2010-01-02T06", disable_cache=True)
+        self.assertEqual(var.values.shape, (4 * 24 * 60, 3))
+        self.assertEqual(var.time[0], np.datetime64('2010-01-01', 'ns'))
+
+    def test_caches_sibling_variables(self):
+        os.environ[spz.config.csa.cache_sibling_variables.env_var_name] = "True"
+        self.addCleanup(os.environ.pop, spz.config.csa.cache_sibling_variables.env_var_name)
+        with mock.patch('speasy.webservices.csa.load_variables', wraps=load_variables) as load, \
+            mock.patch.object(self.csa.flat_inventory.parameters, 'values',
+                              side_effect=AssertionError("siblings lookup should not scan all parameters")):
+            b = self.csa.get_variable(self.dataset, "B", "2010-01-02", "2010-01-02T06")
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual(sorted(load.call_args[1]['variables']), ["B", "N", "V"])
+        self.assertEqual(self.requests, 1)
+        for name in ("V", "N"):
+            sibling = self.csa.get_variable(self.dataset, name, "2010-01-02", "2010-01-02T06")
+            self.assertEqual(len(sibling), len(b))
+            self.assertTrue(np.array_equal(sibling.time, b.time))
+        self.assertEqual(self.requests, 1)
+
+
+class CSAInventoryBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        os.environ[spz.config.index.path.env_var_name] = self.tmp_dir.name
+        self.addCleanup(os.environ.pop, spz.config.index.path.env_var_name)
+        patcher = mock.patch('speasy.webservices.csa.index', _Index())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.last_update = "2020-01-01"
+        self.queries = []
+        patcher = mock.patch('speasy.webservices.csa._run_queries', side_effect=self._fake_run_queries)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _tables(self):
+        return {
+            "COUNT": Table(rows=[(1, self.last_update)], names=("datasets_count", "last_update")),
+            "v_mission": Table(rows=[("Cluster",)], names=("name",)),
+            "v_observatory": Table(rows=[("Cluster_1", "Cluster"), ("MULTIPLE", "Cluster")],
+                                   names=("name", "mission_name")),
+            "v_instrument": Table(rows=[("FGM1", "Cluster_1")], names=("name", "observatories")),
+            "v_dataset WHERE": Table(rows=[("C1_CP_FGM_SPIN", "FGM1", "2001-01-01", "2020-01-01")],
+                                     names=("dataset_id", "instruments", "start_date", "end_date")),
+            "v_parameter": Table(rows=[("B_vec_xyz_gse__C1_CP_FGM_SPIN", "C1_CP_FGM_SPIN"),
+                                       ("B_mag__C1_CP_FGM_SPIN", "C1_CP_FGM_SPIN"),
+                                       ("orphan", "UNKNOWN")], names=("parameter_id", "dataset_id"))
+        }
+
+    def _fake_run_queries(self, queries, tapurl):
+        self.queries.extend(queries)
+        tables = self._tables()
+        return [next(table for key, table in tables.items() if key in query) for query in queries]
+
+    def _build(self):
+        return build_inventory(SpeasyIndex(name="csa", provider="csa", uid="csa"))
+
+    def test_builds_tree_from_tap_tables(self):
+        root = self._build()
+        dataset = root.Cluster.Cluster_1.FGM1.C1_CP_FGM_SPIN
+        self.assertEqual(dataset.stop_date, "2020-01-01")
+        self.assertIn("B_mag__C1_CP_FGM_SPIN", dataset.__dict__)
+        self.assertEqual(dataset.B_mag__C1_CP_FGM_SPIN.start_date, "2001-01-01")
+        self.assertEqual(len(self.queries), 6)
+
+    def test_reuses_saved_tree_while_not_outdated(self):
+        self._build()
+        self.queries.clear()
+        root = self._build()
+        self.assertEqual(self.queries, [])
+        self.assertIn("B_mag__C1_CP_FGM_SPIN", root.Cluster.Cluster_1.FGM1.C1_CP_FGM_SPIN.__dict__)
+
+    def test_only_checks_fingerprint_once_retention_expired(self):
+        os.environ[spz.config.inventories.cache_retention_days.env_var_name] = "0"
+        self.addCleanup(os.environ.pop, spz.config.inventories.cache_retention_days.env_var_name)
+        self._build()
+        self.queries.clear()
+        root = self._build()
+        self.assertEqual(len(self.queries), 1)
+        self.assertIn("B_mag__C1_CP_FGM_SPIN", root.Cluster.Cluster_1.FGM1.C1_CP_FGM_SPIN.__dict__)
+        self.last_update = "2021-01-01"
+        self.queries.clear()
+        self._build()
+        self.assertEqual(len(self.queries), 7)
+
+
 if __name__ == '__main__':
     unittest.main()
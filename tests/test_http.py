@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `speasy.core.http` module."""
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from speasy.core import http
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    payload = b"speasy" * 1000
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class PooledSession(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.url = f"http://127.0.0.1:{cls.server.server_address[1]}/data"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        http.reset_session()
+        self.addCleanup(http.reset_session)
+
+    def test_connections_are_reused(self):
+        for _ in range(5):
+            self.assertEqual(http.get(self.url).content, _Handler.payload)
+        stats = http.stats()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["opened"], 1)
+        self.assertEqual(stats["reused"], 4)
+
+    def test_urlopen_streams_through_session(self):
+        with http.urlopen(self.url) as f:
+            self.assertEqual(f.read(), _Handler.payload)
+        with http.urlopen(self.url) as f:
+            self.assertEqual(f.read(), _Handler.payload)
+        self.assertEqual(http.stats()["opened"], 1)
+
+    def test_urlopen_local_file(self):
+        with http.urlopen(f"file://{os.path.abspath(__file__)}") as f:
+            self.assertIn(b"PooledSession", f.read())
+
+    def test_per_host_pool_sizes(self):
+        with mock.patch.object(http.http_cfg, 'pool_sizes', return_value="a.org=3, b.org=12"):
+            self.assertEqual(http._pool_sizes(), {"a.org": 3, "b.org": 12})
+            session = http.session()
+            self.assertEqual(session.get_adapter("https://b.org/data")._pool_maxsize, 12)
+            self.assertEqual(session.get_adapter("https://c.org/data")._pool_maxsize, http.http_cfg.pool_size())
+
+
+if __name__ == '__main__':
+    unittest.main()
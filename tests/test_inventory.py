@@ -0,0 +1,168 @@
+import os
+import pickle
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from unittest import mock
+
+from speasy.core.inventory import ProviderInventory
+from speasy.core.inventory.indexes import ComponentIndex, DatasetIndex, ParameterIndex, SpeasyIndex, \
+    _instance_dict, make_inventory_node, to_dict
+from speasy.core.inventory._packed_tree import PackedInventory, dump_inventory, is_packed_inventory, load_inventory, \
+    pending_node
+from speasy.webservices.amda.inventory import AmdaXMLParser
+
+_OBS_TREE = os.path.normpath(f'{os.path.dirname(os.path.abspath(__file__))}/resources/obsdatatree.xml')
+
+
+def _is_loaded(node: SpeasyIndex) -> bool:
+    return pending_node(node) is None
+
+
+class PackedInventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.root = SpeasyIndex(name="root", provider="test", uid="root")
+        mission = make_inventory_node(self.root, SpeasyIndex, name="Mission", provider="test", uid="mission",
+                                      desc="Déjà vu")
+        for i in range(3):
+            dataset = make_inventory_node(mission, DatasetIndex, name=f"ds{i}", provider="test", uid=f"ds{i}",
+                                          start_date="2020-01-01", stop_date="2020-01-02")
+            parameter = make_inventory_node(dataset, ParameterIndex, name="B", provider="test", uid=f"ds{i}/B",
+                                            dataset=f"ds{i}")
+            make_inventory_node(parameter, ComponentIndex, name="Bx", provider="test", uid=f"ds{i}/B/Bx")
+        # meta-data are usually strings but not always
+        self.root.build_date = None
+        mission.shape = [3, 4]
+
+    def test_round_trip(self):
+        packed = dump_inventory(self.root)
+        self.assertTrue(is_packed_inventory(packed))
+        loaded = load_inventory(packed)
+        self.assertEqual(loaded, self.root)
+        self.assertIs(type(loaded.Mission.ds0), DatasetIndex)
+        self.assertIs(type(loaded.Mission.ds0.B.Bx), ComponentIndex)
+        self.assertEqual(loaded.Mission.shape, [3, 4])
+        self.assertEqual(loaded.Mission.desc, "Déjà vu")
+
+    def test_nodes_are_loaded_on_access(self):
+        inventory = PackedInventory(dump_inventory(self.root))
+        self.assertEqual(len(inventory), 11)
+        root = inventory.node(0)
+        self.assertFalse(_is_loaded(root))
+        mission = root.Mission
+        self.assertTrue(_is_loaded(root))
+        self.assertFalse(_is_loaded(mission))
+        self.assertEqual(mission.spz_uid(), "mission")
+        self.assertTrue(all(not _is_loaded(dataset) for dataset in _instance_dict(mission).values() if isinstance(dataset, SpeasyIndex)))
+        self.assertEqual(inventory.parent(inventory.children(0)[0]), 0)
+
+    def test_nodes_are_complete_when_loaded_concurrently(self):
+        root = SpeasyIndex(name="root", provider="test", uid="root")
+        for i in range(2000):
+            make_inventory_node(root, DatasetIndex, name=f"ds{i}", provider="test", uid=f"ds{i}")
+        expected = len(root.__dict__)
+        for _ in range(20):
+            node = load_inventory(dump_inventory(root))
+            barrier = Barrier(4)
+
+            def _attributes_count(_):
+                barrier.wait()
+                return len(node.__dict__)
+
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                self.assertEqual(list(executor.map(_attributes_count, range(4))), [expected] * 4)
+
+    def test_loaded_and_regular_nodes_are_plain_objects(self):
+        self.assertIs(SpeasyIndex.__getattribute__, object.__getattribute__)
+        loaded = load_inventory(dump_inventory(self.root))
+        self.assertIs(type(loaded.Mission.ds0), DatasetIndex)
+        with self.assertRaises(AttributeError):
+            _ = loaded.Mission.not_a_child
+        self.assertFalse(hasattr(self.root, "not_a_child"))
+
+    def test_not_loaded_nodes_can_be_pickled(self):
+        root = load_inventory(dump_inventory(self.root))
+        mission = root.Mission
+        self.assertEqual(pickle.loads(pickle.dumps(mission)), self.root.Mission)
+
+    def test_loads_former_formats(self):
+        self.assertEqual(load_inventory(to_dict(self.root)).Mission.ds1.B.spz_uid(), "ds1/B")
+        self.assertIs(load_inventory(self.root), self.root)
+        self.assertIsNone(load_inventory(None))
+
+    def test_amda_obs_tree(self):
+        with open(_OBS_TREE, 'rb') as obs_xml:
+            root = AmdaXMLParser.parse(obs_xml)
+        self.assertEqual(to_dict(load_inventory(dump_inventory(root))), to_dict(root))
+
+
+class LazyFlatInventoryTest(unittest.TestCase):
+    def setUp(self):
+        self.root = SpeasyIndex(name="root", provider="test", uid="root")
+        mission = make_inventory_node(self.root, SpeasyIndex, name="Mission", provider="test", uid="mission")
+        for i in range(3):
+            dataset = make_inventory_node(mission, DatasetIndex, name=f"ds{i}", provider="test", uid=f"ds{i}")
+            parameter = make_inventory_node(dataset, ParameterIndex, name="B", provider="test", uid=f"ds{i}/B",
+                                            dataset=f"ds{i}")
+            make_inventory_node(parameter, ComponentIndex, name="Bx", provider="test", uid=f"ds{i}/B/Bx")
+        self.loaded = load_inventory(dump_inventory(self.root))
+        self.flat = ProviderInventory()
+        self.flat.update(self.loaded)
+
+    def test_update_does_not_load_the_tree(self):
+        self.assertFalse(_is_loaded(self.loaded))
+        self.assertEqual(len(self.flat.parameters), 3)
+        self.assertEqual(set(self.flat.datasets), {"ds0", "ds1", "ds2"})
+        self.assertIn("ds1/B/Bx", self.flat.components)
+        self.assertNotIn("ds3/B", self.flat.parameters)
+        self.assertFalse(_is_loaded(self.loaded))
+
+    def test_lookup_only_loads_the_node_path(self):
+        parameter = self.flat.parameters["ds1/B"]
+        self.assertIs(type(parameter), ParameterIndex)
+        self.assertIs(parameter, self.loaded.Mission.ds1.B)
+        mission = _instance_dict(self.loaded)["Mission"]
+        self.assertFalse(_is_loaded(_instance_dict(mission)["ds0"]))
+        self.assertEqual(parameter, self.root.Mission.ds1.B)
+        with self.assertRaises(KeyError):
+            _ = self.flat.parameters["ds3/B"]
+
+    def test_flat_index_behaves_as_a_dict(self):
+        del self.flat.parameters["ds0/B"]
+        self.assertNotIn("ds0/B", self.flat.parameters)
+        self.assertEqual(sorted(self.flat.parameters.keys()), ["ds1/B", "ds2/B"])
+        self.flat.parameters["ds0/B"] = self.root.Mission.ds0.B
+        self.assertIs(self.flat.parameters["ds0/B"], self.root.Mission.ds0.B)
+        self.assertEqual({uid: node.spz_uid() for uid, node in self.flat.parameters.items()},
+                         {"ds0/B": "ds0/B", "ds1/B": "ds1/B", "ds2/B": "ds2/B"})
+        self.assertEqual(sorted(self.flat.datasets._ipython_key_completions_()), ["ds0", "ds1", "ds2"])
+
+    def test_lookups_are_cached(self):
+        inventory = pending_node(self.loaded)[0]
+        with mock.patch.object(PackedInventory, 'find', autospec=True, side_effect=PackedInventory.find) as find:
+            for _ in range(2):
+                self.assertIn("ds1/B", self.flat.parameters)
+                self.assertNotIn("ds3/B", self.flat.parameters)
+            _ = self.flat.parameters["ds1/B"]
+        self.assertEqual(find.call_count, 2)
+        self.assertEqual(inventory.find("ParameterIndex", "ds1/B"), [inventory.find("DatasetIndex", "ds1")[0] + 1])
+        self.assertEqual(inventory.find("ParameterIndex", "ds1"), [])
+
+    def test_len_matches_keys(self):
+        self.assertEqual(len(self.flat.components), 3)
+        self.flat.components["extra"] = self.root.Mission.ds0.B.Bx
+        self.flat.components["ds0/B/Bx"] = self.root.Mission.ds0.B.Bx
+        del self.flat.components["ds1/B/Bx"]
+        self.assertEqual(len(self.flat.components), len(list(self.flat.components)))
+        self.assertEqual(len(self.flat.components), 3)
+        self.flat.update(load_inventory(dump_inventory(self.root)))
+        self.assertEqual(len(self.flat.components), len(set(self.flat.components)))
+        self.assertEqual(len(self.flat.components), 4)
+
+    def test_tab_completion_on_not_loaded_nodes(self):
+        self.assertIn("Mission", dir(self.loaded))
+        self.assertIn("ds0", dir(self.loaded.Mission))
+
+
+if __name__ == '__main__':
+    unittest.main()
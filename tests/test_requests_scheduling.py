@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for `speasy.core.requests_scheduling` package."""
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+from ddt import data, ddt
+
+import speasy as spz
+from speasy.core.datetime_range import DateTimeRange
+
+
+class FakeProvider:
+    def __init__(self, provider_name):
+        self.provider_name = provider_name
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get_data(self, product, start_time, stop_time, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.02)
+        with self._lock:
+            self.in_flight -= 1
+        return self.provider_name, product, DateTimeRange(start_time, stop_time)
+
+
+@ddt
+class ConcurrentGetData(unittest.TestCase):
+    def setUp(self):
+        self.providers = {name: FakeProvider(name) for name in ('fake1', 'fake2')}
+        patcher = mock.patch('speasy.core.requests_scheduling.request_dispatch.get_provider',
+                             side_effect=lambda name: self.providers.get(name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @data(1, 8)
+    def test_keeps_products_and_ranges_shape(self, parallel):
+        products = ['fake1/a', 'fake2/b', 'fake1/c']
+        ranges = [["2016-10-10", "2016-10-11"], ["2017-10-10", "2017-10-11"]]
+        result = spz.get_data(products, ranges, parallel=parallel)
+        self.assertEqual(len(result), len(products))
+        for product, product_result in zip(products, result):
+            self.assertEqual(len(product_result), len(ranges))
+            for r, (provider, product_uid, dt_range) in zip(ranges, product_result):
+                self.assertEqual(f"{provider}/{product_uid}", product)
+                self.assertEqual(dt_range, DateTimeRange(*r))
+
+    def test_single_product_single_range_is_not_a_list(self):
+        self.assertEqual(spz.get_data('fake1/a', "2016-10-10", "2016-10-11", parallel=4)[1], 'a')
+
+    def test_limits_concurrent_requests_per_provider(self):
+        ranges = [[f"2016-10-{day:02d}", f"2016-10-{day + 1:02d}"] for day in range(1, 25)]
+        spz.get_data(['fake1/a', 'fake2/b'], ranges, parallel=16)
+        max_per_provider = spz.config.requests_scheduling.max_concurrent_requests_per_provider()
+        for provider in self.providers.values():
+            self.assertGreater(provider.max_in_flight, 1)
+            self.assertLessEqual(provider.max_in_flight, max_per_provider)
+
+    def test_sequential_by_default(self):
+        spz.get_data(['fake1/a', 'fake1/b', 'fake1/c'], "2016-10-10", "2016-10-11")
+        self.assertEqual(self.providers['fake1'].max_in_flight, 1)
+
+
+@ddt
+class AsyncGetData(unittest.TestCase):
+    def setUp(self):
+        self.providers = {name: FakeProvider(name) for name in ('fake1', 'fake2')}
+        patcher = mock.patch('speasy.core.requests_scheduling.request_dispatch.get_provider',
+                             side_effect=lambda name: self.providers.get(name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @data(1, 8)
+    def test_matches_get_data_results(self, parallel):
+        products = ['fake1/a', 'fake2/b', 'fake1/c']
+        ranges = [["2016-10-10", "2016-10-11"], ["2017-10-10", "2017-10-11"]]
+        self.assertEqual(asyncio.run(spz.aget_data(products, ranges, parallel=parallel)),
+                         spz.get_data(products, ranges))
+        self.assertEqual(asyncio.run(spz.aget_data('fake1/a', "2016-10-10", "2016-10-11")),
+                         spz.get_data('fake1/a', "2016-10-10", "2016-10-11"))
+
+    def test_does_not_block_event_loop(self):
+        ticks = []
+
+        async def _ticker(done: asyncio.Event):
+            while not done.is_set():
+                ticks.append(None)
+                await asyncio.sleep(0.005)
+
+        async def _main():
+            done = asyncio.Event()
+            ticker = asyncio.ensure_future(_ticker(done))
+            ranges = [[f"2016-10-{day:02d}", f"2016-10-{day + 1:02d}"] for day in range(1, 11)]
+            result = await spz.aget_data('fake1/a', ranges, parallel=1)
+            done.set()
+            await ticker
+            return result
+
+        self.assertEqual(len(asyncio.run(_main())), 10)
+        self.assertGreater(len(ticks), 10)
+
+    def test_many_ranges_with_backpressure(self):
+        ranges = [[f"2016-01-01T{hour:02d}:{minute:02d}", f"2016-01-01T{hour:02d}:{minute:02d}:30"]
+                  for hour in range(5) for minute in range(0, 60, 3)]
+        result = asyncio.run(spz.aget_data(['fake1/a', 'fake2/b'], ranges, parallel=6))
+        self.assertEqual([len(product_result) for product_result in result], [len(ranges)] * 2)
+        max_per_provider = spz.config.requests_scheduling.max_concurrent_requests_per_provider()
+        for provider in self.providers.values():
+            self.assertGreater(provider.max_in_flight, 1)
+            self.assertLessEqual(provider.max_in_flight, max_per_provider)
+
+    def test_parallel_above_default_grows_executor(self):
+        from speasy.core.requests_scheduling import request_dispatch
+        parallel = spz.config.requests_scheduling.async_parallel() + 4
+        ranges = [[f"2016-10-{day:02d}", f"2016-10-{day + 1:02d}"] for day in range(1, 5)]
+        asyncio.run(spz.aget_data(['fake1/a'], ranges, parallel=parallel))
+        self.assertGreaterEqual(request_dispatch._async_executor_size, parallel)
+
+    def test_concurrent_calls_survive_executor_growth(self):
+        from speasy.core.requests_scheduling import request_dispatch
+        ranges = [[f"2016-10-{day:02d}", f"2016-10-{day + 1:02d}"] for day in range(1, 11)]
+        larger = max(request_dispatch._async_executor_size, spz.config.requests_scheduling.async_parallel()) + 8
+
+        async def _main():
+            small = asyncio.ensure_future(spz.aget_data('fake1/a', ranges, parallel=2))
+            await asyncio.sleep(0)
+            return await asyncio.gather(small, spz.aget_data('fake2/b', ranges, parallel=larger))
+
+        small_result, large_result = asyncio.run(_main())
+        self.assertEqual(len(small_result), len(ranges))
+        self.assertEqual(len(large_result), len(ranges))
+        self.assertGreaterEqual(request_dispatch._async_executor_size, larger)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,13 +3,16 @@
 
 """Tests for `speasy` package."""
 import os
+import subprocess
+import sys
 import unittest
+from unittest import mock
 from datetime import datetime, timezone
 
 from ddt import data, ddt, unpack
 
 import speasy as spz
-from speasy.core.dataprovider import PROVIDERS
+from speasy.core.dataprovider import PROVIDERS, provider_names
 
 
 @ddt
@@ -120,56 +123,78 @@ class SpeasyModule(unittest.TestCase):
         self.assertListEqual(
             l, ['amda', 'cdaweb', 'cda', 'sscweb', 'ssc', 'csa'])
 
-    @data(*[(provider,) for provider in PROVIDERS.keys()])
+    @data(*[(provider,) for provider in provider_names(include_alt_names=False)])
     @unpack
     def test_can_update_inventories(self, provider):
-        spz.__dict__[provider].flat_inventory.clear()
+        getattr(spz, provider).flat_inventory.clear()
         spz.inventories.tree.__dict__[provider].clear()
         self.assertEqual(
             len(spz.inventories.flat_inventories.__dict__[provider].parameters), 0)
-        spz.__dict__[provider].update_inventory()
+        getattr(spz, provider).update_inventory()
         self.assertGreaterEqual(
             len(spz.inventories.flat_inventories.__dict__[provider].parameters), 1)
 
     def test_can_update_inventories_all_at_once_from_proxy(self):
-        for provider in PROVIDERS.keys():
-            spz.__dict__[provider].flat_inventory.clear()
+        for provider in provider_names(include_alt_names=False):
+            getattr(spz, provider).flat_inventory.clear()
             spz.inventories.tree.__dict__[provider].clear()
 
-        for provider in PROVIDERS.keys():
+        for provider in provider_names(include_alt_names=False):
             self.assertEqual(
                 len(spz.inventories.flat_inventories.__dict__[provider].parameters), 0)
 
         spz.update_inventories()
 
-        for provider in PROVIDERS.keys():
+        for provider in provider_names(include_alt_names=False):
             self.assertGreaterEqual(
                 len(spz.inventories.flat_inventories.__dict__[provider].parameters), 1)
 
     def test_can_update_inventories_all_at_once_without_proxy(self):
         if "SPEASY_INVENTORY_TESTS" not in os.environ:
             self.skipTest("Inventory tests disabled")
-        for provider in PROVIDERS.keys():
+        for provider in provider_names(include_alt_names=False):
             spz.inventories.flat_inventories.__dict__[
                 provider].parameters.clear()
 
         os.environ[spz.config.proxy.enabled.env_var_name] = "False"
 
-        for provider in PROVIDERS.keys():
-            spz.__dict__[provider].flat_inventory.clear()
+        for provider in provider_names(include_alt_names=False):
+            getattr(spz, provider).flat_inventory.clear()
             spz.inventories.tree.__dict__[provider].clear()
 
-        for provider in PROVIDERS.keys():
+        for provider in provider_names(include_alt_names=False):
             self.assertEqual(
                 len(spz.inventories.flat_inventories.__dict__[provider].parameters), 0)
 
         spz.update_inventories()
 
         os.environ.pop(spz.config.proxy.enabled.env_var_name)
-        for provider in PROVIDERS.keys():
+        for provider in provider_names(include_alt_names=False):
             self.assertGreaterEqual(
                 len(spz.inventories.flat_inventories.__dict__[provider].parameters), 1)
 
+    def test_import_does_not_build_providers(self):
+        out = subprocess.run(
+            [sys.executable, "-c",
+             "import speasy; from speasy.core.dataprovider import PROVIDERS; print(len(PROVIDERS))"],
+            check=True, capture_output=True, text=True).stdout
+        self.assertEqual(out.strip().splitlines()[-1], "0")
+
+    def test_providers_are_built_on_first_access(self):
+        self.assertIsNotNone(spz.inventories.tree.amda)
+        self.assertIn('amda', PROVIDERS)
+        self.assertIs(spz.inventories.flat_inventories.cdaweb, spz.cda.flat_inventory)
+
+    def test_provider_being_built_is_not_cached(self):
+        cached = vars(spz).pop('amda', None)
+        try:
+            with mock.patch('speasy.core.dataprovider.get_provider', return_value=None):
+                self.assertIsNone(spz.amda)
+            self.assertNotIn('amda', vars(spz))
+        finally:
+            if cached is not None:
+                setattr(spz, 'amda', cached)
+
     def test_raises_if_product_path_is_broken(self):
         with self.assertRaises(ValueError):
             spz.get_data('this_misses_a_slash', datetime.now(), datetime.now())
@@ -13,9 +13,10 @@ from ddt import data, ddt, unpack
 
 from speasy.core import epoch_to_datetime64
 from speasy.products.variable import (DataContainer, SpeasyVariable,
-                                      VariableAxis, VariableTimeAxis,
-                                      from_dataframe, from_dictionary, merge,
-                                      to_dataframe, to_dictionary)
+                                      SpeasyVariableBuilder, VariableAxis,
+                                      VariableTimeAxis, from_dataframe,
+                                      from_dictionary, merge, to_dataframe,
+                                      to_dictionary)
 
 
 def epoch_to_datetime64_s(epoch):
@@ -194,6 +195,65 @@ class SpeasyVariableMerge(unittest.TestCase):
         self.assertListEqual(
             var.time.tolist(), var1.time.tolist() + var2.time.tolist())
 
+    @data(
+        make_simple_var,
+        make_2d_var,
+        make_2d_var_1d_y
+    )
+    def test_many_unordered_overlapping_fragments(self, ctor):
+        fragments = [ctor(start, start + 15., 1., 10.) for start in range(0, 1000, 10)]
+        fragments += [ctor(start, start + 3., 1., 10.) for start in range(2, 1000, 50)]
+        np.random.default_rng(42).shuffle(fragments)
+        self.assertEqual(merge(fragments), ctor(0., 1005., 1., 10.))
+
+    def test_later_fragment_wins_on_overlap(self):
+        var1 = make_simple_var(0., 10., 1., 1.)
+        var2 = make_simple_var(5., 15., 1., 2.)
+        var = merge([var2, var1])
+        self.assertListEqual(var.values[:, 0].tolist(), list(range(5)) + [2 * v for v in range(5, 15)])
+
+    def test_covered_fragments_are_dropped(self):
+        var = merge([make_simple_var(0., 20., 1., 10.), make_simple_var(5., 10., 1., 10.),
+                     make_simple_var(0., 5., 1., 10.)])
+        self.assertEqual(var, make_simple_var(0., 20., 1., 10.))
+
+    def test_always_returns_a_new_variable(self):
+        var1 = make_simple_var(0., 20., 1., 10.)
+        var = merge([var1])
+        self.assertEqual(var, var1)
+        self.assertIsNot(var.values, var1.values)
+
+
+@ddt
+class SpeasyVariableBuilderTest(unittest.TestCase):
+    def test_nothing_appended(self):
+        self.assertIsNone(SpeasyVariableBuilder().build())
+        self.assertIsNone(SpeasyVariableBuilder().append(None).build())
+
+    def test_only_empty_fragments(self):
+        var = SpeasyVariableBuilder().append(None).append(make_simple_var()).build()
+        self.assertIsNotNone(var)
+        self.assertEqual(len(var), 0)
+
+    @data(
+        make_simple_var,
+        make_2d_var,
+        make_2d_var_1d_y
+    )
+    def test_matches_merge(self, ctor):
+        fragments = [ctor(start, start + 12., 1., 10.) for start in range(0, 200, 10)]
+        builder = SpeasyVariableBuilder()
+        for fragment in fragments:
+            builder.append(fragment)
+        self.assertEqual(len(builder), 202)
+        self.assertEqual(builder.build(), merge(fragments))
+
+    def test_fragment_covering_previous_ones_replaces_them(self):
+        builder = SpeasyVariableBuilder()
+        builder.append(make_simple_var(0., 10., 1., 1.)).append(make_simple_var(5., 10., 1., 1.))
+        builder.append(make_simple_var(0., 30., 1., 2.))
+        self.assertEqual(builder.build(), make_simple_var(0., 30., 1., 2.))
+
 
 @ddt
 class ASpeasyVariable(unittest.TestCase):
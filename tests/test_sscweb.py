@@ -6,7 +6,7 @@ import unittest
 from datetime import datetime, timezone
 
 import numpy as np
-from ddt import data, ddt
+from ddt import data, ddt, unpack
 
 from speasy.webservices import ssc
 
@@ -86,3 +86,38 @@ class SscWeb(unittest.TestCase):
     def test_raises_if_user_passes_unexpected_kwargs_to_get_orbit(self, kwargs):
         with self.assertRaises(TypeError):
             self.ssc.get_data('moon', "2018-01-01", "2018-01-02", **kwargs)
+
+
+@ddt
+class SscWebDecoding(unittest.TestCase):
+    @data(
+        (['2020-01-01T00:00:00.000+00:00', '2020-02-29T23:59:59.999+00:00'],
+         ['2020-01-01T00:00:00.000', '2020-02-29T23:59:59.999']),
+        (['2020-01-01T02:00:00.000+02:00', '1999-12-31T23:59:59.999-01:30'],
+         ['2020-01-01T00:00:00.000', '2000-01-01T01:29:59.999']),
+        (['2020-01-01T00:00:00.000123+00:00'], ['2020-01-01T00:00:00.000123']),
+        # different widths are decoded one by one
+        (['2020-01-01T02:00:00.5+02:00', '1999-12-31T23:59:59.999-01:30'],
+         ['2020-01-01T00:00:00.500', '2000-01-01T01:29:59.999']),
+        ([], [])
+    )
+    @unpack
+    def test_decodes_timestamps(self, timestamps, expected):
+        self.assertTrue(np.array_equal(ssc._make_time_axis(timestamps), np.array(expected, dtype='datetime64[ns]')))
+
+    def test_decodes_orbit(self):
+        time = np.datetime64('2020-01-01', 'ms') + np.arange(1000).astype('timedelta64[m]')
+        orbit = {'Result': {'Data': ['java.util.ArrayList', [{
+            'Time': ['java.util.ArrayList',
+                     [['javax.xml.datatype.XMLGregorianCalendar', f"{t}+00:00"] for t in time]],
+            'Coordinates': ['java.util.ArrayList', [{
+                'CoordinateSystem': 'Gse',
+                'X': ['[D', list(np.arange(1000.))],
+                'Y': ['[D', list(np.arange(1000.) * 2)],
+                'Z': ['[D', list(np.arange(1000.) * 3)]}]]}]]}}
+        var = ssc._variable(orbit)
+        self.assertTrue(np.array_equal(var.time, time.astype('datetime64[ns]')))
+        self.assertEqual(var.values.shape, (1000, 3))
+        self.assertTrue(np.array_equal(var.values[:, 2], np.arange(1000.) * 3))
+        self.assertEqual(var.columns, ['X', 'Y', 'Z'])
+        self.assertEqual(var.meta['CoordinateSystem'], 'Gse')